@@ -0,0 +1,74 @@
+from .friends import friend_ids
+from .models import ActivityEvent, Friendship, PlayerStats, TimelineEntry
+from .pagination import decode_cursor, encode_cursor
+
+PAGE_SIZE = 20
+BATCH_SIZE = 1000
+# У игрока с большим числом друзей события не раскладываются по лентам:
+# читатели подтягивают их сами, чтобы одна запись не стоила тысяч INSERT
+FANOUT_LIMIT = 500
+
+
+def record(actor, verb, game_id=None, subject='', target_id=None):
+    """Записать событие и разложить его по лентам автора и его друзей"""
+    event = ActivityEvent.objects.create(
+        actor=actor, verb=verb, game_id=game_id, subject=subject[:200], target_id=target_id,
+    )
+    owners = {actor.pk}
+    if not _is_popular(actor.pk):
+        owners |= friend_ids(actor.pk)
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(owner_id=owner_id, event=event) for owner_id in owners],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    return event
+
+
+def _popular():
+    # Игрок без строки сводки считается обычным: его события раскладываются
+    return PlayerStats.objects.filter(friend_count__gt=FANOUT_LIMIT)
+
+
+def _is_popular(player_id):
+    return _popular().filter(player_id=player_id).exists()
+
+
+def _pulled_actors(player):
+    """Друзья, чьи события не раскладываются и читаются напрямую
+
+    Популярные игроки редки, поэтому запрос идёт по индексу friend_count
+    и сверяется с друзьями игрока по уникальному индексу дружбы.
+    """
+    friends = Friendship.objects.filter(player_id=player.pk).values('friend_id')
+    return list(_popular().filter(player_id__in=friends).values_list('player_id', flat=True))
+
+
+def timeline(player, cursor=None, size=PAGE_SIZE):
+    """Страница ленты игрока от новых событий к старым и курсор следующей
+
+    Разложенные записи и события «популярных» друзей читаются по своим
+    индексам и сливаются по id события.
+    """
+    before = decode_cursor(cursor, 1)[0] if cursor else None
+
+    pushed = TimelineEntry.objects.filter(owner=player)
+    if before is not None:
+        pushed = pushed.filter(event_id__lt=before)
+    event_ids = set(pushed.order_by('-event_id').values_list('event_id', flat=True)[:size + 1])
+
+    pulled_actors = _pulled_actors(player)
+    if pulled_actors:
+        pulled = ActivityEvent.objects.filter(actor_id__in=pulled_actors)
+        if before is not None:
+            pulled = pulled.filter(pk__lt=before)
+        event_ids.update(pulled.order_by('-id').values_list('id', flat=True)[:size + 1])
+
+    page_ids = sorted(event_ids, reverse=True)[:size + 1]
+    has_next = len(page_ids) > size
+    page_ids = page_ids[:size]
+
+    events = ActivityEvent.objects.select_related('actor__user', 'game').in_bulk(page_ids)
+    page = [events[event_id] for event_id in page_ids if event_id in events]
+    next_cursor = encode_cursor([page_ids[-1]]) if has_next else None
+    return page, next_cursor
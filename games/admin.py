@@ -1,11 +1,15 @@
 from django.contrib import admin
-from .models import Game, Player, Achievement, PlayerGame, GameReview, FriendRequest, UserBadge, Tournament, TournamentResult, DailyQuest, PlayerQuestProgress
+from .models import Game, Player, Achievement, PlayerGame, GameReview, FriendRequest, UserBadge, Tournament, TournamentResult, DailyQuest, PlayerQuestProgress, PlayerQuestArchive
 
 @admin.register(Game)
 class GameAdmin(admin.ModelAdmin):
-    list_display = ('name', 'genre', 'rating', 'release_date')
+    list_display = ('name', 'genre', 'rating', 'review_average', 'review_count', 'release_date')
     list_filter = ('genre', 'release_date')
     search_fields = ('name', 'description')
+    readonly_fields = (
+        'review_count', 'review_sum', 'review_average',
+        'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5',
+    )
 
 @admin.register(Player)
 class PlayerAdmin(admin.ModelAdmin):
@@ -48,6 +52,7 @@ class TournamentAdmin(admin.ModelAdmin):
     list_display = ('name', 'game', 'status', 'start_date', 'participants_count')
     list_filter = ('status', 'game', 'start_date')
     filter_horizontal = ('participants',)
+    readonly_fields = ('participants_count',)
 
 @admin.register(TournamentResult)
 class TournamentResultAdmin(admin.ModelAdmin):
@@ -56,10 +61,15 @@ class TournamentResultAdmin(admin.ModelAdmin):
 
 @admin.register(DailyQuest)
 class DailyQuestAdmin(admin.ModelAdmin):
-    list_display = ('title', 'game', 'reward_points', 'is_active')
+    list_display = ('title', 'game', 'reward_points', 'is_active', 'starts_at', 'ends_at')
     list_filter = ('game', 'is_active')
 
 @admin.register(PlayerQuestProgress)
 class PlayerQuestProgressAdmin(admin.ModelAdmin):
     list_display = ('player', 'quest', 'progress', 'completed')
     list_filter = ('completed', 'quest')
+
+@admin.register(PlayerQuestArchive)
+class PlayerQuestArchiveAdmin(admin.ModelAdmin):
+    list_display = ('player', 'quest', 'day', 'progress', 'completed')
+    list_filter = ('day', 'completed', 'quest')
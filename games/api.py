@@ -0,0 +1,384 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.http import Http404, JsonResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import get_object_or_404
+from django.views import csrf
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import etag
+
+from . import participation, quests as quests_service, rewards
+from .cache import QUEST_PROGRESS, UNLOCKS, model_versions
+from .forms import GameReviewForm
+from .leaderboard import GAME_LEADERBOARD_ORDER, LEADERBOARD_ORDER, game_ranking, player_rank, ranked_players
+from .models import Achievement, DailyQuest, Game, PlayerGame, Tournament, TournamentResult
+from .pagination import InvalidCursor, keyset_page
+from .search import game_text_filter
+from .stats import stats_for
+
+# Версионированный JSON API для мобильного клиента.
+# Списки листаются непрозрачными курсорами, ответы GET помечаются ETag
+# по версиям моделей из games.cache: если клиент прислал тот же ETag,
+# ответ 304 уходит до единого запроса к базе и без сериализации.
+# Вход по сессии, как на сайте: перед POST клиент берёт токен из
+# GET /api/v1/csrf/ и шлёт его в заголовке X-CSRFToken вместе с cookie.
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def api_view(methods, login=False):
+    """Методы, вход и ошибки в формате JSON вместо редиректов и HTML"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                response = _error('Метод не поддерживается', 405)
+                response['Allow'] = ', '.join(methods)
+                return response
+            if login and not request.user.is_authenticated:
+                return _error('Требуется вход', 401)
+            try:
+                return view(request, *args, **kwargs)
+            except ApiError as error:
+                return _error(str(error), error.status)
+            except InvalidCursor:
+                return _error('Некорректный курсор', 400)
+            except Http404:
+                return _error('Не найдено', 404)
+        return wrapper
+    return decorator
+
+
+def csrf_failure(request, reason=''):
+    """CSRF_FAILURE_VIEW: для API ошибка в JSON, для сайта - страница Django"""
+    match = request.resolver_match
+    if match and match.namespace == 'api':
+        return _error('Нет CSRF-токена, получите его в /api/v1/csrf/', 403)
+    return csrf.csrf_failure(request, reason)
+
+
+def versioned(*labels, per_user=False):
+    """ETag из версий моделей, адреса с параметрами и, при per_user, пользователя"""
+    def etag_func(request, *args, **kwargs):
+        parts = [request.get_full_path(), *map(str, model_versions(*labels))]
+        if per_user:
+            parts.append(str(request.user.pk))
+        return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+    return etag(etag_func)
+
+
+# Поле ответа: столбцы, которые нужно прочитать, и функция значения
+class Field:
+    def __init__(self, getter, columns=()):
+        self.getter = getter
+        self.columns = columns
+
+
+def _attr(name, column=None):
+    return Field(lambda obj: getattr(obj, name), (column or name,))
+
+
+GAME_FIELDS = {
+    'id': _attr('pk', 'id'),
+    'name': _attr('name'),
+    'genre': _attr('genre'),
+    'description': _attr('description'),
+    'release_date': Field(lambda game: game.release_date.isoformat(), ('release_date',)),
+    'rating': _attr('rating'),
+    'review_count': _attr('review_count'),
+    'review_average': Field(lambda game: round(game.review_average, 2), ('review_average',)),
+    'image': Field(lambda game: game.image.url if game.image else None, ('image',)),
+}
+GAME_DEFAULT = ('id', 'name', 'genre', 'release_date', 'rating', 'review_average')
+
+PLAYER_FIELDS = {
+    'id': _attr('pk', 'id'),
+    'username': Field(lambda player: player.user.username, ('user__username',)),
+    'level': _attr('level'),
+    'experience': _attr('experience'),
+    'total_points': _attr('total_points'),
+    'rank': Field(lambda player: getattr(player, 'rank', None)),
+}
+PLAYER_DEFAULT = ('id', 'username', 'level', 'total_points')
+
+STATS_FIELDS = (
+    'games_started', 'achievements_unlocked', 'reviews_written', 'tournaments_entered', 'best_finish',
+)
+
+ACHIEVEMENT_FIELDS = {
+    'id': _attr('pk', 'id'),
+    'name': _attr('name'),
+    'description': _attr('description'),
+    'difficulty': _attr('difficulty'),
+    'points': _attr('points'),
+    'experience_reward': _attr('experience_reward'),
+    'unlocked': Field(lambda achievement: achievement.is_unlocked),
+}
+ACHIEVEMENT_DEFAULT = ('id', 'name', 'difficulty', 'points', 'unlocked')
+
+TOURNAMENT_FIELDS = {
+    'id': _attr('pk', 'id'),
+    'name': _attr('name'),
+    'description': _attr('description'),
+    'game_id': _attr('game_id'),
+    'status': _attr('status'),
+    'prize_pool': _attr('prize_pool'),
+    'start_date': Field(lambda tournament: tournament.start_date.isoformat(), ('start_date',)),
+    'end_date': Field(lambda tournament: tournament.end_date.isoformat(), ('end_date',)),
+    'participants_count': _attr('participants_count'),
+    'max_participants': _attr('max_participants'),
+}
+TOURNAMENT_DEFAULT = ('id', 'name', 'game_id', 'status', 'start_date', 'end_date', 'participants_count')
+
+ENTRY_FIELDS = {
+    'rank': Field(lambda entry: entry.rank),
+    'player_id': _attr('player_id'),
+    'username': Field(lambda entry: entry.player.user.username, ('player__user__username',)),
+    'game_points': _attr('game_points'),
+    'game_level': _attr('game_level'),
+}
+
+RESULT_FIELDS = {
+    'position': _attr('position'),
+    'player_id': _attr('player_id'),
+    'username': Field(lambda result: result.player.user.username, ('player__user__username',)),
+    'score': _attr('score'),
+    'prize': _attr('prize'),
+}
+
+QUEST_FIELDS = {
+    'id': _attr('pk', 'id'),
+    'title': _attr('title'),
+    'description': _attr('description'),
+    'game_id': _attr('game_id'),
+    'reward_points': _attr('reward_points'),
+    'reward_experience': _attr('reward_experience'),
+    'ends_at': Field(lambda quest: quest.ends_at and quest.ends_at.isoformat(), ('ends_at',)),
+}
+
+
+def selected_fields(request, spec, default=None):
+    """Поля из ?fields=a,b; неизвестное поле - ошибка 400"""
+    raw = request.GET.get('fields')
+    if not raw:
+        return tuple(default or spec)
+    names = tuple(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+    unknown = [name for name in names if name not in spec]
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(unknown)}')
+    return names
+
+
+def only(queryset, spec, names, *required):
+    """Читать из базы только столбцы выбранных полей и ключа сортировки"""
+    columns = {column for name in names for column in spec[name].columns}
+    if not any('__' in column for column in columns):
+        # Связанные таблицы не нужны, и отложенный ключ нельзя присоединять
+        queryset = queryset.select_related(None)
+    return queryset.only(*columns, *required)
+
+
+def serialize(obj, spec, names):
+    return {name: spec[name].getter(obj) for name in names}
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', PAGE_SIZE))
+    except ValueError:
+        raise ApiError('limit должен быть числом')
+    return min(max(size, 1), MAX_PAGE_SIZE)
+
+
+def paginated(request, queryset, order, spec, names):
+    rows, next_cursor = keyset_page(queryset, order, request.GET.get('after'), page_size(request))
+    return JsonResponse({
+        'results': [serialize(row, spec, names) for row in rows],
+        'next': next_cursor,
+    })
+
+
+def json_body(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ApiError('Тело запроса должно быть JSON')
+    if not isinstance(data, dict):
+        raise ApiError('Ожидается JSON-объект')
+    return data
+
+
+@api_view(['GET'])
+@ensure_csrf_cookie
+def csrf_token(request):
+    """Токен для заголовка X-CSRFToken; cookie ставится в том же ответе"""
+    return JsonResponse({'csrf_token': get_token(request)})
+
+
+@api_view(['GET'])
+@versioned('games.Game')
+def games(request):
+    """Каталог: ?genre=, ?q= и курсор ?after="""
+    names = selected_fields(request, GAME_FIELDS, GAME_DEFAULT)
+    queryset = Game.objects.all()
+    if request.GET.get('genre'):
+        queryset = queryset.filter(genre=request.GET['genre'])
+    if request.GET.get('q'):
+        queryset = queryset.filter(game_text_filter(request.GET['q']))
+    return paginated(request, only(queryset, GAME_FIELDS, names, 'id'), ('-id',), GAME_FIELDS, names)
+
+
+@api_view(['GET'])
+@versioned('games.Game')
+def game_detail(request, pk):
+    names = selected_fields(request, GAME_FIELDS)
+    game = get_object_or_404(only(Game.objects.all(), GAME_FIELDS, names), pk=pk)
+    return JsonResponse(serialize(game, GAME_FIELDS, names))
+
+
+@api_view(['GET'])
+@versioned('games.Achievement', UNLOCKS, per_user=True)
+def game_achievements(request, pk):
+    names = selected_fields(request, ACHIEVEMENT_FIELDS, ACHIEVEMENT_DEFAULT)
+    player = request.user.player if request.user.is_authenticated else None
+    queryset = Achievement.objects.filter(game_id=pk).with_unlocked_for(player)
+    queryset = only(queryset, ACHIEVEMENT_FIELDS, names, 'id')
+    return paginated(request, queryset, ('id',), ACHIEVEMENT_FIELDS, names)
+
+
+@api_view(['GET'])
+@versioned('games.PlayerGame', 'games.Player', 'auth.User')
+def game_leaderboard(request, pk):
+    names = selected_fields(request, ENTRY_FIELDS)
+    queryset = only(game_ranking(pk), ENTRY_FIELDS, names, 'id', 'game_points')
+    return paginated(request, queryset, GAME_LEADERBOARD_ORDER, ENTRY_FIELDS, names)
+
+
+@api_view(['POST'], login=True)
+def start_game(request, pk):
+    game = get_object_or_404(Game, pk=pk)
+    _, created = PlayerGame.objects.get_or_create(player=request.user.player, game=game)
+    return JsonResponse({'started': created}, status=201 if created else 200)
+
+
+@api_view(['POST'], login=True)
+def review_game(request, pk):
+    """Создать или обновить свою рецензию: {"rating", "title", "text"}"""
+    game = get_object_or_404(Game, pk=pk)
+    player = request.user.player
+    review = game.reviews.filter(player=player).first()
+    form = GameReviewForm(json_body(request), instance=review)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+    created = review is None
+    review = form.save_for(player, game)
+    return JsonResponse({'id': review.pk}, status=201 if created else 200)
+
+
+@api_view(['POST'], login=True)
+def unlock_achievement(request, pk):
+    achievement = get_object_or_404(Achievement, pk=pk)
+    return JsonResponse({'unlocked': rewards.unlock_achievement(request.user.player, achievement)})
+
+
+@api_view(['GET'])
+@versioned('games.Player', 'auth.User')
+def leaderboard(request):
+    names = selected_fields(request, PLAYER_FIELDS, PLAYER_DEFAULT + ('rank',))
+    queryset = only(ranked_players(), PLAYER_FIELDS, names, 'id', 'level', 'experience')
+    return paginated(request, queryset, LEADERBOARD_ORDER, PLAYER_FIELDS, names)
+
+
+@api_view(['GET'])
+@versioned('games.Player', 'auth.User', 'games.PlayerStats', 'games.PlayerRank')
+def player_detail(request, username):
+    names = selected_fields(request, PLAYER_FIELDS, PLAYER_DEFAULT)
+    player = get_object_or_404(ranked_players(), user__username=username)
+    if 'rank' in names:
+        player.rank = player_rank(player)
+    data = serialize(player, PLAYER_FIELDS, names)
+    if request.GET.get('stats') != '0':
+        stats = stats_for(player)
+        data['stats'] = {field: getattr(stats, field) for field in STATS_FIELDS}
+        data['stats']['hours_played'] = float(stats.hours_played)
+    return JsonResponse(data)
+
+
+@api_view(['GET'])
+@versioned('games.Tournament')
+def tournaments(request):
+    """Турниры от новых к старым, ?status= фильтрует по статусу"""
+    names = selected_fields(request, TOURNAMENT_FIELDS, TOURNAMENT_DEFAULT)
+    queryset = Tournament.objects.all()
+    if request.GET.get('status'):
+        queryset = queryset.filter(status=request.GET['status'])
+    return paginated(request, only(queryset, TOURNAMENT_FIELDS, names, 'id'), ('-id',), TOURNAMENT_FIELDS, names)
+
+
+@api_view(['GET'])
+@versioned('games.Tournament')
+def tournament_detail(request, pk):
+    names = selected_fields(request, TOURNAMENT_FIELDS)
+    tournament = get_object_or_404(only(Tournament.objects.all(), TOURNAMENT_FIELDS, names), pk=pk)
+    return JsonResponse(serialize(tournament, TOURNAMENT_FIELDS, names))
+
+
+@api_view(['GET'])
+@versioned('games.TournamentResult', 'auth.User')
+def tournament_results(request, pk):
+    names = selected_fields(request, RESULT_FIELDS)
+    if not Tournament.objects.filter(pk=pk).exists():
+        raise Http404
+    results = only(
+        TournamentResult.objects.filter(tournament_id=pk).select_related('player__user'),
+        RESULT_FIELDS, names, 'id', 'position',
+    )
+    return paginated(request, results, ('position', 'id'), RESULT_FIELDS, names)
+
+
+@api_view(['POST'], login=True)
+def tournament_membership(request, pk, action):
+    tournament = get_object_or_404(Tournament, pk=pk)
+    player = request.user.player
+    if action == 'join':
+        changed = participation.join_tournament(player, tournament)
+        if not changed and not participation.is_participant(player, tournament):
+            raise ApiError('Мест нет', 409)
+    else:
+        changed = participation.leave_tournament(player, tournament)
+    return JsonResponse({'changed': changed})
+
+
+@api_view(['GET'], login=True)
+@versioned('games.DailyQuest', QUEST_PROGRESS, per_user=True)
+def quests(request):
+    """Активные квесты с прогрессом текущего игрока"""
+    names = selected_fields(request, QUEST_FIELDS)
+    active = list(only(DailyQuest.objects.filter(is_active=True), QUEST_FIELDS, names, 'id').order_by('id'))
+    progress = quests_service.progress_for(request.user.player, active)
+    results = []
+    for quest in active:
+        data = serialize(quest, QUEST_FIELDS, names)
+        data['progress'] = progress[quest.pk].progress
+        data['completed'] = progress[quest.pk].completed
+        results.append(data)
+    return JsonResponse({'results': results, 'next': None})
+
+
+@api_view(['POST'], login=True)
+def complete_quest(request, pk):
+    quest = get_object_or_404(DailyQuest.objects.filter(is_active=True), pk=pk)
+    return JsonResponse({'completed': rewards.complete_quest(request.user.player, quest)})
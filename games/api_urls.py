@@ -0,0 +1,25 @@
+from django.urls import path
+
+from . import api
+
+app_name = 'api'
+
+urlpatterns = [
+    path('csrf/', api.csrf_token, name='csrf'),
+    path('games/', api.games, name='games'),
+    path('games/<int:pk>/', api.game_detail, name='game_detail'),
+    path('games/<int:pk>/achievements/', api.game_achievements, name='game_achievements'),
+    path('games/<int:pk>/leaderboard/', api.game_leaderboard, name='game_leaderboard'),
+    path('games/<int:pk>/start/', api.start_game, name='start_game'),
+    path('games/<int:pk>/reviews/', api.review_game, name='review_game'),
+    path('achievements/<int:pk>/unlock/', api.unlock_achievement, name='unlock_achievement'),
+    path('leaderboard/', api.leaderboard, name='leaderboard'),
+    path('players/<str:username>/', api.player_detail, name='player_detail'),
+    path('tournaments/', api.tournaments, name='tournaments'),
+    path('tournaments/<int:pk>/', api.tournament_detail, name='tournament_detail'),
+    path('tournaments/<int:pk>/results/', api.tournament_results, name='tournament_results'),
+    path('tournaments/<int:pk>/join/', api.tournament_membership, {'action': 'join'}, name='join_tournament'),
+    path('tournaments/<int:pk>/leave/', api.tournament_membership, {'action': 'leave'}, name='leave_tournament'),
+    path('quests/', api.quests, name='quests'),
+    path('quests/<int:pk>/complete/', api.complete_quest, name='complete_quest'),
+]
@@ -4,3 +4,7 @@ class GamesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'games'
     verbose_name = 'Игры'
+
+    def ready(self):
+        # Модули регистрируют свои обработчики сигналов
+        from . import auth, cache, friends, images, search, stats  # noqa: F401
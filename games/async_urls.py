@@ -0,0 +1,20 @@
+from django.urls import path
+
+from . import async_views
+from .urls import urlpatterns as sync_urlpatterns
+
+# Маршруты games.urls, в которых читающие страницы заменены асинхронными
+ASYNC_VIEWS = {
+    'home': async_views.home,
+    'games_list': async_views.games_list,
+    'game_detail': async_views.game_detail,
+    'leaderboard': async_views.leaderboard,
+    'tournaments': async_views.tournaments,
+    'search_players': async_views.search_players,
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS[pattern.name], name=pattern.name)
+    if pattern.name in ASYNC_VIEWS else pattern
+    for pattern in sync_urlpatterns
+]
@@ -0,0 +1,196 @@
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404
+from django.shortcuts import render
+
+from . import cache, search
+from .catalog import asearch_catalog
+from .forms import CatalogSearchForm, PlayerSearchForm
+from .leaderboard import leaderboard_page, players_around
+from .models import Achievement, Game, Player, PlayerGame, Tournament
+from .pagination import InvalidCursor
+
+# Асинхронные версии читающих страниц для развёртывания под ASGI.
+# Шаблоны рендерятся синхронно, поэтому всё, к чему они обращаются,
+# загружается заранее: ленивый запрос из асинхронного кода запрещён.
+
+
+async def _list(queryset):
+    return [obj async for obj in queryset]
+
+
+async def _none():
+    return None
+
+
+async def _get_or_404(queryset, **lookup):
+    try:
+        return await queryset.aget(**lookup)
+    except queryset.model.DoesNotExist:
+        raise Http404
+
+
+def _load_user(request):
+    # Пользователь и его игрок читаются до рендера, шаблоны берут их из кэша объекта
+    user = request.user
+    if user.is_authenticated:
+        user.player
+    return user
+
+
+load_user = sync_to_async(_load_user)
+
+
+def login_required(view):
+    """login_required для корутин: в Django 4.2 декоратор их не поддерживает"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await load_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def _home_context():
+    popular_games, top_players, total_games, total_players, total_tournaments, total_achievements = (
+        await asyncio.gather(
+            _list(Game.objects.all()[:8]),
+            _list(Player.objects.select_related('user')[:5]),
+            Game.objects.acount(),
+            Player.objects.acount(),
+            Tournament.objects.acount(),
+            Achievement.objects.acount(),
+        )
+    )
+    return {
+        'popular_games': popular_games,
+        'top_players': top_players,
+        'total_games': total_games,
+        'total_players': total_players,
+        'total_tournaments': total_tournaments,
+        'total_achievements': total_achievements,
+    }
+
+
+async def home(request):
+    """Главная страница"""
+    context, _ = await asyncio.gather(
+        cache.acached('home', cache.VERSIONED_MODELS, _home_context),
+        load_user(request),
+    )
+    context['game_version'] = cache.model_versions('games.Game')[0]
+    context['card_timeout'] = cache.cache_timeout(cache.CARD_TIMEOUT)
+    return render(request, 'home.html', context)
+
+
+async def games_list(request):
+    """Список всех игр"""
+    form = CatalogSearchForm(request.GET)
+    params = form.cleaned_data if form.is_valid() else {}
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 1
+    catalog, _ = await asyncio.gather(asearch_catalog(params, page), load_user(request))
+
+    query = request.GET.copy()
+    query.pop('page', None)
+    facet_query = query.copy()
+    facet_query.pop('genre', None)
+
+    context = {
+        'form': form,
+        'games': catalog['games'],
+        'genres': catalog['facets'],
+        'total': catalog['total'],
+        'page': catalog['page'],
+        'pages': catalog['pages'],
+        'selected_genre': params.get('genre'),
+        'query_string': query.urlencode(),
+        'facet_query_string': facet_query.urlencode(),
+        'game_version': cache.model_versions('games.Game')[0],
+        'card_timeout': cache.cache_timeout(cache.CARD_TIMEOUT),
+    }
+    return render(request, 'games_list.html', context)
+
+
+async def game_detail(request, pk):
+    """Детали игры"""
+    game, user = await asyncio.gather(_get_or_404(Game.objects, pk=pk), load_user(request))
+    player = user.player if user.is_authenticated else None
+
+    players_count, reviews, player_game, achievements = await asyncio.gather(
+        game.players.acount(),
+        _list(game.reviews.select_related('player__user')),
+        PlayerGame.objects.filter(player=player, game=game).afirst() if player else _none(),
+        _list(game.achievements.with_unlocked_for(player)),
+    )
+
+    context = {
+        'game': game,
+        'achievements': achievements,
+        'players_count': players_count,
+        'player_game': player_game,
+        'reviews': reviews,
+    }
+    return render(request, 'game_detail.html', context)
+
+
+async def _leaderboard_page(cursor):
+    try:
+        return await sync_to_async(leaderboard_page)(cursor)
+    except InvalidCursor:
+        return await sync_to_async(leaderboard_page)()
+
+
+@login_required
+async def leaderboard(request):
+    """Таблица лидеров"""
+    # Keyset-запросы таблицы синхронные, но независимые, и выполняются параллельно
+    (players, next_cursor), around_me = await asyncio.gather(
+        _leaderboard_page(request.GET.get('after')),
+        sync_to_async(players_around)(request.user.player),
+    )
+
+    context = {
+        'players': players,
+        'next_cursor': next_cursor,
+        'around_me': around_me,
+    }
+    return render(request, 'leaderboard.html', context)
+
+
+@login_required
+async def tournaments(request):
+    """Список турниров"""
+    context = {
+        'tournaments': await _list(Tournament.objects.select_related('game')),
+        'player': request.user.player,
+    }
+    return render(request, 'tournaments.html', context)
+
+
+@login_required
+async def search_players(request):
+    """Поиск игроков"""
+    form = PlayerSearchForm(request.GET)
+    players = []
+    has_next = False
+    page = 1
+
+    if form.is_valid() and form.cleaned_data['search']:
+        page = search.page_number(request.GET.get('page'))
+        # Полнотекстовый индекс читается сырым SQL, у которого нет асинхронного API
+        players, has_next = await sync_to_async(search.search_players)(form.cleaned_data['search'], page)
+
+    context = {
+        'form': form,
+        'players': players,
+        'page': page,
+        'has_next': has_next,
+    }
+    return render(request, 'search_players.html', context)
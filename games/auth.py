@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_version, forget_users, user_key
+from .models import Player
+
+USER_TIMEOUT = 600
+
+
+def _load_user(user_id):
+    return get_user_model()._default_manager.select_related('player').filter(pk=user_id).first()
+
+
+class PlayerBackend(ModelBackend):
+    """ModelBackend, который читает пользователя вместе с игроком одним запросом"""
+
+    def get_user(self, user_id):
+        user = _load_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+
+class CachedPlayerBackend(PlayerBackend):
+    """PlayerBackend, который держит результат в кэше, пока не изменятся
+    этот пользователь или его игрок
+
+    Годится только для общего кэша (settings.CACHE_SHARED): сброс после выхода
+    или смены пароля должен дойти до всех процессов.
+    """
+
+    def get_user(self, user_id):
+        key = user_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = _load_user(user_id)
+            if user is not None:
+                cache.set(key, user, USER_TIMEOUT)
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+
+def _only_last_login(update_fields):
+    return update_fields is not None and set(update_fields) <= {'last_login'}
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_user(sender, instance, update_fields=None, **kwargs):
+    # Смена пароля, входа или прав должна сразу попасть в request.user
+    forget_users([instance.pk])
+    if not _only_last_login(update_fields):
+        # Имена пользователей входят в ETag ответов API
+        bump_version('auth.User')
+
+
+@receiver(post_save, sender=Player)
+@receiver(post_delete, sender=Player)
+def invalidate_player(sender, instance, **kwargs):
+    # Начисления через PlayerQuerySet.grant сбрасывают пользователей сами
+    forget_users([instance.user_id])
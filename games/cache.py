@@ -0,0 +1,145 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+# Модели, от версии которых зависят закэшированные страницы
+VERSIONED_MODELS = ('games.Game', 'games.Player', 'games.Tournament', 'games.Achievement')
+
+HOME_TIMEOUT = 300
+# Фрагменты карточек игр в шаблонах
+CARD_TIMEOUT = 600
+# Предельный срок записи в кэше одного процесса: сбросы из других
+# процессов он не видит, поэтому устаревшее живёт не дольше этого
+LOCAL_TIMEOUT = 30
+
+
+def cache_timeout(timeout):
+    """Срок жизни записи с учётом того, общий ли кэш (settings.CACHE_SHARED)"""
+    return timeout if settings.CACHE_SHARED else min(timeout, LOCAL_TIMEOUT)
+
+
+def _version_key(label):
+    return f'version:{label}'
+
+
+def _new_version():
+    # Версия начинается с текущего времени, а не с 1: если ключ версии
+    # вытеснят из кэша, новая версия не совпадёт ни с одной из старых
+    return time.time_ns()
+
+
+def model_versions(*labels):
+    """Текущие версии моделей в порядке аргументов"""
+    keys = [_version_key(label) for label in labels]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _incr_version(label):
+    key = _version_key(label)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), None)
+
+
+def bump_version(label):
+    """Сбросить всё, что закэшировано по данным модели
+
+    Внутри транзакции версия меняется сразу, чтобы сам запрос видел свои
+    изменения, и ещё раз после коммита: между ними другой запрос мог
+    закэшировать под новой версией строки до коммита.
+    """
+    if transaction.get_connection().in_atomic_block:
+        _incr_version(label)
+    transaction.on_commit(lambda: _incr_version(label))
+
+
+# Версии, которые не привязаны к одной модели: выдача достижений
+# и прогресс квестов (ETag API) и все кэшированные пользователи сразу
+UNLOCKS = 'games.Achievement_players'
+QUEST_PROGRESS = 'games.PlayerQuestProgress'
+CACHED_USERS = 'auth-users'
+
+
+def user_key(user_id):
+    """Ключ пользователя с игроком, которого кэширует games.auth
+
+    В ключ входит общая версия, поэтому массовое начисление сбрасывает
+    всех пользователей одним bump_version, не перечисляя их id.
+    """
+    version, = model_versions(CACHED_USERS)
+    return f'auth-user:{version}:{user_id}'
+
+
+def forget_users(user_ids):
+    """Сбросить закэшированных пользователей сразу и ещё раз после коммита"""
+    keys = [user_key(user_id) for user_id in user_ids]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _cached_key(name, labels):
+    versions = '.'.join(str(version) for version in model_versions(*labels))
+    return f'{name}:{versions}'
+
+
+def cached(name, labels, build, timeout=HOME_TIMEOUT):
+    """Значение build() под ключом, включающим версии моделей labels"""
+    key = _cached_key(name, labels)
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, cache_timeout(timeout))
+    return value
+
+
+def _lookup(name, labels):
+    key = _cached_key(name, labels)
+    return key, cache.get(key)
+
+
+async def _offload(func, *args):
+    # Кэш в памяти процесса отвечает сразу, а к общему обращения идут
+    # через sync_to_async, чтобы сеть не блокировала цикл событий
+    if settings.CACHE_SHARED:
+        return await sync_to_async(func)(*args)
+    return func(*args)
+
+
+async def acached(name, labels, build, timeout=HOME_TIMEOUT):
+    """То же для асинхронных представлений: build - корутинная функция"""
+    key, value = await _offload(_lookup, name, labels)
+    if value is None:
+        value = await build()
+        await _offload(cache.set, key, value, cache_timeout(timeout))
+    return value
+
+
+@receiver(post_save, sender='games.Game')
+@receiver(post_delete, sender='games.Game')
+@receiver(post_save, sender='games.Player')
+@receiver(post_delete, sender='games.Player')
+@receiver(post_save, sender='games.Tournament')
+@receiver(post_delete, sender='games.Tournament')
+@receiver(post_save, sender='games.Achievement')
+@receiver(post_delete, sender='games.Achievement')
+@receiver(post_save, sender='games.DailyQuest')
+@receiver(post_delete, sender='games.DailyQuest')
+@receiver(post_save, sender='games.PlayerGame')
+@receiver(post_delete, sender='games.PlayerGame')
+@receiver(post_save, sender='games.TournamentResult')
+@receiver(post_delete, sender='games.TournamentResult')
+def invalidate_model_cache(sender, **kwargs):
+    bump_version(sender._meta.label)
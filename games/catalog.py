@@ -0,0 +1,111 @@
+import asyncio
+import math
+from datetime import date
+
+from django.db.models import Count
+
+from .models import Game
+from .search import game_text_filter
+
+PAGE_SIZE = 24
+
+SORT_ORDERS = {
+    'new': ('-created_at',),
+    'score': ('-review_average', '-review_count'),
+    'rating': ('-rating',),
+    'release': ('-release_date',),
+}
+
+
+def _filtered(params):
+    """Игры по всем фильтрам, кроме жанра"""
+    games = Game.objects.all()
+    if params.get('q'):
+        games = games.filter(game_text_filter(params['q']))
+    if params.get('year_from'):
+        games = games.filter(release_date__gte=date(params['year_from'], 1, 1))
+    if params.get('year_to'):
+        games = games.filter(release_date__lte=date(params['year_to'], 12, 31))
+    if params.get('rating_min') is not None:
+        games = games.filter(rating__gte=params['rating_min'])
+    if params.get('rating_max') is not None:
+        games = games.filter(rating__lte=params['rating_max'])
+    if params.get('min_score') is not None:
+        games = games.filter(review_average__gte=params['min_score'])
+    return games
+
+
+def _sort_order(params):
+    return SORT_ORDERS.get(params.get('sort') or 'new', SORT_ORDERS['new'])
+
+
+def _page_bounds(total, page, per_page):
+    pages = max(math.ceil(total / per_page), 1)
+    return min(max(page, 1), pages), pages
+
+
+def _genre_total(facets, genre):
+    if genre:
+        return next((facet['count'] for facet in facets if facet['genre'] == genre), 0)
+    return sum(facet['count'] for facet in facets)
+
+
+def search_catalog(params, page=1, per_page=PAGE_SIZE):
+    """Страница каталога и счётчики по жанрам
+
+    params - cleaned_data формы CatalogSearchForm. Фасеты считаются по
+    всем фильтрам, кроме самого жанра, одним GROUP BY по индексу жанра.
+    Их сумма заменяет отдельный COUNT для пагинации.
+    """
+    games = _filtered(params)
+    facets = list(
+        games.order_by('genre').values('genre').annotate(count=Count('id'))
+    )
+
+    genre = params.get('genre')
+    if genre:
+        games = games.filter(genre=genre)
+    total = _genre_total(facets, genre)
+    page, pages = _page_bounds(total, page, per_page)
+    offset = (page - 1) * per_page
+
+    return {
+        'games': games.order_by(*_sort_order(params), '-id')[offset:offset + per_page],
+        'facets': facets,
+        'total': total,
+        'page': page,
+        'pages': pages,
+    }
+
+
+async def asearch_catalog(params, page=1, per_page=PAGE_SIZE):
+    """Асинхронный search_catalog: фасеты и запрошенная страница читаются
+    одновременно; страница перечитывается, только если номер был вне диапазона
+    """
+    games = _filtered(params)
+    facets_query = games.order_by('genre').values('genre').annotate(count=Count('id'))
+    genre = params.get('genre')
+    if genre:
+        games = games.filter(genre=genre)
+    games = games.order_by(*_sort_order(params), '-id')
+
+    async def read_page(number):
+        offset = (max(number, 1) - 1) * per_page
+        return [game async for game in games[offset:offset + per_page]]
+
+    async def read_facets():
+        return [facet async for facet in facets_query]
+
+    facets, rows = await asyncio.gather(read_facets(), read_page(page))
+    total = _genre_total(facets, genre)
+    clamped, pages = _page_bounds(total, page, per_page)
+    if clamped != max(page, 1):
+        rows = await read_page(clamped)
+
+    return {
+        'games': rows,
+        'facets': facets,
+        'total': total,
+        'page': clamped,
+        'pages': pages,
+    }
@@ -1,4 +1,7 @@
 from django import forms
+from django.db import transaction
+
+from . import activity
 from .models import GameReview, FriendRequest
 
 class GameReviewForm(forms.ModelForm):
@@ -19,6 +22,18 @@ class GameReviewForm(forms.ModelForm):
             }),
         }
 
+    def save_for(self, player, game):
+        """Сохранить рецензию игрока; о новой рецензии узнают друзья"""
+        review = self.save(commit=False)
+        is_new = review.pk is None
+        review.game = game
+        review.player = player
+        with transaction.atomic():
+            review.save()
+            if is_new:
+                activity.record(player, 'review', game_id=game.pk, subject=review.title, target_id=review.pk)
+        return review
+
 class PlayerSearchForm(forms.Form):
     """Форма для поиска игроков"""
     search = forms.CharField(
@@ -29,3 +44,44 @@ class PlayerSearchForm(forms.Form):
             'placeholder': 'Поиск игрока...'
         })
     )
+
+class CatalogSearchForm(forms.Form):
+    """Форма поиска и фильтров каталога игр"""
+    SORT_CHOICES = [
+        ('new', 'Новые'),
+        ('score', 'По оценке игроков'),
+        ('rating', 'По рейтингу'),
+        ('release', 'По дате выхода'),
+    ]
+
+    q = forms.CharField(
+        max_length=100,
+        required=False,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Название или описание...'
+        })
+    )
+    genre = forms.CharField(max_length=100, required=False, widget=forms.HiddenInput)
+    year_from = forms.IntegerField(
+        required=False, min_value=1950, max_value=2100,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'С года'})
+    )
+    year_to = forms.IntegerField(
+        required=False, min_value=1950, max_value=2100,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'По год'})
+    )
+    rating_min = forms.FloatField(
+        required=False, min_value=0, max_value=10,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Рейтинг от', 'step': '0.1'})
+    )
+    rating_max = forms.FloatField(
+        required=False, min_value=0, max_value=10,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Рейтинг до', 'step': '0.1'})
+    )
+    min_score = forms.FloatField(required=False, min_value=0, max_value=5, widget=forms.HiddenInput)
+    sort = forms.ChoiceField(
+        choices=SORT_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
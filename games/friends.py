@@ -0,0 +1,150 @@
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import cache_timeout
+from .models import FriendRequest, Friendship, Player, PlayerGame
+
+FRIENDS_TIMEOUT = 3600
+SUGGESTIONS_LIMIT = 10
+# Сколько кандидатов с наибольшим числом общих друзей дополнительно
+# сравнивается по общим играм
+SUGGESTION_CANDIDATES = 100
+
+
+def _adjacency_key(player_id):
+    return f'friends:{player_id}'
+
+
+def friend_ids_many(player_ids):
+    """Списки друзей сразу для нескольких игроков: player_id -> frozenset
+
+    Берутся из кэша смежности, промахи дочитываются одним запросом.
+    """
+    player_ids = set(player_ids)
+    keys = {_adjacency_key(player_id): player_id for player_id in player_ids}
+    found = cache.get_many(keys)
+    adjacency = {keys[key]: friends for key, friends in found.items()}
+
+    missing = player_ids - adjacency.keys()
+    if missing:
+        loaded = {player_id: set() for player_id in missing}
+        for player_id, friend_id in Friendship.objects.filter(player_id__in=missing).values_list('player_id', 'friend_id'):
+            loaded[player_id].add(friend_id)
+        loaded = {player_id: frozenset(friends) for player_id, friends in loaded.items()}
+        cache.set_many(
+            {_adjacency_key(player_id): friends for player_id, friends in loaded.items()},
+            cache_timeout(FRIENDS_TIMEOUT),
+        )
+        adjacency.update(loaded)
+    return adjacency
+
+
+def friend_ids(player_id):
+    return friend_ids_many([player_id])[player_id]
+
+
+def invalidate(*player_ids):
+    cache.delete_many([_adjacency_key(player_id) for player_id in player_ids])
+
+
+def are_friends(player, other):
+    return other.pk in friend_ids(player.pk)
+
+
+def friends_of(player):
+    """Друзья игрока по рейтингу; запрос идёт по списку id, а не по заявкам"""
+    return Player.objects.filter(pk__in=friend_ids(player.pk)).select_related('user')
+
+
+def mutual_friend_ids(player, other):
+    adjacency = friend_ids_many([player.pk, other.pk])
+    return adjacency[player.pk] & adjacency[other.pk]
+
+
+def suggestions(player, limit=SUGGESTIONS_LIMIT):
+    """Друзья друзей, упорядоченные по числу общих друзей, затем общих игр
+
+    У каждого игрока в результате есть атрибуты mutual_count и shared_games.
+    """
+    friends = friend_ids(player.pk)
+    if not friends:
+        return []
+
+    pending = FriendRequest.objects.filter(
+        Q(from_player=player) | Q(to_player=player), status='pending',
+    ).values_list('from_player_id', 'to_player_id')
+    excluded = set(friends) | {player.pk}
+    for from_id, to_id in pending:
+        excluded.update((from_id, to_id))
+
+    mutual = Counter()
+    for friends_of_friend in friend_ids_many(friends).values():
+        mutual.update(friends_of_friend - excluded)
+    candidates = dict(mutual.most_common(SUGGESTION_CANDIDATES))
+    if not candidates:
+        return []
+
+    shared_games = dict(
+        PlayerGame.objects
+        .filter(player_id__in=candidates, game__players__player=player)
+        .values('player_id').annotate(total=Count('*'))
+        .values_list('player_id', 'total')
+    )
+    ranked = sorted(
+        candidates,
+        key=lambda candidate: (-candidates[candidate], -shared_games.get(candidate, 0), candidate),
+    )[:limit]
+
+    players = Player.objects.select_related('user').in_bulk(ranked)
+    result = []
+    for candidate in ranked:
+        suggested = players.get(candidate)
+        if suggested is None:
+            continue
+        suggested.mutual_count = candidates[candidate]
+        suggested.shared_games = shared_games.get(candidate, 0)
+        result.append(suggested)
+    return result
+
+
+def _invalidate_pair(friend_request):
+    # Сброс сразу и ещё раз после коммита: между ними другой запрос
+    # мог успеть закэшировать старый список
+    pair = (friend_request.from_player_id, friend_request.to_player_id)
+    invalidate(*pair)
+    transaction.on_commit(lambda: invalidate(*pair))
+
+
+def _unlink_unless_accepted(friend_request):
+    # Встречная принятая заявка продолжает связывать тех же игроков
+    reverse_accepted = FriendRequest.objects.filter(
+        from_player_id=friend_request.to_player_id,
+        to_player_id=friend_request.from_player_id,
+        status='accepted',
+    ).exists()
+    if not reverse_accepted:
+        Friendship.objects.unlink(friend_request.from_player_id, friend_request.to_player_id)
+
+
+@receiver(post_save, sender=FriendRequest)
+def sync_friendship(sender, instance, created, **kwargs):
+    """Принятая заявка добавляет дружбу, отклонённая убирает её"""
+    if instance.status == 'accepted':
+        Friendship.objects.link(instance.from_player_id, instance.to_player_id)
+    elif created:
+        return
+    else:
+        _unlink_unless_accepted(instance)
+    _invalidate_pair(instance)
+
+
+@receiver(post_delete, sender=FriendRequest)
+def drop_friendship(sender, instance, **kwargs):
+    if instance.status == 'accepted':
+        _unlink_unless_accepted(instance)
+        _invalidate_pair(instance)
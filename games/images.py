@@ -0,0 +1,163 @@
+import hashlib
+import logging
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Размеры производных при плотности 1x, обрезка по центру до пропорций
+PRESETS = {
+    'cover': (400, 400),
+    'card': (400, 250),
+    'thumb': (400, 150),
+    'icon': (80, 80),
+}
+DENSITIES = (1, 2)
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+DERIVED_DIR = 'derived'
+LOSSLESS_EXTENSIONS = ('.png', '.gif', '.webp')
+# Битый, чужой или слишком большой (защита Pillow от бомб распаковки) файл
+IMAGE_ERRORS = (OSError, ValueError, Image.DecompressionBombError)
+
+# Какие производные строятся сразу после загрузки; другие размеры и старые
+# файлы строит команда build_image_derivatives, страницы сами ничего не строят
+FIELD_PRESETS = {
+    'games.Game': {'image': ('cover', 'card', 'thumb')},
+    'games.Achievement': {'icon': ('thumb', 'icon')},
+    'games.UserBadge': {'icon': ('icon',)},
+}
+
+
+def _digest_key(name):
+    return f'image-digest:{name}'
+
+
+def source_digest(file):
+    """Хеш содержимого оригинала; считается один раз и хранится в кэше"""
+    key = _digest_key(file.name)
+    digest = cache.get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with file.storage.open(file.name, 'rb') as source:
+            for chunk in iter(lambda: source.read(64 * 1024), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()[:16]
+        cache.set(key, digest, None)
+    return digest
+
+
+def fallback_format(file):
+    """Формат для браузеров без WebP: прозрачность сохраняется в PNG"""
+    return 'png' if file.name.lower().endswith(LOSSLESS_EXTENSIONS) else 'jpeg'
+
+
+def derivative_name(file, preset, density, fmt):
+    width, height = PRESETS[preset]
+    return f'{DERIVED_DIR}/{preset}/{source_digest(file)}-{width * density}x{height * density}.{fmt}'
+
+
+def derivative_names(file, preset):
+    """Имена производных одного размера: (плотность, формат) -> имя файла"""
+    return {
+        (density, fmt): derivative_name(file, preset, density, fmt)
+        for density in DENSITIES
+        for fmt in ('webp', fallback_format(file))
+    }
+
+
+def _built_key(file, preset):
+    return f'image-built:{source_digest(file)}:{preset}'
+
+
+def _render(image, size, fmt):
+    resized = ImageOps.fit(image, size, Image.LANCZOS)
+    output = BytesIO()
+    if fmt == 'webp':
+        resized.save(output, 'WEBP', quality=WEBP_QUALITY, method=4)
+    elif fmt == 'png':
+        resized.save(output, 'PNG', optimize=True)
+    else:
+        resized.convert('RGB').save(output, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def build_derivatives(file, presets, force=False):
+    """Создать недостающие производные для presets; оригинал открывается один раз
+
+    Возвращает словарь (preset, density, формат) -> имя файла в хранилище.
+    """
+    storage = file.storage
+    image = None
+    names = {}
+    for preset in presets:
+        width, height = PRESETS[preset]
+        for (density, fmt), name in derivative_names(file, preset).items():
+            names[preset, density, fmt] = name
+            if storage.exists(name):
+                if not force:
+                    continue
+                storage.delete(name)
+            if image is None:
+                image = _open(file)
+            storage.save(name, ContentFile(_render(image, (width * density, height * density), fmt)))
+        cache.set(_built_key(file, preset), True, None)
+    return names
+
+
+def _open(file):
+    with file.storage.open(file.name, 'rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+    return image
+
+
+def sources(file, preset):
+    """URL производных для srcset: {'webp': [(url, плотность)], 'fallback': [...]}
+
+    Готовность размера берётся из кэша по хешу оригинала, файлы проверяются
+    только при промахе кэша. Если производных ещё нет или оригинал
+    не читается, возвращается None, и шаблон показывает сам оригинал.
+    """
+    try:
+        names = derivative_names(file, preset)
+        key = _built_key(file, preset)
+        if not cache.get(key):
+            if not all(map(file.storage.exists, names.values())):
+                return None
+            cache.set(key, True, None)
+    except IMAGE_ERRORS as error:
+        logger.warning('Не удалось прочитать %s: %s', file.name, error)
+        return None
+
+    storage = file.storage
+    result = {'webp': [], 'fallback': []}
+    for (density, fmt), name in names.items():
+        kind = 'webp' if fmt == 'webp' else 'fallback'
+        result[kind].append((storage.url(name), density))
+    return result
+
+
+@receiver(post_save, sender='games.Game')
+@receiver(post_save, sender='games.Achievement')
+@receiver(post_save, sender='games.UserBadge')
+def build_on_upload(sender, instance, update_fields=None, **kwargs):
+    """Строить производные сразу после сохранения нового изображения"""
+    for field_name, presets in FIELD_PRESETS.get(sender._meta.label, {}).items():
+        if update_fields is not None and field_name not in update_fields:
+            continue
+        file = getattr(instance, field_name)
+        if not file:
+            continue
+        try:
+            build_derivatives(file, presets)
+        except IMAGE_ERRORS as error:
+            logger.warning('Не удалось построить производные %s: %s', file.name, error)
@@ -0,0 +1,183 @@
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.db import transaction
+
+from .cache import bump_version
+from .models import Game
+from .search import rebuild_game_index
+
+CHUNK_SIZE = 2000
+FORMATS = ('csv', 'ndjson')
+# Сколько отклонённых строк хранится в итоге импорта, остальные только считаются
+SHOWN_REJECTS = 20
+
+# Поля, которые перезаписываются у уже существующей игры с тем же названием
+UPSERT_FIELDS = ('description', 'genre', 'release_date', 'rating')
+
+
+@dataclass
+class ImportResult:
+    """Итог импорта: сколько строк прочитано, добавлено, обновлено, пропущено и отклонено
+
+    Из отклонённых строк хранятся только первые SHOWN_REJECTS, остальные
+    передаются в on_reject и учитываются лишь в счётчике rejected.
+    """
+    processed: int = 0
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    rejected: int = 0
+    first_rejects: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def imported(self):
+        return self.inserted + self.updated
+
+    @property
+    def rate(self):
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+
+def detect_format(path):
+    """Формат файла по расширению: csv или ndjson"""
+    suffix = str(path).rsplit('.', 1)[-1].lower()
+    if suffix == 'csv':
+        return 'csv'
+    if suffix in ('ndjson', 'jsonl'):
+        return 'ndjson'
+    raise ValueError(f'Неизвестный формат файла: {path}')
+
+
+def read_rows(stream, fmt):
+    """Строки файла по одной: пары (номер строки, словарь или текст ошибки)
+
+    Файл не читается в память целиком, поэтому размер не ограничен.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'ndjson':
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_number, 'некорректный JSON'
+                continue
+            yield line_number, row if isinstance(row, dict) else 'ожидается JSON-объект'
+    else:
+        raise ValueError(f'Неизвестный формат: {fmt}')
+
+
+def _text(row, name, max_length=None, required=True):
+    value = row.get(name)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise ValueError(f'{name}: обязательное поле')
+    if max_length and len(value) > max_length:
+        raise ValueError(f'{name}: длиннее {max_length} символов')
+    return value
+
+
+def clean_row(row):
+    """Проверенные значения полей Game; ValueError с причиной, если строка плохая"""
+    if isinstance(row, str):
+        raise ValueError(row)
+
+    values = {
+        'name': _text(row, 'name', Game._meta.get_field('name').max_length),
+        'description': _text(row, 'description', required=False),
+        'genre': _text(row, 'genre', Game._meta.get_field('genre').max_length),
+    }
+
+    release_date = row.get('release_date')
+    if isinstance(release_date, date):
+        values['release_date'] = release_date
+    else:
+        try:
+            values['release_date'] = date.fromisoformat(_text(row, 'release_date'))
+        except ValueError as error:
+            raise ValueError(f'release_date: {error}')
+
+    rating = row.get('rating')
+    if rating in (None, ''):
+        rating = 0
+    try:
+        values['rating'] = float(rating)
+    except (TypeError, ValueError):
+        raise ValueError(f'rating: не число ({rating!r})')
+    if not 0 <= values['rating'] <= 10:
+        raise ValueError('rating: вне диапазона 0..10')
+    return values
+
+
+def _write_chunk(games, update_existing):
+    """Записать пачку; возвращает, сколько названий из неё уже было в каталоге"""
+    options = (
+        {'update_conflicts': True, 'unique_fields': ['name'], 'update_fields': UPSERT_FIELDS}
+        if update_existing else {'ignore_conflicts': True}
+    )
+    with transaction.atomic():
+        existing = Game.objects.filter(name__in=[game.name for game in games]).count()
+        Game.objects.bulk_create(games, **options)
+    return existing
+
+
+def import_games(rows, chunk_size=CHUNK_SIZE, update_existing=True, on_chunk=None, on_reject=None):
+    """Загрузить игры из пар (номер строки, данные) пачками по chunk_size
+
+    Каждая пачка пишется одним INSERT ... ON CONFLICT (name): новые игры
+    добавляются, существующие обновляются или, при update_existing=False,
+    пропускаются. Повтор названия внутри пачки схлопывается в последнюю
+    строку, иначе СУБД откажется обновлять одну запись дважды. Отклонённые
+    строки сразу уходят в on_reject(номер строки, причина).
+    """
+    if chunk_size < 1:
+        raise ValueError('Размер пачки должен быть положительным')
+    result = ImportResult()
+    started = time.perf_counter()
+    chunk = {}
+
+    def flush():
+        existing = _write_chunk(list(chunk.values()), update_existing)
+        result.inserted += len(chunk) - existing
+        if update_existing:
+            result.updated += existing
+        else:
+            result.skipped += existing
+        chunk.clear()
+        if on_chunk:
+            result.elapsed = time.perf_counter() - started
+            on_chunk(result)
+
+    for line_number, row in rows:
+        result.processed += 1
+        try:
+            values = clean_row(row)
+        except ValueError as error:
+            result.rejected += 1
+            if len(result.first_rejects) < SHOWN_REJECTS:
+                result.first_rejects.append((line_number, str(error)))
+            if on_reject:
+                on_reject(line_number, str(error))
+            continue
+        chunk[values['name']] = Game(**values)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+    # bulk_create обходит сигналы, поэтому индекс и кэш обновляются явно
+    if result.imported:
+        rebuild_game_index()
+        bump_version('games.Game')
+
+    result.elapsed = time.perf_counter() - started
+    return result
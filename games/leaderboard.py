@@ -0,0 +1,120 @@
+from django.db import connection
+
+from .cache import bump_version
+from .friends import friend_ids
+from .models import Player, PlayerGame, PlayerRank
+from .pagination import assign_ranks, beyond, keyset_page, reversed_order, row_key
+
+PAGE_SIZE = 50
+AROUND_RADIUS = 10
+
+# Порядок совпадает с индексом player_leaderboard_idx, id разрешает ничьи
+LEADERBOARD_ORDER = ('-level', '-experience', 'id')
+# Порядок внутри игры, индекс playergame_game_rank_idx
+GAME_LEADERBOARD_ORDER = ('-game_points', 'id')
+
+
+def _rank(queryset, order, row):
+    """Место строки: число строк выше неё плюс один"""
+    return queryset.filter(beyond(order, row_key(row, order), forward=False)).count() + 1
+
+
+def _window(queryset, order, row, radius):
+    """Окно вокруг строки: radius выше, она сама и radius ниже"""
+    rank = _rank(queryset, order, row)
+    key = row_key(row, order)
+
+    above = list(queryset.filter(beyond(order, key, forward=False)).order_by(*reversed_order(order))[:radius])
+    above.reverse()
+    below = list(queryset.filter(beyond(order, key)).order_by(*order)[:radius])
+
+    window = above + [row] + below
+    return assign_ranks(window, rank - len(above))
+
+
+def ranked_players():
+    """Игроки в порядке таблицы лидеров вместе с пользователями"""
+    return Player.objects.select_related('user').order_by(*LEADERBOARD_ORDER)
+
+
+def leaderboard_page(cursor=None, size=PAGE_SIZE):
+    """Страница таблицы лидеров и курсор следующей страницы"""
+    return keyset_page(ranked_players(), LEADERBOARD_ORDER, cursor, size)
+
+
+def refresh_ranks():
+    """Пересчитать таблицу мест одним INSERT ... ON CONFLICT с ROW_NUMBER()
+
+    Порядок тот же, что LEADERBOARD_ORDER. Строки, чьё место не изменилось,
+    не переписываются; места удалённых игроков уходят каскадом.
+    Возвращает число записанных строк.
+    """
+    ranks = PlayerRank._meta.db_table
+    with connection.cursor() as cursor:
+        # WHERE true нужен SQLite, чтобы ON CONFLICT не читался как часть SELECT
+        cursor.execute(
+            f'''
+            INSERT INTO {ranks} (player_id, rank)
+            SELECT id, ROW_NUMBER() OVER (ORDER BY level DESC, experience DESC, id)
+            FROM {Player._meta.db_table} WHERE true
+            ON CONFLICT (player_id) DO UPDATE SET rank = excluded.rank
+            WHERE {ranks}.rank != excluded.rank
+            '''
+        )
+        changed = cursor.rowcount
+    if changed:
+        bump_version('games.PlayerRank')
+    return changed
+
+
+def player_rank(player):
+    """Место игрока из таблицы мест; None, пока её не пересчитали"""
+    return PlayerRank.objects.filter(player_id=player.pk).values_list('rank', flat=True).first()
+
+
+def players_around(player, radius=AROUND_RADIUS):
+    """Окно таблицы вокруг игрока по сохранённым местам, пусто до пересчёта"""
+    rank = player_rank(player)
+    if rank is None:
+        return []
+    rows = (
+        PlayerRank.objects.filter(rank__range=(rank - radius, rank + radius))
+        .select_related('player__user').order_by('rank')
+    )
+    window = []
+    for row in rows:
+        row.player.rank = row.rank
+        window.append(row.player)
+    return window
+
+
+def game_ranking(game):
+    """Прогресс игроков в игре в порядке очков"""
+    return (
+        PlayerGame.objects.filter(game=game)
+        .select_related('player__user')
+        .order_by(*GAME_LEADERBOARD_ORDER)
+    )
+
+
+def game_leaderboard_page(game, cursor=None, size=PAGE_SIZE):
+    """Страница таблицы игры: строки PlayerGame с атрибутом rank"""
+    return keyset_page(game_ranking(game), GAME_LEADERBOARD_ORDER, cursor, size)
+
+
+def game_entries_around(entry, radius=AROUND_RADIUS):
+    return _window(game_ranking(entry.game_id), GAME_LEADERBOARD_ORDER, entry, radius)
+
+
+def friends_leaderboard(player, game=None):
+    """Игрок и его друзья в порядке общей таблицы или таблицы игры
+
+    Друзей немного, поэтому они ранжируются целиком одним запросом
+    по списку id из кэша смежности.
+    """
+    member_ids = friend_ids(player.pk) | {player.pk}
+    if game is None:
+        rows = ranked_players().filter(pk__in=member_ids)
+    else:
+        rows = game_ranking(game).filter(player_id__in=member_ids)
+    return assign_ranks(list(rows), 1)
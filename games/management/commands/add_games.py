@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand
+from games.importer import import_games
 from games.models import Game
 from datetime import date
 
@@ -93,24 +94,20 @@ class Command(BaseCommand):
             },
         ]
 
+        existing = set(
+            Game.objects.filter(name__in=[game['name'] for game in games_data])
+            .values_list('name', flat=True)
+        )
+        import_games(enumerate(games_data, 1), update_existing=False)
+
         for game_data in games_data:
-            game, created = Game.objects.get_or_create(
-                name=game_data['name'],
-                defaults={
-                    'description': game_data['description'],
-                    'genre': game_data['genre'],
-                    'release_date': game_data['release_date'],
-                    'rating': game_data['rating'],
-                }
-            )
-            
-            if created:
+            if game_data['name'] not in existing:
                 self.stdout.write(
-                    self.style.SUCCESS(f'✓ Добавлена игра: {game.name}')
+                    self.style.SUCCESS(f'✓ Добавлена игра: {game_data["name"]}')
                 )
             else:
                 self.stdout.write(
-                    self.style.WARNING(f'⚠ Игра уже существует: {game.name}')
+                    self.style.WARNING(f'⚠ Игра уже существует: {game_data["name"]}')
                 )
 
         self.stdout.write(
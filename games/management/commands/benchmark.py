@@ -0,0 +1,202 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from games import urls as game_urls
+from games.models import Achievement, DailyQuest, Game, Tournament
+
+# Маршруты, которые разрушают сессию замера
+SKIPPED_ROUTES = {'logout'}
+# Маршруты, принимающие только POST; их обработчики идемпотентны
+POST_ROUTES = {'start_game', 'add_achievement', 'send_friend_request', 'complete_quest'}
+# Корневые URLconf развёртываний: под ASGI читающие страницы асинхронные
+SERVER_URLCONFS = {'wsgi': 'games.urls', 'asgi': 'games.async_urls'}
+
+
+def percentile(samples, percent):
+    """Перцентиль по отсортированным замерам, метод ближайшего ранга"""
+    ordered = sorted(samples)
+    index = max(int(round(percent / 100 * len(ordered))) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def summarize(samples, elapsed):
+    """Сводка по замерам в миллисекундах"""
+    return {
+        'requests': len(samples),
+        'p50_ms': round(percentile(samples, 50) * 1000, 2),
+        'p95_ms': round(percentile(samples, 95) * 1000, 2),
+        'p99_ms': round(percentile(samples, 99) * 1000, 2),
+        'mean_ms': round(statistics.fmean(samples) * 1000, 2),
+        'rps': round(len(samples) / elapsed, 1) if elapsed else None,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Замеряет задержку и пропускную способность маршрутов games/urls.py под WSGI и ASGI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Запросов на маршрут')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--concurrency', type=int, default=1, help='Одновременных запросов')
+        parser.add_argument('--server', choices=['wsgi', 'asgi', 'both'], default='wsgi',
+                            help='Обработчик: WSGI с потоками, ASGI с корутинами или оба для сравнения')
+        parser.add_argument('--username', help='Игрок, от имени которого идут запросы')
+        parser.add_argument('--route', action='append', dest='routes', help='Замерить только эти маршруты')
+        parser.add_argument('--output', help='JSON-файл отчёта (по умолчанию benchmarks/<время>.json)')
+
+    def handle(self, *args, **options):
+        user = self.pick_user(options['username'])
+        client = Client()
+        client.force_login(user)
+        self.cookies = client.cookies
+        route_kwargs = self.route_kwargs(user)
+        servers = ['wsgi', 'asgi'] if options['server'] == 'both' else [options['server']]
+
+        results = {server: {} for server in servers}
+        for pattern in game_urls.urlpatterns:
+            if not isinstance(pattern, URLPattern) or pattern.name in SKIPPED_ROUTES:
+                continue
+            if options['routes'] and pattern.name not in options['routes']:
+                continue
+            kwargs = route_kwargs.get(pattern.name, {})
+            if pattern.pattern.converters and not kwargs:
+                self.stdout.write(self.style.WARNING(f'- {pattern.name}: нет данных, пропущен'))
+                continue
+
+            url = reverse(pattern.name, kwargs=kwargs)
+            method = 'post' if pattern.name in POST_ROUTES else 'get'
+            for server in servers:
+                measure = self.measure_asgi if server == 'asgi' else self.measure_wsgi
+                with override_settings(ROOT_URLCONF=SERVER_URLCONFS[server]):
+                    summary = measure(method, url, options['requests'], options['warmup'], options['concurrency'])
+                results[server][pattern.name] = summary
+                self.stdout.write(
+                    f"{pattern.name:<22} {server}  p50={summary['p50_ms']:>8} мс  p95={summary['p95_ms']:>8} мс  "
+                    f"p99={summary['p99_ms']:>8} мс  {summary['rps']} rps"
+                )
+
+        report = {
+            'started_at': timezone.now().isoformat(),
+            'username': user.username,
+            'requests_per_route': options['requests'],
+            'concurrency': options['concurrency'],
+            'servers': results,
+        }
+        if len(servers) == 2:
+            report['asgi_speedup'] = self.compare(results)
+        output_path = Path(options['output'] or f"benchmarks/{timezone.now():%Y%m%d-%H%M%S}.json")
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(f'\n✓ Результаты сохранены в {output_path}'))
+
+    def compare(self, results):
+        """Отношение rps ASGI к WSGI по каждому маршруту"""
+        speedup = {}
+        for name, wsgi in results['wsgi'].items():
+            asgi = results['asgi'][name]
+            if wsgi['rps'] and asgi['rps']:
+                speedup[name] = round(asgi['rps'] / wsgi['rps'], 2)
+                self.stdout.write(f'{name:<22} ASGI/WSGI: {speedup[name]}x')
+        return speedup
+
+    def summarize(self, timings, elapsed, method, url):
+        summary = summarize([duration for duration, _ in timings], elapsed)
+        summary.update({
+            'url': url,
+            'method': method.upper(),
+            'statuses': sorted({status for _, status in timings}),
+        })
+        return summary
+
+    def measure_wsgi(self, method, url, requests, warmup, concurrency):
+        """Синхронный обработчик, по клиенту и соединению с базой на поток"""
+        local = threading.local()
+
+        def send(_):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client()
+                client.cookies = deepcopy(self.cookies)
+            started = time.perf_counter()
+            response = getattr(client, method)(url)
+            return time.perf_counter() - started, response.status_code
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(send, range(warmup)))
+            started = time.perf_counter()
+            timings = list(pool.map(send, range(requests)))
+            elapsed = time.perf_counter() - started
+        return self.summarize(timings, elapsed, method, url)
+
+    def measure_asgi(self, method, url, requests, warmup, concurrency):
+        """Асинхронный обработчик: concurrency корутин в одном цикле событий"""
+        async def run():
+            client = AsyncClient()
+            client.cookies = deepcopy(self.cookies)
+            slots = asyncio.Semaphore(concurrency)
+
+            async def send():
+                async with slots:
+                    started = time.perf_counter()
+                    response = await getattr(client, method)(url)
+                    return time.perf_counter() - started, response.status_code
+
+            await asyncio.gather(*(send() for _ in range(warmup)))
+            started = time.perf_counter()
+            timings = await asyncio.gather(*(send() for _ in range(requests)))
+            return timings, time.perf_counter() - started
+
+        timings, elapsed = asyncio.run(run())
+        return self.summarize(timings, elapsed, method, url)
+
+    def pick_user(self, username):
+        users = User.objects.select_related('player')
+        if username:
+            try:
+                return users.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь {username} не найден')
+        user = users.filter(player__games__isnull=False).order_by('pk').first()
+        if user is None:
+            raise CommandError('Нет игроков с играми, сначала запустите generate_data')
+        return user
+
+    def route_kwargs(self, user):
+        """Аргументы URL для маршрутов с параметрами, если нашлись данные"""
+        kwargs = {'player_profile': {'username': user.username}}
+
+        game = Game.objects.filter(players__player=user.player).order_by('pk').first()
+        if game:
+            kwargs['game_detail'] = {'pk': game.pk}
+            kwargs['add_review'] = {'game_id': game.pk}
+            kwargs['start_game'] = {'game_id': game.pk}
+
+        achievement = Achievement.objects.order_by('pk').first()
+        if achievement:
+            kwargs['add_achievement'] = {'achievement_id': achievement.pk}
+
+        tournament = Tournament.objects.order_by('pk').first()
+        if tournament:
+            kwargs['tournament_detail'] = {'pk': tournament.pk}
+
+        quest = DailyQuest.objects.filter(is_active=True).order_by('pk').first()
+        if quest:
+            kwargs['complete_quest'] = {'quest_id': quest.pk}
+
+        other = User.objects.exclude(pk=user.pk).filter(player__isnull=False).select_related('player').order_by('pk').first()
+        if other:
+            kwargs['send_friend_request'] = {'player_id': other.player.pk}
+        return kwargs
@@ -0,0 +1,41 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from games.images import FIELD_PRESETS, IMAGE_ERRORS, PRESETS, build_derivatives
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры и WebP-варианты для уже загруженных изображений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--preset', action='append', choices=sorted(PRESETS),
+                            help='Только указанные размеры (можно повторять)')
+        parser.add_argument('--force', action='store_true', help='Перестроить существующие файлы')
+
+    def handle(self, *args, **options):
+        built = failed = 0
+        for label, fields in FIELD_PRESETS.items():
+            model = apps.get_model(label)
+            for field_name, presets in fields.items():
+                if options['preset']:
+                    presets = [preset for preset in presets if preset in options['preset']]
+                if not presets:
+                    continue
+                files = (
+                    model.objects.filter(**{f'{field_name}__gt': ''})
+                    .values_list(field_name, flat=True).distinct()
+                )
+                field = model._meta.get_field(field_name)
+                for name in files.iterator():
+                    file = field.attr_class(None, field, name)
+                    try:
+                        build_derivatives(file, presets, force=options['force'])
+                    except IMAGE_ERRORS as error:
+                        failed += 1
+                        self.stderr.write(f'{name}: {error}')
+                    else:
+                        built += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ Производные построены для {built} изображений, ошибок: {failed}')
+        )
@@ -0,0 +1,41 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from games.models import Tournament
+from games.standings import finalize_tournament, ingest_scores
+
+
+class Command(BaseCommand):
+    help = 'Подводит итоги турнира: места по очкам, распределение фонда и начисление призов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament_id', type=int)
+        parser.add_argument('--scores', help='CSV с колонками player_id,score для загрузки перед подведением итогов')
+
+    def handle(self, *args, **options):
+        try:
+            tournament = Tournament.objects.get(pk=options['tournament_id'])
+        except Tournament.DoesNotExist:
+            raise CommandError(f'Турнир {options["tournament_id"]} не найден')
+
+        started = time.perf_counter()
+        if options['scores']:
+            with open(options['scores'], newline='', encoding='utf-8') as stream:
+                try:
+                    scores = [(int(row['player_id']), int(row['score'])) for row in csv.DictReader(stream)]
+                except (KeyError, TypeError, ValueError) as error:
+                    raise CommandError(f'Некорректный файл очков: {error}')
+            ingested = ingest_scores(tournament, scores)
+            self.stdout.write(f'Загружено очков: {ingested} из {len(scores)}')
+
+        result = finalize_tournament(tournament)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ {tournament.name}: {result.participants} участников, '
+                f'призовых мест {result.winners}, начислено игрокам {result.credited} '
+                f'за {elapsed:.2f} с'
+            )
+        )
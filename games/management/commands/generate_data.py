@@ -0,0 +1,276 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from games import stats
+from games.leaderboard import refresh_ranks
+from games.cache import QUEST_PROGRESS, UNLOCKS, VERSIONED_MODELS, bump_version
+from games.models import (
+    Achievement, DailyQuest, Game, GameReview, Player, PlayerGame, PlayerQuestProgress,
+    Tournament, experience_for_level,
+)
+from games.search import rebuild_indexes
+
+GENRES = [
+    'RPG', 'Action RPG', 'Shooter', 'MOBA', 'Strategy',
+    'Adventure', 'Co-op Shooter', 'Simulator', 'Racing', 'Puzzle',
+]
+FIRST_NAMES = ['Алия', 'Ерлан', 'Иван', 'Мария', 'Нурлан', 'Анна', 'Timur', 'Alex', 'Dana', 'Max']
+LAST_NAMES = ['Иванов', 'Сериков', 'Ким', 'Петрова', 'Smith', 'Lee', 'Novak', 'Ахметов']
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class Command(BaseCommand):
+    help = 'Генерирует синтетический набор данных для нагрузочных замеров'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--games', type=int, default=500)
+        parser.add_argument('--games-per-player', type=int, default=10)
+        parser.add_argument('--achievements-per-game', type=int, default=5)
+        parser.add_argument('--unlocks-per-player', type=int, default=3)
+        parser.add_argument('--reviews', type=int, default=20000)
+        parser.add_argument('--tournaments', type=int, default=100)
+        parser.add_argument('--participants', type=int, default=50)
+        parser.add_argument('--quests', type=int, default=20)
+        parser.add_argument('--quest-players', type=int, default=None,
+                            help='Сколько игроков получат прогресс квестов (по умолчанию половина)')
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix']
+
+        player_ids = self.step('Пользователи и игроки', self.create_players, options['users'])
+        game_ids = self.step('Игры', self.create_games, options['games'])
+        self.step('Прогресс в играх', self.create_player_games, player_ids, game_ids,
+                  options['games_per_player'])
+        achievement_ids = self.step('Достижения', self.create_achievements, game_ids,
+                                    options['achievements_per_game'])
+        self.step('Полученные достижения', self.unlock_achievements, player_ids, achievement_ids,
+                  options['unlocks_per_player'])
+        self.step('Рецензии', self.create_reviews, player_ids, game_ids, options['reviews'])
+        self.step('Турниры', self.create_tournaments, player_ids, game_ids,
+                  options['tournaments'], options['participants'])
+        quest_players = options['quest_players']
+        if quest_players is None:
+            quest_players = len(player_ids) // 2
+        self.step('Квесты', self.create_quests, player_ids[:quest_players], game_ids, options['quests'])
+
+        # bulk_create обходит сигналы, поэтому производные данные пересчитываются явно
+        self.step('Счётчики рецензий', call_command, 'rebuild_review_stats', stdout=self.stdout)
+        self.step('Статистика игроков', stats.recount, player_ids)
+        self.step('Места в таблице лидеров', refresh_ranks)
+        self.step('Поисковые индексы', rebuild_indexes)
+        for label in (*VERSIONED_MODELS, UNLOCKS, QUEST_PROGRESS):
+            bump_version(label)
+
+        self.stdout.write(self.style.SUCCESS('\n✓ Данные сгенерированы'))
+
+    def step(self, title, func, *args, **kwargs):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+        size = f' ({len(result)})' if isinstance(result, list) else ''
+        self.stdout.write(f'{title}{size}: {elapsed:.1f} с')
+        return result
+
+    def create_players(self, count):
+        password = make_password('benchmark')
+        player_ids = []
+        for numbers in chunks(range(count), self.batch_size):
+            names = [f'{self.prefix}_user{n}' for n in numbers]
+            User.objects.bulk_create(
+                [
+                    User(
+                        username=name,
+                        email=f'{name}@example.com',
+                        first_name=self.random.choice(FIRST_NAMES),
+                        last_name=self.random.choice(LAST_NAMES),
+                        password=password,
+                    )
+                    for name in names
+                ],
+                batch_size=self.batch_size,
+                ignore_conflicts=True,
+            )
+            user_ids = list(User.objects.filter(username__in=names).values_list('pk', flat=True))
+
+            players = []
+            for user_id in user_ids:
+                level = self.random.randint(1, 60)
+                players.append(Player(
+                    user_id=user_id,
+                    level=level,
+                    experience=self.random.randrange(level * 100),
+                    total_points=self.random.randint(0, experience_for_level(level) // 10),
+                ))
+            Player.objects.bulk_create(players, batch_size=self.batch_size, ignore_conflicts=True)
+            player_ids.extend(
+                Player.objects.filter(user_id__in=user_ids).values_list('pk', flat=True)
+            )
+        return player_ids
+
+    def create_games(self, count):
+        game_ids = []
+        for numbers in chunks(range(count), self.batch_size):
+            names = [f'{self.prefix} Game {n}' for n in numbers]
+            Game.objects.bulk_create(
+                [
+                    Game(
+                        name=name,
+                        description=f'Синтетическая игра {name} для нагрузочных тестов.',
+                        genre=self.random.choice(GENRES),
+                        release_date=date(2000, 1, 1) + timedelta(days=self.random.randrange(9000)),
+                        rating=round(self.random.uniform(5, 10), 1),
+                    )
+                    for name in names
+                ],
+                batch_size=self.batch_size,
+                ignore_conflicts=True,
+            )
+            game_ids.extend(Game.objects.filter(name__in=names).values_list('pk', flat=True))
+        return game_ids
+
+    def create_player_games(self, player_ids, game_ids, per_player):
+        per_player = min(per_player, len(game_ids))
+        players_per_batch = max(self.batch_size // max(per_player, 1), 1)
+        created = 0
+        for batch in chunks(player_ids, players_per_batch):
+            rows = [
+                PlayerGame(
+                    player_id=player_id,
+                    game_id=game_id,
+                    hours_played=Decimal(self.random.randrange(5000)) / 10,
+                    game_level=self.random.randint(1, 100),
+                    game_points=self.random.randint(0, 100000),
+                )
+                for player_id in batch
+                for game_id in self.random.sample(game_ids, per_player)
+            ]
+            PlayerGame.objects.bulk_create(rows, batch_size=self.batch_size, ignore_conflicts=True)
+            created += len(rows)
+        self.stdout.write(f'  строк прогресса: {created}')
+        return created
+
+    def create_achievements(self, game_ids, per_game):
+        difficulties = [choice for choice, _ in Achievement.DIFFICULTY_CHOICES]
+        rows = [
+            Achievement(
+                name=f'Достижение {n + 1}',
+                description='Синтетическое достижение',
+                game_id=game_id,
+                difficulty=self.random.choice(difficulties),
+                points=self.random.choice([10, 25, 50, 100]),
+                experience_reward=self.random.choice([50, 100, 200]),
+            )
+            for game_id in game_ids
+            for n in range(per_game)
+        ]
+        Achievement.objects.bulk_create(rows, batch_size=self.batch_size)
+        return list(Achievement.objects.filter(game_id__in=game_ids).values_list('pk', flat=True))
+
+    def unlock_achievements(self, player_ids, achievement_ids, per_player):
+        membership = Achievement.players.through
+        per_player = min(per_player, len(achievement_ids))
+        players_per_batch = max(self.batch_size // max(per_player, 1), 1)
+        for batch in chunks(player_ids, players_per_batch):
+            rows = [
+                membership(player_id=player_id, achievement_id=achievement_id)
+                for player_id in batch
+                for achievement_id in self.random.sample(achievement_ids, per_player)
+            ]
+            membership.objects.bulk_create(rows, batch_size=self.batch_size, ignore_conflicts=True)
+
+    def create_reviews(self, player_ids, game_ids, count):
+        for sizes in chunks(range(count), self.batch_size):
+            rows = [
+                GameReview(
+                    game_id=self.random.choice(game_ids),
+                    player_id=self.random.choice(player_ids),
+                    rating=self.random.choices(range(1, 6), weights=[1, 2, 4, 6, 5])[0],
+                    title='Синтетическая рецензия',
+                    text='Текст рецензии для нагрузочных тестов.',
+                )
+                for _ in sizes
+            ]
+            GameReview.objects.bulk_create(rows, batch_size=self.batch_size, ignore_conflicts=True)
+
+    def create_tournaments(self, player_ids, game_ids, count, participants):
+        now = timezone.now()
+        statuses = [status for status, _ in Tournament.STATUS_CHOICES]
+        names = [f'{self.prefix} Турнир {n}' for n in range(count)]
+        tournaments = []
+        for name in names:
+            start = now + timedelta(days=self.random.randint(-30, 30))
+            tournaments.append(Tournament(
+                name=name,
+                description='Синтетический турнир',
+                game_id=self.random.choice(game_ids),
+                prize_pool=self.random.choice([1000, 5000, 10000]),
+                status=self.random.choice(statuses),
+                start_date=start,
+                end_date=start + timedelta(days=self.random.randint(1, 7)),
+                max_participants=max(participants, 1) * 2,
+            ))
+        Tournament.objects.bulk_create(tournaments, batch_size=self.batch_size)
+
+        membership = Tournament.participants.through
+        tournament_ids = list(Tournament.objects.filter(name__in=names).values_list('pk', flat=True))
+        per_tournament = min(participants, len(player_ids))
+        for tournament_id in tournament_ids:
+            membership.objects.bulk_create(
+                [
+                    membership(tournament_id=tournament_id, player_id=player_id)
+                    for player_id in self.random.sample(player_ids, per_tournament)
+                ],
+                batch_size=self.batch_size,
+                ignore_conflicts=True,
+            )
+        Tournament.objects.filter(pk__in=tournament_ids).recount_participants()
+        return tournament_ids
+
+    def create_quests(self, player_ids, game_ids, count):
+        titles = [f'{self.prefix} Квест {n}' for n in range(count)]
+        DailyQuest.objects.bulk_create([
+            DailyQuest(
+                title=title,
+                description='Синтетический ежедневный квест',
+                game_id=self.random.choice(game_ids),
+                reward_points=self.random.choice([25, 50, 100]),
+                reward_experience=self.random.choice([50, 100, 150]),
+            )
+            for title in titles
+        ])
+        quest_ids = list(DailyQuest.objects.filter(title__in=titles).values_list('pk', flat=True))
+
+        players_per_batch = max(self.batch_size // max(len(quest_ids), 1), 1)
+        for batch in chunks(player_ids, players_per_batch):
+            PlayerQuestProgress.objects.bulk_create(
+                [
+                    PlayerQuestProgress(
+                        player_id=player_id,
+                        quest_id=quest_id,
+                        progress=self.random.choice([0, 0, 25, 50, 75]),
+                    )
+                    for player_id in batch
+                    for quest_id in quest_ids
+                ],
+                batch_size=self.batch_size,
+                ignore_conflicts=True,
+            )
+        return quest_ids
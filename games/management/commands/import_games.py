@@ -0,0 +1,61 @@
+import json
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from games.importer import CHUNK_SIZE, FORMATS, SHOWN_REJECTS, detect_format, import_games, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Импортирует каталог игр из CSV или NDJSON файла любого размера'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл каталога (.csv, .ndjson или .jsonl)')
+        parser.add_argument('--format', choices=FORMATS, help='Формат, если его не видно по расширению')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--no-update', action='store_true',
+                            help='Не изменять уже существующие игры')
+        parser.add_argument('--rejects', help='Записать все отклонённые строки в NDJSON-файл')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'Файл {path} не найден')
+        try:
+            fmt = options['format'] or detect_format(path)
+        except ValueError as error:
+            raise CommandError(str(error))
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size должен быть положительным')
+
+        with ExitStack() as stack:
+            stream = stack.enter_context(path.open(encoding='utf-8-sig', newline=''))
+            on_reject = None
+            if options['rejects']:
+                rejects = stack.enter_context(open(options['rejects'], 'w', encoding='utf-8'))
+
+                def on_reject(line_number, error):
+                    rejects.write(json.dumps({'line': line_number, 'error': error}, ensure_ascii=False) + '\n')
+
+            result = import_games(
+                read_rows(stream, fmt),
+                chunk_size=options['chunk_size'],
+                update_existing=not options['no_update'],
+                on_chunk=self.progress,
+                on_reject=on_reject,
+            )
+
+        for line_number, error in result.first_rejects:
+            self.stdout.write(self.style.WARNING(f'⚠ Строка {line_number}: {error}'))
+        if result.rejected > len(result.first_rejects):
+            self.stdout.write(self.style.WARNING(f'⚠ ... и ещё {result.rejected - len(result.first_rejects)}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✓ Из {result.processed} строк добавлено {result.inserted}, обновлено {result.updated}, '
+            f'пропущено {result.skipped}, отклонено {result.rejected} за {result.elapsed:.1f} с '
+            f'({result.rate:.0f} строк/с)'
+        ))
+
+    def progress(self, result):
+        self.stdout.write(f'  {result.processed} строк, {result.rate:.0f} строк/с')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from games.stats import BATCH_SIZE, recount
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводную статистику всех игроков по исходным таблицам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        updated = recount(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ Пересчитана статистика {updated} игроков')
+        )
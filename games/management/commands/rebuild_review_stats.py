@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from games.models import REVIEW_STARS, Game, GameReview
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики и гистограмму рецензий для всех игр'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        stars_fields = [f'stars_{stars}' for stars in REVIEW_STARS]
+
+        stats = GameReview.objects.order_by().values('game_id').annotate(
+            review_count=Count('id'),
+            review_sum=Sum('rating'),
+            **{f'stars_{stars}': Count('id', filter=Q(rating=stars)) for stars in REVIEW_STARS},
+        )
+
+        with transaction.atomic():
+            Game.objects.update(
+                review_count=0, review_sum=0, review_average=0,
+                **{field: 0 for field in stars_fields},
+            )
+
+            batch = []
+            updated = 0
+            for row in stats.iterator(chunk_size=batch_size):
+                game = Game(pk=row['game_id'])
+                game.review_count = row['review_count']
+                game.review_sum = row['review_sum']
+                game.review_average = row['review_sum'] / row['review_count']
+                for field in stars_fields:
+                    setattr(game, field, row[field])
+                batch.append(game)
+
+                if len(batch) >= batch_size:
+                    updated += self._flush(batch, stars_fields)
+                    batch = []
+            updated += self._flush(batch, stars_fields)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ Пересчитаны рецензии для {updated} игр')
+        )
+
+    def _flush(self, batch, stars_fields):
+        if not batch:
+            return 0
+        Game.objects.bulk_update(
+            batch,
+            ['review_count', 'review_sum', 'review_average', *stars_fields],
+        )
+        return len(batch)
@@ -0,0 +1,31 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from games.quests import ACTIVE_DAYS, BATCH_SIZE, archive_progress, seed_progress
+
+
+class Command(BaseCommand):
+    help = 'Архивирует прогресс ежедневных квестов и готовит строки на новый день'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--day', type=date.fromisoformat,
+            help='День, за который архивируется прогресс (по умолчанию вчера)',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--active-days', type=int, default=ACTIVE_DAYS)
+
+    def handle(self, *args, **options):
+        day = options['day'] or timezone.localdate() - timedelta(days=1)
+
+        archived = archive_progress(day, batch_size=options['batch_size'])
+        self.stdout.write(f'Архивировано строк прогресса за {day}: {archived}')
+
+        seeded = seed_progress(
+            active_days=options['active_days'], batch_size=options['batch_size'],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ Квесты на новый день подготовлены для {seeded} игроков')
+        )
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from games.scheduler import BATCH_SIZE, next_due, run_due
+
+
+class Command(BaseCommand):
+    help = 'Переводит турниры и квесты по статусам по наступлении их дат и пересчитывает места игроков'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true',
+                            help='Работать постоянно, просыпаясь к ближайшему сроку')
+        parser.add_argument('--max-sleep', type=float, default=60,
+                            help='Не спать дольше N секунд, чтобы замечать новые турниры и квесты')
+
+    def handle(self, *args, **options):
+        while True:
+            counts = run_due(batch_size=options['batch_size'])
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'✓ Турниров начато: {counts["started"]}, завершено: {counts["finished"]}; '
+                    f'квестов включено: {counts["quests_activated"]}, выключено: {counts["quests_deactivated"]}; '
+                    f'мест изменилось: {counts["ranks_changed"]}'
+                )
+            )
+            if not options['loop']:
+                return
+
+            sleep = options['max_sleep']
+            due = next_due()
+            if due is not None:
+                sleep = min(sleep, max((due - timezone.now()).total_seconds(), 0))
+            time.sleep(sleep)
@@ -0,0 +1,43 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную SQLite-базу в файл реплики (замена репликации для локальной проверки)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, default=0,
+                            help='Повторять копирование каждые N секунд, пока команду не остановят')
+        parser.add_argument('--pages', type=int, default=1024,
+                            help='Страниц за шаг backup API; между шагами основная база доступна для записи')
+
+    def handle(self, *args, **options):
+        alias = settings.REPLICA_DATABASE_ALIAS
+        if not alias:
+            raise CommandError('Реплика не настроена: задайте переменную окружения GAMIFY_REPLICA_DB')
+        primary = connections['default'].settings_dict
+        replica = connections[alias].settings_dict
+        if primary['ENGINE'] != 'django.db.backends.sqlite3' or replica['ENGINE'] != primary['ENGINE']:
+            raise CommandError('sync_replica работает только с SQLite')
+
+        while True:
+            started = time.perf_counter()
+            self.copy(str(primary['NAME']), str(replica['NAME']), options['pages'])
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(f'✓ Реплика {replica["NAME"]} обновлена за {elapsed:.2f} с'))
+            if not options['every']:
+                break
+            time.sleep(options['every'])
+
+    def copy(self, source_path, target_path, pages):
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target, pages=pages)
+        finally:
+            target.close()
+            source.close()
@@ -0,0 +1,266 @@
+import json
+import logging
+import mimetypes
+import os
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import connections
+from django.http import FileResponse, HttpResponseNotModified
+from django.urls import Resolver404, resolve
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .routers import replica_alias, routing
+
+logger = logging.getLogger('games.queries')
+
+_current_stats = ContextVar('games_query_stats', default=None)
+
+SLOWEST_LIMIT = 3
+SQL_PREVIEW_LENGTH = 200
+
+# Предсжатые копии в порядке предпочтения: (Content-Encoding, суффикс файла)
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'public, max-age=0, must-revalidate'
+
+
+class QueryStats:
+    """Обёртка execute_wrapper: считает запросы и их время"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.timings = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.total += elapsed
+            self.timings.append((elapsed, sql))
+
+    def slowest(self, limit=SLOWEST_LIMIT):
+        timings = sorted(self.timings, key=lambda timing: timing[0], reverse=True)
+        return [
+            {'sql': sql[:SQL_PREVIEW_LENGTH], 'ms': round(elapsed * 1000, 2)}
+            for elapsed, sql in timings[:limit]
+        ]
+
+
+def _dispatch_to_stats(execute, sql, params, many, context):
+    # Запросы асинхронных представлений выполняются в общем потоке,
+    # поэтому статистика ищется в контексте запроса, а не в обёртке соединения
+    stats = _current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def _install_dispatch():
+    """Подключить счётчик к соединениям текущего потока, один раз на соединение"""
+    for connection in connections.all():
+        if _dispatch_to_stats not in connection.execute_wrappers:
+            # В начало списка, чтобы не мешать стеку execute_wrapper()
+            connection.execute_wrappers.insert(0, _dispatch_to_stats)
+
+
+class QueryStatsMiddleware:
+    """Статистика SQL по каждому запросу с разбивкой по имени URL
+
+    В режиме DEBUG результат отдаётся в заголовке X-Query-Stats,
+    иначе пишется в лог games.queries одной JSON-строкой на уровне INFO;
+    в настройках по умолчанию он включается переменной GAMIFY_QUERY_LOG=1.
+    Работает и под WSGI, и под ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        _install_dispatch()
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        return self.report(request, response, stats)
+
+    async def __acall__(self, request):
+        await sync_to_async(_install_dispatch)()
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        return self.report(request, response, stats)
+
+    def report(self, request, response, stats):
+        match = request.resolver_match
+        url_name = match.view_name if match else None
+        total_ms = round(stats.total * 1000, 2)
+
+        if settings.DEBUG:
+            response['X-Query-Stats'] = f'view={url_name}; count={stats.count}; time={total_ms}ms'
+        elif logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'url_name': url_name,
+                'method': request.method,
+                'status': response.status_code,
+                'query_count': stats.count,
+                'query_time_ms': total_ms,
+                'slowest': stats.slowest(),
+            }, ensure_ascii=False))
+        return response
+
+
+class ReplicaMiddleware:
+    """Направляет чтения GET-запросов к представлениям из REPLICA_VIEWS на реплику
+
+    После запроса, который что-то записал, браузер получает cookie, и до
+    её истечения все его запросы читают с основной базы: пользователь
+    сразу видит свои изменения, даже если реплика отстаёт.
+    """
+
+    cookie_name = 'primary_until'
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routing(use_replica=self.use_replica(request)) as state:
+            response = self.get_response(request)
+        return self.pin_after_write(response, state)
+
+    async def __acall__(self, request):
+        with routing(use_replica=self.use_replica(request)) as state:
+            response = await self.get_response(request)
+        return self.pin_after_write(response, state)
+
+    def use_replica(self, request):
+        if not replica_alias() or request.method not in ('GET', 'HEAD'):
+            return False
+        try:
+            match = resolve(request.path_info, getattr(request, 'urlconf', None))
+        except Resolver404:
+            return False
+        return match.view_name in settings.REPLICA_VIEWS and not self.pinned_to_primary(request)
+
+    def pin_after_write(self, response, state):
+        # Без реплики читать не с чего, и cookie только раздувала бы ответы
+        if replica_alias() and state.wrote:
+            sticky = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                self.cookie_name, str(int(time.time()) + sticky),
+                max_age=sticky, httponly=True, samesite='Lax',
+            )
+        return response
+
+    def pinned_to_primary(self, request):
+        try:
+            return int(request.COOKIES.get(self.cookie_name, 0)) > time.time()
+        except ValueError:
+            return False
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for item in header.split(','):
+        coding, *params = item.split(';')
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticMiddleware:
+    """Отдаёт собранную статику из STATIC_ROOT без похода в представления
+
+    Если клиент принимает br или gzip и collectstatic положил рядом
+    предсжатую копию, отдаётся она. Файлы с хешем в имени кэшируются
+    браузером навсегда, остальные проверяются по Last-Modified.
+    Файлы, которых нет в STATIC_ROOT, передаются дальше по цепочке.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.serve(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self.serve(request) or await self.get_response(request)
+
+    def serve(self, request):
+        if request.method not in ('GET', 'HEAD') or not settings.STATIC_ROOT:
+            return None
+        if not request.path_info.startswith(settings.STATIC_URL):
+            return None
+        name = request.path_info[len(settings.STATIC_URL):]
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        accepted = _accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        encoding, served = None, path
+        for coding, suffix in PRECOMPRESSED:
+            if coding in accepted and os.path.isfile(path + suffix):
+                encoding, served = coding, path + suffix
+                break
+
+        stat = os.stat(served)
+        if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+            response = HttpResponseNotModified()
+        else:
+            content_type, _ = mimetypes.guess_type(path)
+            response = FileResponse(open(served, 'rb'), content_type=content_type or 'application/octet-stream')
+            response['Last-Modified'] = http_date(stat.st_mtime)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        patch_vary_headers(response, ['Accept-Encoding'])
+        is_hashed = getattr(staticfiles_storage, 'is_hashed', None)
+        immutable = is_hashed is not None and is_hashed(name)
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+        return response
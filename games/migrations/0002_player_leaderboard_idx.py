@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-17 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='player',
+            options={'ordering': ['-level', '-experience', 'id'], 'verbose_name': 'Игрок', 'verbose_name_plural': 'Игроки'},
+        ),
+        migrations.AddIndex(
+            model_name='player',
+            index=models.Index(fields=['-level', '-experience', 'id'], name='player_leaderboard_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2 on 2026-10-17 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0002_player_leaderboard_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='review_average',
+            field=models.FloatField(default=0, verbose_name='Оценка игроков'),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='review_count',
+            field=models.IntegerField(default=0, verbose_name='Рецензий'),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='review_sum',
+            field=models.IntegerField(default=0, verbose_name='Сумма оценок'),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='stars_1',
+            field=models.IntegerField(default=0, verbose_name='Оценок 1'),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='stars_2',
+            field=models.IntegerField(default=0, verbose_name='Оценок 2'),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='stars_3',
+            field=models.IntegerField(default=0, verbose_name='Оценок 3'),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='stars_4',
+            field=models.IntegerField(default=0, verbose_name='Оценок 4'),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='stars_5',
+            field=models.IntegerField(default=0, verbose_name='Оценок 5'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['-review_average', '-review_count'], name='game_review_score_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2 on 2026-10-17 12:46
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_participants(apps, schema_editor):
+    Tournament = apps.get_model('games', 'Tournament')
+    membership = Tournament.participants.through
+    counts = (
+        membership.objects.filter(tournament_id=OuterRef('pk'))
+        .order_by().values('tournament_id')
+        .annotate(total=Count('*')).values('total')
+    )
+    Tournament.objects.update(participants_count=Coalesce(Subquery(counts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0003_game_review_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournament',
+            name='participants_count',
+            field=models.IntegerField(default=0, verbose_name='Участников'),
+        ),
+        migrations.RunPython(count_participants, migrations.RunPython.noop),
+    ]
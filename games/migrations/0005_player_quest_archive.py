@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-17 12:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0004_tournament_participants_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerQuestArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('completed', models.BooleanField(default=False, verbose_name='Завершен')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершен в')),
+                ('progress', models.IntegerField(default=0, verbose_name='Прогресс (%)')),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quest_archive', to='games.player', verbose_name='Игрок')),
+                ('quest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='games.dailyquest', verbose_name='Квест')),
+            ],
+            options={
+                'verbose_name': 'Архив квеста',
+                'verbose_name_plural': 'Архив квестов',
+                'unique_together': {('player', 'quest', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2 on 2026-10-17 12:49
+
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE games_game_search USING fts5("
+        "name, description, "
+        "prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO games_game_search (rowid, name, description) "
+        "SELECT id, name, description FROM games_game"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS games_game_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0006_player_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['-created_at'], name='game_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['genre', '-created_at'], name='game_genre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['release_date'], name='game_release_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['-rating'], name='game_rating_idx'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
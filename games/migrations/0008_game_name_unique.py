@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-17 12:54
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def rename_duplicates(apps, schema_editor):
+    # Повторы названий получают суффикс с id, чтобы уникальный индекс создался
+    Game = apps.get_model('games', 'Game')
+    duplicated = (
+        Game.objects.values('name').annotate(total=Count('id'))
+        .filter(total__gt=1).values_list('name', flat=True)
+    )
+    for name in list(duplicated):
+        for game in Game.objects.filter(name=name).order_by('id')[1:]:
+            game.name = f'{name} ({game.pk})'[:200]
+            game.save(update_fields=['name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0007_game_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='game',
+            name='name',
+            field=models.CharField(max_length=200, unique=True, verbose_name='Название'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2 on 2026-10-17 12:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def link_accepted_requests(apps, schema_editor):
+    FriendRequest = apps.get_model('games', 'FriendRequest')
+    Friendship = apps.get_model('games', 'Friendship')
+    pairs = FriendRequest.objects.filter(status='accepted').values_list('from_player_id', 'to_player_id')
+    Friendship.objects.bulk_create(
+        [
+            Friendship(player_id=player_id, friend_id=friend_id)
+            for from_id, to_id in pairs.iterator()
+            for player_id, friend_id in ((from_id, to_id), (to_id, from_id))
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0008_game_name_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Friendship',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('friend', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='games.player', verbose_name='Друг')),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='friendships', to='games.player', verbose_name='Игрок')),
+            ],
+            options={
+                'verbose_name': 'Дружба',
+                'verbose_name_plural': 'Дружба',
+                'unique_together': {('player', 'friend')},
+            },
+        ),
+        migrations.RunPython(link_accepted_requests, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-17 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0009_friendship'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='playergame',
+            index=models.Index(fields=['game', '-game_points', 'id'], name='playergame_game_rank_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2 on 2026-10-17 13:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0010_playergame_game_rank_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('verb', models.CharField(choices=[('achievement', 'Получил достижение'), ('review', 'Написал рецензию'), ('tournament', 'Вступил в турнир'), ('quest', 'Выполнил квест'), ('friend', 'Подружился')], max_length=20, verbose_name='Действие')),
+                ('subject', models.CharField(blank=True, max_length=200, verbose_name='Объект')),
+                ('target_id', models.IntegerField(blank=True, null=True, verbose_name='ID объекта')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('actor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='games.player', verbose_name='Игрок')),
+                ('game', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='games.game', verbose_name='Игра')),
+            ],
+            options={
+                'verbose_name': 'Событие',
+                'verbose_name_plural': 'События',
+            },
+        ),
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='games.activityevent', verbose_name='Событие')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to='games.player', verbose_name='Владелец')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+                'unique_together': {('owner', 'event')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='activityevent',
+            index=models.Index(fields=['actor', '-id'], name='activity_actor_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2 on 2026-10-17 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0011_activity_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournamentresult',
+            name='credited_prize',
+            field=models.IntegerField(default=0, verbose_name='Начислено'),
+        ),
+        migrations.AddIndex(
+            model_name='tournamentresult',
+            index=models.Index(fields=['tournament', 'position'], name='result_standings_idx'),
+        ),
+    ]
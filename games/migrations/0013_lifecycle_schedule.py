@@ -0,0 +1,39 @@
+# Generated by Django 4.2 on 2026-10-17 13:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0012_tournament_standings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyquest',
+            name='ends_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Окончание'),
+        ),
+        migrations.AddField(
+            model_name='dailyquest',
+            name='starts_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Начало'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyquest',
+            index=models.Index(fields=['is_active', 'starts_at'], name='quest_start_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyquest',
+            index=models.Index(fields=['is_active', 'ends_at'], name='quest_end_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tournament',
+            index=models.Index(fields=['status', 'start_date'], name='tournament_start_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tournament',
+            index=models.Index(fields=['status', 'end_date'], name='tournament_end_due_idx'),
+        ),
+    ]
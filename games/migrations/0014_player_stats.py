@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-17 13:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0013_lifecycle_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerStats',
+            fields=[
+                ('player', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='games.player', verbose_name='Игрок')),
+                ('games_started', models.IntegerField(default=0, verbose_name='Игр начато')),
+                ('achievements_unlocked', models.IntegerField(default=0, verbose_name='Достижений')),
+                ('hours_played', models.DecimalField(decimal_places=1, default=0, max_digits=9, verbose_name='Часов сыграно')),
+                ('reviews_written', models.IntegerField(default=0, verbose_name='Рецензий')),
+                ('tournaments_entered', models.IntegerField(default=0, verbose_name='Турниров')),
+                ('best_finish', models.IntegerField(blank=True, null=True, verbose_name='Лучшее место')),
+            ],
+            options={
+                'verbose_name': 'Статистика игрока',
+                'verbose_name_plural': 'Статистика игроков',
+            },
+        ),
+    ]
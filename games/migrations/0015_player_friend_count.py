@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-17 13:58
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_friends(apps, schema_editor):
+    Friendship = apps.get_model('games', 'Friendship')
+    PlayerStats = apps.get_model('games', 'PlayerStats')
+    counts = (
+        Friendship.objects.filter(player_id=OuterRef('player_id'))
+        .order_by().values('player_id')
+        .annotate(total=Count('*')).values('total')
+    )
+    PlayerStats.objects.update(friend_count=Coalesce(Subquery(counts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0014_player_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playerstats',
+            name='friend_count',
+            field=models.IntegerField(default=0, verbose_name='Друзей'),
+        ),
+        migrations.AddIndex(
+            model_name='playerstats',
+            index=models.Index(fields=['friend_count'], name='stats_friend_count_idx'),
+        ),
+        migrations.RunPython(count_friends, migrations.RunPython.noop),
+    ]
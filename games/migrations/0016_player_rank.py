@@ -0,0 +1,40 @@
+# Generated by Django 4.2 on 2026-10-17 13:59
+
+from django.db import migrations, models
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+import django.db.models.deletion
+
+
+def fill_ranks(apps, schema_editor):
+    Player = apps.get_model('games', 'Player')
+    PlayerRank = apps.get_model('games', 'PlayerRank')
+    ranked = Player.objects.annotate(
+        position=Window(RowNumber(), order_by=[F('level').desc(), F('experience').desc(), F('id').asc()]),
+    ).values_list('id', 'position')
+    PlayerRank.objects.bulk_create(
+        (PlayerRank(player_id=player_id, rank=position) for player_id, position in ranked.iterator()),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0015_player_friend_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerRank',
+            fields=[
+                ('player', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rank_row', serialize=False, to='games.player', verbose_name='Игрок')),
+                ('rank', models.IntegerField(db_index=True, verbose_name='Место')),
+            ],
+            options={
+                'verbose_name': 'Место игрока',
+                'verbose_name_plural': 'Места игроков',
+            },
+        ),
+        migrations.RunPython(fill_ranks, migrations.RunPython.noop),
+    ]
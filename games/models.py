@@ -1,11 +1,51 @@
-from django.db import models
+import math
+
+from django.db import models, transaction
+from django.db.models import Count, Exists, F, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Floor, NullIf, Sqrt
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 
+from .cache import CACHED_USERS, bump_version, forget_users
+
+REVIEW_STARS = range(1, 6)
+
+
+class GameQuerySet(models.QuerySet):
+    def apply_review_delta(self, old_rating=None, new_rating=None):
+        """Сдвинуть счётчики рецензий одним UPDATE
+
+        old_rating=None означает новую рецензию, new_rating=None - удалённую.
+        """
+        count_delta = (new_rating is not None) - (old_rating is not None)
+        sum_delta = (new_rating or 0) - (old_rating or 0)
+
+        changes = {}
+        if old_rating != new_rating:
+            if old_rating is not None:
+                changes[f'stars_{old_rating}'] = F(f'stars_{old_rating}') - 1
+            if new_rating is not None:
+                changes[f'stars_{new_rating}'] = F(f'stars_{new_rating}') + 1
+        if not changes:
+            return 0
+
+        new_count = F('review_count') + count_delta
+        new_sum = F('review_sum') + sum_delta
+        changes['review_count'] = new_count
+        changes['review_sum'] = new_sum
+        changes['review_average'] = Coalesce(
+            Cast(new_sum, models.FloatField()) / NullIf(new_count, 0),
+            Value(0.0),
+        )
+        updated = self.update(**changes)
+        bump_version('games.Game')
+        return updated
+
+
 class Game(models.Model):
     """Модель игры"""
-    name = models.CharField(max_length=200, verbose_name="Название")
+    name = models.CharField(max_length=200, unique=True, verbose_name="Название")
     description = models.TextField(verbose_name="Описание")
     genre = models.CharField(max_length=100, verbose_name="Жанр")
     release_date = models.DateField(verbose_name="Дата выпуска")
@@ -13,14 +53,93 @@ class Game(models.Model):
     image = models.ImageField(upload_to='games/', null=True, blank=True, verbose_name="Изображение")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Счётчики рецензий поддерживаются GameReview.save и post_delete,
+    # сверяются командой rebuild_review_stats
+    review_count = models.IntegerField(default=0, verbose_name="Рецензий")
+    review_sum = models.IntegerField(default=0, verbose_name="Сумма оценок")
+    review_average = models.FloatField(default=0, verbose_name="Оценка игроков")
+    stars_1 = models.IntegerField(default=0, verbose_name="Оценок 1")
+    stars_2 = models.IntegerField(default=0, verbose_name="Оценок 2")
+    stars_3 = models.IntegerField(default=0, verbose_name="Оценок 3")
+    stars_4 = models.IntegerField(default=0, verbose_name="Оценок 4")
+    stars_5 = models.IntegerField(default=0, verbose_name="Оценок 5")
+
+    objects = GameQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Игра"
         verbose_name_plural = "Игры"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='game_created_idx'),
+            models.Index(fields=['genre', '-created_at'], name='game_genre_idx'),
+            models.Index(fields=['release_date'], name='game_release_idx'),
+            models.Index(fields=['-rating'], name='game_rating_idx'),
+            models.Index(fields=['-review_average', '-review_count'], name='game_review_score_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @property
+    def review_histogram(self):
+        """Распределение оценок: (звёзды, количество, процент) от 5 к 1"""
+        histogram = []
+        for stars in reversed(REVIEW_STARS):
+            count = getattr(self, f'stars_{stars}')
+            percent = int(count * 100 / self.review_count) if self.review_count else 0
+            histogram.append((stars, count, percent))
+        return histogram
+
+
+# Переход с уровня L на L + 1 стоит L * EXPERIENCE_STEP опыта
+EXPERIENCE_STEP = 100
+
+
+def experience_for_level(level):
+    """Суммарный опыт, накопленный к началу уровня"""
+    return EXPERIENCE_STEP * level * (level - 1) // 2
+
+
+def level_for_experience(total):
+    """Уровень по суммарному опыту, обратная функция к experience_for_level"""
+    # STEP * L * (L - 1) / 2 <= total  <=>  (2L - 1)^2 <= 1 + 8 * total / STEP
+    return (math.isqrt(1 + 8 * max(total, 0) // EXPERIENCE_STEP) + 1) // 2
+
+
+class PlayerQuerySet(models.QuerySet):
+    def _grant(self, experience, points):
+        """UPDATE начисления без сброса кэшей; возвращает число изменённых строк"""
+        if experience < 0 or points < 0:
+            raise ValueError("Награда не может быть отрицательной")
+
+        changes = {}
+        if points:
+            changes['total_points'] = F('total_points') + points
+        if experience:
+            # Те же формулы, что и в experience_for_level / level_for_experience.
+            # В UPDATE все выражения видят старые значения столбцов.
+            total = F('level') * (F('level') - 1) * EXPERIENCE_STEP / 2 + F('experience') + experience
+            new_level = Cast(
+                Floor((Sqrt(total * 8 / EXPERIENCE_STEP + 1) + 1) / 2),
+                models.IntegerField(),
+            )
+            changes['level'] = new_level
+            changes['experience'] = total - new_level * (new_level - 1) * EXPERIENCE_STEP / 2
+        if not changes:
+            return 0
+        return self.update(**changes)
+
+    def grant(self, experience=0, points=0):
+        """Начислить опыт и очки всем игрокам выборки одним UPDATE"""
+        updated = self._grant(experience, points)
+        if updated:
+            # Опыт и уровень видны в request.user.player: id выборки не читаются,
+            # закэшированные пользователи сбрасываются все сразу
+            bump_version(CACHED_USERS)
+            bump_version('games.Player')
+        return updated
+
 
 class Player(models.Model):
     """Модель игрока с системой уровней"""
@@ -30,10 +149,15 @@ class Player(models.Model):
     total_points = models.IntegerField(default=0, verbose_name="Общие очки")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = PlayerQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Игрок"
         verbose_name_plural = "Игроки"
-        ordering = ['-level', '-experience']
+        ordering = ['-level', '-experience', 'id']
+        indexes = [
+            models.Index(fields=['-level', '-experience', 'id'], name='player_leaderboard_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} (Уровень {self.level})"
@@ -50,18 +174,39 @@ class Player(models.Model):
             return 0
         return int((self.experience % self.exp_to_next_level) / self.exp_to_next_level * 100)
 
+    @property
+    def total_experience(self):
+        """Весь опыт, набранный с первого уровня"""
+        return experience_for_level(self.level) + self.experience
+
+    def grant(self, experience=0, points=0):
+        """Начислить опыт и очки одним UPDATE без повторного чтения строки"""
+        if Player.objects.filter(pk=self.pk)._grant(experience, points):
+            forget_users([self.user_id])
+            bump_version('games.Player')
+        total = self.total_experience + experience
+        self.level = level_for_experience(total)
+        self.experience = total - experience_for_level(self.level)
+        self.total_points += points
+
     def add_experience(self, amount):
         """Добавить опыт и проверить повышение уровня"""
-        self.experience += amount
-        while self.experience >= self.exp_to_next_level:
-            self.experience -= self.exp_to_next_level
-            self.level += 1
-        self.save()
+        self.grant(experience=amount)
 
     def add_points(self, amount):
         """Добавить очки"""
-        self.total_points += amount
-        self.save()
+        self.grant(points=amount)
+
+
+class AchievementQuerySet(models.QuerySet):
+    def with_unlocked_for(self, player):
+        """Пометить полем is_unlocked достижения, уже полученные игроком"""
+        if player is None:
+            return self.annotate(is_unlocked=Value(False))
+        holders = Achievement.players.through.objects.filter(
+            achievement_id=OuterRef('pk'), player_id=player.pk,
+        )
+        return self.annotate(is_unlocked=Exists(holders))
 
 
 class Achievement(models.Model):
@@ -82,6 +227,8 @@ class Achievement(models.Model):
     icon = models.ImageField(upload_to='achievements/', null=True, blank=True, verbose_name="Иконка")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = AchievementQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Достижение"
         verbose_name_plural = "Достижения"
@@ -106,6 +253,9 @@ class PlayerGame(models.Model):
         verbose_name = "Прогресс игрока"
         verbose_name_plural = "Прогресс игроков"
         ordering = ['-last_played']
+        indexes = [
+            models.Index(fields=['game', '-game_points', 'id'], name='playergame_game_rank_idx'),
+        ]
 
     def __str__(self):
         return f"{self.player.user.username} в {self.game.name}"
@@ -115,7 +265,7 @@ class GameReview(models.Model):
     """Модель рецензии на игру"""
     game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='reviews', verbose_name="Игра")
     player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='reviews', verbose_name="Игрок")
-    rating = models.IntegerField(choices=[(i, i) for i in range(1, 6)], verbose_name="Оценка")
+    rating = models.IntegerField(choices=[(i, i) for i in REVIEW_STARS], verbose_name="Оценка")
     title = models.CharField(max_length=200, verbose_name="Заголовок")
     text = models.TextField(verbose_name="Текст рецензии")
     created_at = models.DateTimeField(auto_now_add=True)
@@ -130,6 +280,23 @@ class GameReview(models.Model):
     def __str__(self):
         return f"{self.title} - {self.game.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        review = super().from_db(db, field_names, values)
+        review._saved_state = (review.__dict__.get('game_id'), review.__dict__.get('rating'))
+        return review
+
+    def save(self, *args, **kwargs):
+        """Сохранить рецензию и сдвинуть счётчики игры в той же транзакции"""
+        old_game_id, old_rating = getattr(self, '_saved_state', (None, None))
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if old_game_id is not None and old_game_id != self.game_id:
+                Game.objects.filter(pk=old_game_id).apply_review_delta(old_rating=old_rating)
+                old_rating = None
+            Game.objects.filter(pk=self.game_id).apply_review_delta(old_rating, self.rating)
+        self._saved_state = (self.game_id, self.rating)
+
 
 class FriendRequest(models.Model):
     """Модель заявки в друзья"""
@@ -155,7 +322,63 @@ class FriendRequest(models.Model):
     def accept(self):
         """Принять заявку в друзья"""
         self.status = 'accepted'
-        self.save()
+        with transaction.atomic():
+            self.save()
+
+
+class FriendshipQuerySet(models.QuerySet):
+
+    def link(self, player_id, friend_id):
+        """Записать дружбу в обе стороны; повторный вызов ничего не меняет"""
+        self.bulk_create(
+            [self.model(player_id=player_id, friend_id=friend_id),
+             self.model(player_id=friend_id, friend_id=player_id)],
+            ignore_conflicts=True,
+        )
+        self._recount_friends(player_id, friend_id)
+
+    def unlink(self, player_id, friend_id):
+        self.filter(
+            models.Q(player_id=player_id, friend_id=friend_id)
+            | models.Q(player_id=friend_id, friend_id=player_id)
+        ).delete()
+        self._recount_friends(player_id, friend_id)
+
+    def _recount_friends(self, *player_ids):
+        """Пересчитать friend_count в сводке пары одним UPDATE
+
+        Пересчёт, а не сдвиг на единицу, потому что повторный link ничего
+        не вставляет. Строки сводки здесь не создаются, их целиком
+        посчитает games.stats.
+        """
+        counts = (
+            Friendship.objects.filter(player_id=OuterRef('player_id'))
+            .order_by().values('player_id').annotate(total=Count('*')).values('total')
+        )
+        PlayerStats.objects.filter(player_id__in=player_ids).update(
+            friend_count=Coalesce(Subquery(counts), Value(0)),
+        )
+
+
+class Friendship(models.Model):
+    """Симметричная дружба: по строке на каждое направление
+
+    Строится из принятых FriendRequest, поэтому друзья игрока читаются
+    по одному индексу (player, friend) без OR по двум внешним ключам.
+    """
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='friendships', verbose_name="Игрок")
+    friend = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='+', verbose_name="Друг")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = FriendshipQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ('player', 'friend')
+        verbose_name = "Дружба"
+        verbose_name_plural = "Дружба"
+
+    def __str__(self):
+        return f"{self.player_id} <-> {self.friend_id}"
 
 
 class UserBadge(models.Model):
@@ -174,6 +397,17 @@ class UserBadge(models.Model):
         return self.name
 
 
+class TournamentQuerySet(models.QuerySet):
+    def recount_participants(self):
+        """Пересчитать participants_count по таблице связи одним UPDATE"""
+        counts = (
+            Tournament.participants.through.objects.filter(tournament_id=OuterRef('pk'))
+            .order_by().values('tournament_id')
+            .annotate(total=Count('*')).values('total')
+        )
+        return self.update(participants_count=Coalesce(Subquery(counts), Value(0)))
+
+
 class Tournament(models.Model):
     """Модель турнира"""
     STATUS_CHOICES = [
@@ -191,19 +425,28 @@ class Tournament(models.Model):
     end_date = models.DateTimeField(verbose_name="Дата окончания")
     max_participants = models.IntegerField(default=100, verbose_name="Макс участников")
     participants = models.ManyToManyField(Player, related_name='tournaments', blank=True, verbose_name="Участники")
+    # Счётчик меняется вместе со связью в games.participation
+    participants_count = models.IntegerField(default=0, verbose_name="Участников")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = TournamentQuerySet.as_manager()
+
     class Meta:
         ordering = ['-start_date']
         verbose_name = "Турнир"
         verbose_name_plural = "Турниры"
+        # Планировщик ищет турниры, которым пора сменить статус
+        indexes = [
+            models.Index(fields=['status', 'start_date'], name='tournament_start_due_idx'),
+            models.Index(fields=['status', 'end_date'], name='tournament_end_due_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
     @property
-    def participants_count(self):
-        return self.participants.count()
+    def is_full(self):
+        return self.participants_count >= self.max_participants
 
 
 class TournamentResult(models.Model):
@@ -213,10 +456,16 @@ class TournamentResult(models.Model):
     position = models.IntegerField(verbose_name="Позиция")
     prize = models.IntegerField(default=0, verbose_name="Приз")
     score = models.IntegerField(default=0, verbose_name="Очки")
+    # Часть приза, уже начисленная в total_points: повторное подведение
+    # итогов начисляет только разницу prize - credited_prize
+    credited_prize = models.IntegerField(default=0, verbose_name="Начислено")
 
     class Meta:
         unique_together = ('tournament', 'player')
         ordering = ['position']
+        indexes = [
+            models.Index(fields=['tournament', 'position'], name='result_standings_idx'),
+        ]
         verbose_name = "Результат турнира"
         verbose_name_plural = "Результаты турниров"
 
@@ -232,11 +481,18 @@ class DailyQuest(models.Model):
     reward_points = models.IntegerField(default=50, verbose_name="Награда очков")
     reward_experience = models.IntegerField(default=100, verbose_name="Награда опыта")
     is_active = models.BooleanField(default=True, verbose_name="Активен")
+    # Если даты заданы, is_active переключает планировщик, иначе он меняется вручную
+    starts_at = models.DateTimeField(null=True, blank=True, verbose_name="Начало")
+    ends_at = models.DateTimeField(null=True, blank=True, verbose_name="Окончание")
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name = "Ежедневный квест"
         verbose_name_plural = "Ежедневные квесты"
+        indexes = [
+            models.Index(fields=['is_active', 'starts_at'], name='quest_start_due_idx'),
+            models.Index(fields=['is_active', 'ends_at'], name='quest_end_due_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -259,6 +515,135 @@ class PlayerQuestProgress(models.Model):
         return f"{self.player.user.username} - {self.quest.title}"
 
 
+class PlayerQuestArchive(models.Model):
+    """Архив прогресса квестов за прошедшие дни"""
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='quest_archive', verbose_name="Игрок")
+    quest = models.ForeignKey(DailyQuest, on_delete=models.CASCADE, verbose_name="Квест")
+    day = models.DateField(verbose_name="День")
+    completed = models.BooleanField(default=False, verbose_name="Завершен")
+    completed_at = models.DateTimeField(null=True, blank=True, verbose_name="Завершен в")
+    progress = models.IntegerField(default=0, verbose_name="Прогресс (%)")
+
+    class Meta:
+        unique_together = ('player', 'quest', 'day')
+        verbose_name = "Архив квеста"
+        verbose_name_plural = "Архив квестов"
+
+    def __str__(self):
+        return f"{self.player.user.username} - {self.quest.title} ({self.day})"
+
+
+class ActivityEvent(models.Model):
+    """Событие ленты; записи только добавляются и не изменяются"""
+    VERB_CHOICES = [
+        ('achievement', 'Получил достижение'),
+        ('review', 'Написал рецензию'),
+        ('tournament', 'Вступил в турнир'),
+        ('quest', 'Выполнил квест'),
+        ('friend', 'Подружился'),
+    ]
+
+    actor = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='activity', verbose_name="Игрок")
+    verb = models.CharField(max_length=20, choices=VERB_CHOICES, verbose_name="Действие")
+    game = models.ForeignKey(Game, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="Игра")
+    # Название объекта события копируется, чтобы лента читалась без соединений
+    subject = models.CharField(max_length=200, blank=True, verbose_name="Объект")
+    target_id = models.IntegerField(null=True, blank=True, verbose_name="ID объекта")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Событие"
+        verbose_name_plural = "События"
+        indexes = [
+            models.Index(fields=['actor', '-id'], name='activity_actor_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.actor_id} {self.verb} {self.subject}"
+
+
+class TimelineEntry(models.Model):
+    """Событие в ленте конкретного игрока, раскладывается при записи"""
+    owner = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='timeline', verbose_name="Владелец")
+    event = models.ForeignKey(ActivityEvent, on_delete=models.CASCADE, related_name='+', verbose_name="Событие")
+
+    class Meta:
+        # Уникальный индекс (owner, event) заодно обслуживает чтение ленты
+        unique_together = ('owner', 'event')
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+
+    def __str__(self):
+        return f"{self.owner_id} <- {self.event_id}"
+
+
+class PlayerStats(models.Model):
+    """Сводка игрока для профиля; счётчики двигает games.stats,
+    полностью пересчитывает команда rebuild_player_stats
+    """
+    player = models.OneToOneField(Player, on_delete=models.CASCADE, primary_key=True, related_name='stats', verbose_name="Игрок")
+    games_started = models.IntegerField(default=0, verbose_name="Игр начато")
+    achievements_unlocked = models.IntegerField(default=0, verbose_name="Достижений")
+    hours_played = models.DecimalField(max_digits=9, decimal_places=1, default=0, verbose_name="Часов сыграно")
+    reviews_written = models.IntegerField(default=0, verbose_name="Рецензий")
+    tournaments_entered = models.IntegerField(default=0, verbose_name="Турниров")
+    best_finish = models.IntegerField(null=True, blank=True, verbose_name="Лучшее место")
+    # Пересчитывают Friendship.link/unlink; по нему games.activity находит популярных друзей
+    friend_count = models.IntegerField(default=0, verbose_name="Друзей")
+
+    class Meta:
+        verbose_name = "Статистика игрока"
+        verbose_name_plural = "Статистика игроков"
+        indexes = [
+            models.Index(fields=['friend_count'], name='stats_friend_count_idx'),
+        ]
+
+    def __str__(self):
+        return f"Статистика {self.player_id}"
+
+
+class PlayerRank(models.Model):
+    """Место игрока в общей таблице лидеров на момент последнего пересчёта
+
+    Пересчитывает games.leaderboard.refresh_ranks по расписанию, поэтому место
+    находится по ключу, а окно вокруг игрока - по диапазону индекса rank.
+    """
+    player = models.OneToOneField(Player, on_delete=models.CASCADE, primary_key=True, related_name='rank_row', verbose_name="Игрок")
+    rank = models.IntegerField(db_index=True, verbose_name="Место")
+
+    class Meta:
+        verbose_name = "Место игрока"
+        verbose_name_plural = "Места игроков"
+
+    def __str__(self):
+        return f"{self.player_id}: {self.rank}"
+
+
+@receiver(post_delete, sender=GameReview)
+def remove_review_from_stats(sender, instance, **kwargs):
+    """Убрать удалённую рецензию из счётчиков игры"""
+    Game.objects.filter(pk=instance.game_id).apply_review_delta(old_rating=instance.rating)
+
+
+@receiver(m2m_changed, sender=Tournament.participants.through)
+def recount_participants(sender, instance, action, reverse, pk_set, **kwargs):
+    """Пересчитать участников после правки связи через ORM или админку"""
+    if reverse and action == 'pre_clear':
+        instance._cleared_tournament_ids = list(instance.tournaments.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        tournament_ids = [instance.pk]
+    elif action == 'post_clear':
+        tournament_ids = instance.__dict__.pop('_cleared_tournament_ids', [])
+    else:
+        tournament_ids = pk_set
+
+    Tournament.objects.filter(pk__in=tournament_ids).recount_participants()
+
+
 @receiver(post_save, sender=User)
 def create_player(sender, instance, created, **kwargs):
     """Автоматически создавать профиль игрока при создании пользователя"""
@@ -266,7 +651,10 @@ def create_player(sender, instance, created, **kwargs):
         Player.objects.create(user=instance)
 
 @receiver(post_save, sender=User)
-def save_player(sender, instance, **kwargs):
+def save_player(sender, instance, update_fields=None, **kwargs):
     """Автоматически сохранять профиль игрока"""
+    # Вход обновляет только last_login, игрок при этом не меняется
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
     if hasattr(instance, 'player'):
         instance.player.save()
@@ -0,0 +1,88 @@
+import base64
+import json
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Курсор пагинации повреждён или подделан"""
+
+
+def encode_cursor(values):
+    """Упаковать позицию keyset-пагинации в непрозрачную строку"""
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, length):
+    """Распаковать курсор и проверить количество значений"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(cursor) from exc
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidCursor(cursor)
+    if not all(_is_key(value) for value in values):
+        raise InvalidCursor(cursor)
+    return values
+
+
+def _is_key(value):
+    """Ключи пагинации в проекте - целые столбцы в пределах INTEGER SQLite"""
+    return isinstance(value, int) and not isinstance(value, bool) and -2 ** 63 <= value < 2 ** 63
+
+
+def _field(order_item):
+    return order_item.lstrip('-')
+
+
+def row_key(row, order):
+    return [getattr(row, _field(item)) for item in order]
+
+
+def reversed_order(order):
+    return tuple(item[1:] if item.startswith('-') else f'-{item}' for item in order)
+
+
+def beyond(order, values, forward=True):
+    """Условие: строка стоит в порядке order ниже позиции values,
+    а при forward=False выше неё
+    """
+    condition = Q()
+    equal = {}
+    for item, value in zip(order, values):
+        descending = item.startswith('-')
+        lookup = 'lt' if descending == forward else 'gt'
+        condition |= Q(**equal, **{f'{_field(item)}__{lookup}': value})
+        equal[_field(item)] = value
+    return condition
+
+
+def assign_ranks(rows, first_rank):
+    for offset, row in enumerate(rows):
+        row.rank = first_rank + offset
+    return rows
+
+
+def keyset_page(queryset, order, cursor, size):
+    """Страница по ключу последней строки; курсор хранит ключ и её место,
+    поэтому следующие страницы не требуют ни OFFSET, ни COUNT
+    """
+    first_rank = 1
+    if cursor:
+        *values, rank = decode_cursor(cursor, len(order) + 1)
+        if rank < 0:
+            raise InvalidCursor(cursor)
+        queryset = queryset.filter(beyond(order, values))
+        first_rank = rank + 1
+
+    rows = list(queryset.order_by(*order)[:size + 1])
+    has_next = len(rows) > size
+    rows = assign_ranks(rows[:size], first_rank)
+
+    next_cursor = None
+    if has_next:
+        last = rows[-1]
+        next_cursor = encode_cursor(row_key(last, order) + [last.rank])
+    return rows, next_cursor
@@ -0,0 +1,59 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from . import activity, stats
+from .cache import bump_version
+from .models import Tournament
+
+
+def is_participant(player, tournament):
+    """Проверка участия по уникальному индексу связи"""
+    membership = Tournament.participants.through
+    return membership.objects.filter(tournament_id=tournament.pk, player_id=player.pk).exists()
+
+
+def join_tournament(player, tournament):
+    """Записать игрока в турнир, если остались места
+
+    Место резервируется условным UPDATE счётчика, поэтому при наплыве
+    заявок турнир не переполнится. Возвращает True, если игрок записан.
+    """
+    if is_participant(player, tournament):
+        return False
+
+    membership = Tournament.participants.through
+    try:
+        with transaction.atomic():
+            reserved = Tournament.objects.filter(
+                pk=tournament.pk, participants_count__lt=F('max_participants'),
+            ).update(participants_count=F('participants_count') + 1)
+            if not reserved:
+                return False
+            membership.objects.create(tournament_id=tournament.pk, player_id=player.pk)
+            stats.bump(player.pk, tournaments_entered=1)
+            bump_version('games.Tournament')
+            activity.record(
+                player, 'tournament', game_id=tournament.game_id,
+                subject=tournament.name, target_id=tournament.pk,
+            )
+    except IntegrityError:
+        # Параллельный запрос того же игрока успел первым, резерв откатан
+        return False
+    return True
+
+
+def leave_tournament(player, tournament):
+    """Выписать игрока из турнира и освободить место"""
+    membership = Tournament.participants.through
+    with transaction.atomic():
+        deleted, _ = membership.objects.filter(
+            tournament_id=tournament.pk, player_id=player.pk,
+        ).delete()
+        if not deleted:
+            return False
+        Tournament.objects.filter(pk=tournament.pk).update(
+            participants_count=F('participants_count') - 1,
+        )
+        stats.bump(player.pk, tournaments_entered=-1)
+        bump_version('games.Tournament')
+    return True
@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import QUEST_PROGRESS, bump_version
+from .models import DailyQuest, Player, PlayerQuestArchive, PlayerQuestProgress
+
+BATCH_SIZE = 1000
+ACTIVE_DAYS = 30
+
+
+def progress_for(player, quests):
+    """Прогресс игрока по квестам: словарь quest_id -> PlayerQuestProgress
+
+    Недостающие строки создаются одним INSERT ... ON CONFLICT DO NOTHING
+    и сразу попадают в словарь без повторного чтения.
+    """
+    quest_ids = [quest.pk for quest in quests]
+    progress = {
+        qp.quest_id: qp
+        for qp in PlayerQuestProgress.objects.filter(player=player, quest_id__in=quest_ids)
+    }
+    missing = [
+        PlayerQuestProgress(player=player, quest_id=quest_id)
+        for quest_id in quest_ids if quest_id not in progress
+    ]
+    if missing:
+        PlayerQuestProgress.objects.bulk_create(missing, ignore_conflicts=True)
+        progress.update((qp.quest_id, qp) for qp in missing)
+    return progress
+
+
+def archive_progress(day, batch_size=BATCH_SIZE):
+    """Перенести начатый прогресс в архив за day и обнулить его
+
+    Строки обходятся пачками по первичному ключу. Прогресс, уже лежащий
+    в архиве за day, не трогается: повторный запуск за тот же день
+    ничего не дублирует и не стирает набранное после первого запуска.
+    """
+    touched = PlayerQuestProgress.objects.filter(Q(completed=True) | Q(progress__gt=0)).order_by('pk')
+    archived = 0
+    last_pk = 0
+    while True:
+        batch = list(touched.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+
+        with transaction.atomic():
+            done = set(
+                PlayerQuestArchive.objects.filter(
+                    day=day,
+                    player_id__in={qp.player_id for qp in batch},
+                    quest_id__in={qp.quest_id for qp in batch},
+                ).values_list('player_id', 'quest_id')
+            )
+            batch = [qp for qp in batch if (qp.player_id, qp.quest_id) not in done]
+            # Без ignore_conflicts: параллельный запуск за тот же день
+            # откатит пачку целиком, а не обнулит неархивированный прогресс
+            PlayerQuestArchive.objects.bulk_create([
+                PlayerQuestArchive(
+                    player_id=qp.player_id,
+                    quest_id=qp.quest_id,
+                    day=day,
+                    completed=qp.completed,
+                    completed_at=qp.completed_at,
+                    progress=qp.progress,
+                )
+                for qp in batch
+            ])
+            PlayerQuestProgress.objects.filter(pk__in=[qp.pk for qp in batch]).update(
+                completed=False, completed_at=None, progress=0,
+            )
+        archived += len(batch)
+
+    if archived:
+        bump_version(QUEST_PROGRESS)
+    return archived
+
+
+def seed_progress(active_days=ACTIVE_DAYS, batch_size=BATCH_SIZE):
+    """Создать строки прогресса по активным квестам для недавно заходивших игроков"""
+    quest_ids = list(DailyQuest.objects.filter(is_active=True).values_list('pk', flat=True))
+    if not quest_ids:
+        return 0
+
+    since = timezone.now() - timedelta(days=active_days)
+    players = Player.objects.filter(user__last_login__gte=since).order_by('pk').values_list('pk', flat=True)
+    players_per_batch = max(batch_size // len(quest_ids), 1)
+
+    seeded = 0
+    last_pk = 0
+    while True:
+        player_ids = list(players.filter(pk__gt=last_pk)[:players_per_batch])
+        if not player_ids:
+            return seeded
+        last_pk = player_ids[-1]
+
+        rows = [
+            PlayerQuestProgress(player_id=player_id, quest_id=quest_id)
+            for player_id in player_ids
+            for quest_id in quest_ids
+        ]
+        PlayerQuestProgress.objects.bulk_create(rows, ignore_conflicts=True)
+        seeded += len(player_ids)
@@ -0,0 +1,50 @@
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import activity, stats
+from .cache import QUEST_PROGRESS, UNLOCKS, bump_version
+from .models import Achievement, PlayerQuestProgress
+
+
+def unlock_achievement(player, achievement):
+    """Выдать достижение и награду за него ровно один раз
+
+    Возвращает True, если достижение выдано именно этим вызовом.
+    Повторный запрос стоит одного поиска по уникальному индексу.
+    """
+    membership = Achievement.players.through
+    if membership.objects.filter(achievement_id=achievement.pk, player_id=player.pk).exists():
+        return False
+
+    try:
+        with transaction.atomic():
+            membership.objects.create(achievement_id=achievement.pk, player_id=player.pk)
+            player.grant(experience=achievement.experience_reward, points=achievement.points)
+            bump_version(UNLOCKS)
+            stats.bump(player.pk, achievements_unlocked=1)
+            activity.record(
+                player, 'achievement', game_id=achievement.game_id,
+                subject=achievement.name, target_id=achievement.pk,
+            )
+    except IntegrityError:
+        # Параллельный запрос успел выдать достижение первым
+        return False
+    return True
+
+
+def complete_quest(player, quest):
+    """Завершить квест и выдать награду ровно один раз
+
+    Условный UPDATE по completed=False служит блокировкой: из двух
+    одновременных запросов строку изменит только один.
+    """
+    with transaction.atomic():
+        updated = PlayerQuestProgress.objects.filter(
+            player=player, quest=quest, completed=False,
+        ).update(completed=True, progress=100, completed_at=timezone.now())
+        if not updated:
+            return False
+        player.grant(experience=quest.reward_experience, points=quest.reward_points)
+        bump_version(QUEST_PROGRESS)
+        activity.record(player, 'quest', game_id=quest.game_id, subject=quest.title, target_id=quest.pk)
+    return True
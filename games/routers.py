@@ -0,0 +1,68 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY_ALIAS = 'default'
+# Сессии всегда читаются с основной базы: отставшая реплика
+# не должна разлогинивать только что вошедшего пользователя
+PRIMARY_ONLY_APPS = {'sessions'}
+
+
+class RoutingState:
+    """Решение маршрутизации для текущего запроса"""
+
+    def __init__(self, use_replica=False):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+_state = ContextVar('games_routing_state', default=None)
+
+
+@contextmanager
+def routing(use_replica):
+    """Область, в которой чтения при возможности идут на реплику"""
+    state = RoutingState(use_replica)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def replica_alias():
+    return getattr(settings, 'REPLICA_DATABASE_ALIAS', None)
+
+
+class ReplicaRouter:
+    """Чтения разрешённых представлений идут на реплику, всё остальное на основную базу
+
+    Вне области routing() и без настроенной реплики маршрутизатор
+    ничего не решает, и Django использует default.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        replica = replica_alias()
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return None
+        if replica and state is not None and state.use_replica and not state.wrote:
+            return replica
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY_ALIAS, replica_alias()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплика получает схему вместе с данными из основной базы
+        return db == PRIMARY_ALIAS
@@ -0,0 +1,91 @@
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from .cache import bump_version
+from .leaderboard import refresh_ranks
+from .models import DailyQuest, Tournament
+from .standings import finalize_tournament
+
+BATCH_SIZE = 500
+
+
+def _transition(queryset, batch_size, **changes):
+    """Перевести строки queryset в новое состояние пачками по id
+
+    После UPDATE строки перестают подходить под условие queryset,
+    поэтому следующая пачка начинается с ещё не обработанных.
+    """
+    total = 0
+    while True:
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return total
+        updated = queryset.filter(pk__in=ids).update(**changes)
+        if not updated:
+            return total
+        total += updated
+
+
+def start_tournaments(now, batch_size=BATCH_SIZE):
+    return _transition(
+        Tournament.objects.filter(status='upcoming', start_date__lte=now), batch_size, status='active',
+    )
+
+
+def finish_tournaments(now, batch_size=BATCH_SIZE):
+    """Подвести итоги всех активных турниров, время которых вышло"""
+    finished = 0
+    due = Tournament.objects.filter(status='active', end_date__lte=now).order_by('end_date', 'pk')
+    while True:
+        batch = list(due[:batch_size])
+        if not batch:
+            return finished
+        for tournament in batch:
+            # finalize_tournament ставит статус finished, турнир выпадает из due
+            finalize_tournament(tournament)
+            finished += 1
+
+
+def switch_quests(now, batch_size=BATCH_SIZE):
+    """Включить квесты, чьё время началось, и выключить закончившиеся"""
+    running = Q(ends_at__isnull=True) | Q(ends_at__gt=now)
+    activated = _transition(
+        DailyQuest.objects.filter(running, is_active=False, starts_at__lte=now), batch_size, is_active=True,
+    )
+    deactivated = _transition(
+        DailyQuest.objects.filter(is_active=True, ends_at__lte=now), batch_size, is_active=False,
+    )
+    return activated, deactivated
+
+
+def run_due(now=None, batch_size=BATCH_SIZE):
+    """Выполнить все переходы, срок которых наступил к моменту now"""
+    now = now or timezone.now()
+    started = start_tournaments(now, batch_size)
+    finished = finish_tournaments(now, batch_size)
+    activated, deactivated = switch_quests(now, batch_size)
+    ranked = refresh_ranks()
+    if started or finished:
+        bump_version('games.Tournament')
+    if activated or deactivated:
+        bump_version('games.DailyQuest')
+    return {
+        'started': started,
+        'finished': finished,
+        'quests_activated': activated,
+        'quests_deactivated': deactivated,
+        'ranks_changed': ranked,
+    }
+
+
+def next_due(now=None):
+    """Ближайший момент, когда какому-то турниру или квесту пора сменить состояние"""
+    now = now or timezone.now()
+    candidates = [
+        Tournament.objects.filter(status='upcoming').aggregate(due=Min('start_date'))['due'],
+        Tournament.objects.filter(status='active').aggregate(due=Min('end_date'))['due'],
+        DailyQuest.objects.filter(is_active=False, starts_at__gt=now).aggregate(due=Min('starts_at'))['due'],
+        DailyQuest.objects.filter(is_active=True, ends_at__isnull=False).aggregate(due=Min('ends_at'))['due'],
+    ]
+    candidates = [due for due in candidates if due is not None]
+    return min(candidates) if candidates else None
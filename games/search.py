@@ -0,0 +1,212 @@
+import re
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Game, Player
+
+# Полнотекстовые индексы FTS5, rowid совпадает с id исходной строки
+PLAYER_INDEX = 'games_player_search'
+INDEXED_FIELDS = ('username', 'first_name', 'last_name')
+GAME_INDEX = 'games_game_search'
+GAME_INDEXED_FIELDS = ('name', 'description')
+
+PAGE_SIZE = 20
+# Дальше листать поиск бессмысленно, а огромный OFFSET не влезает в INTEGER SQLite
+MAX_PAGE = 500
+AUTOCOMPLETE_LIMIT = 10
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def fts_enabled():
+    """FTS5 есть только у SQLite, на других базах работает запасной поиск"""
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(text):
+    """Запрос MATCH: каждое слово как префикс, слова объединяются через AND"""
+    return ' '.join(f'"{token}"*' for token in _TOKEN_RE.findall(text))
+
+
+def _replace_row(table, rowid, values):
+    columns = ', '.join(['rowid', *values])
+    placeholders = ', '.join(['%s'] * (len(values) + 1))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [rowid])
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}) VALUES ({placeholders})',
+            [rowid, *values.values()],
+        )
+
+
+def _delete_row(table, rowid):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [rowid])
+
+
+def index_user(user):
+    """Обновить запись пользователя в индексе"""
+    if fts_enabled():
+        _replace_row(PLAYER_INDEX, user.pk, {field: getattr(user, field) for field in INDEXED_FIELDS})
+
+
+def unindex_user(user_id):
+    """Убрать пользователя из индекса"""
+    if fts_enabled():
+        _delete_row(PLAYER_INDEX, user_id)
+
+
+def index_game(game):
+    """Обновить запись игры в индексе каталога"""
+    if fts_enabled():
+        _replace_row(GAME_INDEX, game.pk, {field: getattr(game, field) for field in GAME_INDEXED_FIELDS})
+
+
+def unindex_game(game_id):
+    """Убрать игру из индекса каталога"""
+    if fts_enabled():
+        _delete_row(GAME_INDEX, game_id)
+
+
+def rebuild_player_index():
+    """Перестроить индекс игроков целиком, например после bulk_create"""
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {PLAYER_INDEX}')
+        cursor.execute(
+            f'INSERT INTO {PLAYER_INDEX} (rowid, username, first_name, last_name) '
+            f'SELECT id, username, first_name, last_name FROM auth_user'
+        )
+
+
+def rebuild_game_index():
+    """Перестроить индекс каталога целиком"""
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {GAME_INDEX}')
+        cursor.execute(
+            f'INSERT INTO {GAME_INDEX} (rowid, name, description) '
+            f'SELECT id, name, description FROM games_game'
+        )
+
+
+def rebuild_indexes():
+    rebuild_player_index()
+    rebuild_game_index()
+
+
+def game_text_filter(text):
+    """Условие для Game по тексту в названии или описании
+
+    На SQLite это подзапрос к FTS5, поэтому оно сочетается с любыми
+    другими фильтрами и подсчётом фасетов в одном SQL-запросе.
+    """
+    query = match_expression(text)
+    if not query:
+        return Q()
+    if fts_enabled():
+        return Q(pk__in=RawSQL(f'SELECT rowid FROM {GAME_INDEX} WHERE {GAME_INDEX} MATCH %s', [query]))
+
+    condition = Q()
+    for token in _TOKEN_RE.findall(text):
+        condition &= Q(name__icontains=token) | Q(description__icontains=token)
+    return condition
+
+
+def _matching_user_ids(text, limit, offset=0):
+    """id пользователей по убыванию релевантности (bm25)"""
+    query = match_expression(text)
+    if not query:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {PLAYER_INDEX} WHERE {PLAYER_INDEX} MATCH %s '
+            f'ORDER BY rank, rowid LIMIT %s OFFSET %s',
+            [query, limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fallback_players(text):
+    """Поиск по началу слова без полнотекстового индекса"""
+    players = Player.objects.select_related('user').order_by('user__username')
+    for token in _TOKEN_RE.findall(text):
+        players = players.filter(
+            Q(user__username__istartswith=token)
+            | Q(user__first_name__istartswith=token)
+            | Q(user__last_name__istartswith=token)
+        )
+    return players
+
+
+def page_number(raw):
+    """Номер страницы из параметра запроса в пределах 1..MAX_PAGE"""
+    try:
+        page = int(raw)
+    except (TypeError, ValueError):
+        return 1
+    return min(max(page, 1), MAX_PAGE)
+
+
+def search_players(text, page=1, per_page=PAGE_SIZE):
+    """Страница найденных игроков и признак следующей страницы
+
+    Берётся на одну запись больше страницы, чтобы обойтись без COUNT.
+    """
+    offset = (min(max(page, 1), MAX_PAGE) - 1) * per_page
+    if not fts_enabled():
+        players = list(_fallback_players(text)[offset:offset + per_page + 1])
+        return players[:per_page], len(players) > per_page
+
+    user_ids = _matching_user_ids(text, per_page + 1, offset)
+    has_next = len(user_ids) > per_page
+    user_ids = user_ids[:per_page]
+    players = Player.objects.select_related('user').in_bulk(user_ids, field_name='user_id')
+    return [players[user_id] for user_id in user_ids if user_id in players], has_next
+
+
+def autocomplete(text, limit=AUTOCOMPLETE_LIMIT):
+    """Первые limit совпадений по префиксу в компактном виде"""
+    if fts_enabled():
+        user_ids = _matching_user_ids(text, limit)
+        users = User.objects.only(*INDEXED_FIELDS).in_bulk(user_ids)
+        users = [users[user_id] for user_id in user_ids if user_id in users]
+    else:
+        users = [player.user for player in _fallback_players(text)[:limit]]
+    return [
+        {'username': user.username, 'full_name': user.get_full_name()}
+        for user in users
+    ]
+
+
+@receiver(post_save, sender=User)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    """Переиндексировать пользователя, если изменились искомые поля"""
+    if update_fields is not None and not set(INDEXED_FIELDS) & set(update_fields):
+        return
+    index_user(instance)
+
+
+@receiver(post_delete, sender=User)
+def remove_from_search_index(sender, instance, **kwargs):
+    unindex_user(instance.pk)
+
+
+@receiver(post_save, sender=Game)
+def update_game_index(sender, instance, update_fields=None, **kwargs):
+    """Переиндексировать игру, если изменились название или описание"""
+    if update_fields is not None and not set(GAME_INDEXED_FIELDS) & set(update_fields):
+        return
+    index_game(instance)
+
+
+@receiver(post_delete, sender=Game)
+def remove_game_from_index(sender, instance, **kwargs):
+    unindex_game(instance.pk)
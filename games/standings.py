@@ -0,0 +1,156 @@
+from dataclasses import dataclass
+from itertools import groupby
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Subquery
+
+from . import stats
+from .cache import CACHED_USERS, bump_version
+from .models import Player, Tournament, TournamentResult
+
+BATCH_SIZE = 2000
+
+
+@dataclass
+class Standing:
+    player_id: int
+    score: int
+    position: int = 0
+    prize: int = 0
+
+
+@dataclass
+class FinalizeResult:
+    participants: int
+    winners: int
+    credited: int
+
+
+def compute_standings(scores, prize_pool, payouts=None):
+    """Места по убыванию очков с общими местами при равенстве (1, 2, 2, 4)
+
+    Игроки на общем месте делят поровну доли всех мест, которые они
+    занимают; остаток от деления не выплачивается.
+    """
+    payouts = settings.TOURNAMENT_PAYOUTS if payouts is None else payouts
+    standings = sorted(
+        (Standing(player_id, score) for player_id, score in scores),
+        key=lambda standing: (-standing.score, standing.player_id),
+    )
+
+    position = 1
+    for _, group in groupby(standings, key=lambda standing: standing.score):
+        group = list(group)
+        share = sum(payouts[position - 1:position - 1 + len(group)])
+        prize = prize_pool * share // (100 * len(group))
+        for standing in group:
+            standing.position = position
+            standing.prize = prize
+        position += len(group)
+    return standings
+
+
+def ingest_scores(tournament, scores, batch_size=BATCH_SIZE):
+    """Записать очки участников одним пакетным upsert по (турнир, игрок)
+
+    Строки игроков, не записанных в турнир, пропускаются.
+    Возвращает число записанных строк.
+    """
+    membership = Tournament.participants.through
+    participant_ids = set(
+        membership.objects.filter(tournament_id=tournament.pk).values_list('player_id', flat=True)
+    )
+    rows = [
+        TournamentResult(tournament_id=tournament.pk, player_id=player_id, score=score, position=0)
+        for player_id, score in dict(scores).items()
+        if player_id in participant_ids
+    ]
+    with transaction.atomic():
+        TournamentResult.objects.bulk_create(
+            rows,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['tournament', 'player'],
+            update_fields=['score'],
+        )
+    bump_version('games.TournamentResult')
+    return len(rows)
+
+
+def _credit_prizes(tournament):
+    """Начислить невыплаченную часть призов одним UPDATE по всем игрокам"""
+    pending = TournamentResult.objects.filter(tournament=tournament).exclude(prize=F('credited_prize'))
+    delta = pending.filter(player_id=OuterRef('pk')).values(delta=F('prize') - F('credited_prize'))[:1]
+    credited = Player.objects.filter(pk__in=pending.values('player_id')).update(
+        total_points=F('total_points') + Subquery(delta),
+    )
+    if credited:
+        bump_version(CACHED_USERS)
+    pending.update(credited_prize=F('prize'))
+    return credited
+
+
+def _rank_positions(tournament):
+    """Места всех участников одним UPDATE с оконной функцией RANK()
+
+    RANK() даёт ту же нумерацию с общими местами, что и compute_standings,
+    а строки, чьё место не изменилось, не переписываются.
+    """
+    table = TournamentResult._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'''
+            UPDATE {table} SET position = ranked.position
+            FROM (
+                SELECT id, RANK() OVER (ORDER BY score DESC) AS position
+                FROM {table} WHERE tournament_id = %s
+            ) AS ranked
+            WHERE {table}.id = ranked.id AND {table}.position != ranked.position
+            ''',
+            [tournament.pk],
+        )
+
+
+def _distribute_prizes(tournament, payouts):
+    """Призы получают только строки на призовых местах, у остальных приз обнуляется"""
+    results = TournamentResult.objects.filter(tournament=tournament)
+    winners = {row.player_id: row for row in results.filter(position__lte=len(payouts))}
+    results.exclude(player_id__in=winners).exclude(prize=0).update(prize=0)
+
+    changed = []
+    for standing in compute_standings(
+        ((row.player_id, row.score) for row in winners.values()), tournament.prize_pool, payouts,
+    ):
+        row = winners[standing.player_id]
+        if row.prize != standing.prize:
+            row.prize = standing.prize
+            changed.append(row)
+    TournamentResult.objects.bulk_update(changed, ['prize'])
+    return sum(1 for row in winners.values() if row.prize)
+
+
+def finalize_tournament(tournament, payouts=None):
+    """Расставить места, распределить фонд и начислить призы
+
+    Повторный запуск пересчитывает места по текущим очкам и начисляет
+    только разницу с уже выплаченным, поэтому безопасен.
+    """
+    payouts = settings.TOURNAMENT_PAYOUTS if payouts is None else payouts
+    with transaction.atomic():
+        _rank_positions(tournament)
+        winners = _distribute_prizes(tournament, payouts)
+        credited = _credit_prizes(tournament)
+        stats.refresh_best_finish(tournament)
+        Tournament.objects.filter(pk=tournament.pk).update(status='finished')
+    tournament.status = 'finished'
+
+    bump_version('games.Player')
+    bump_version('games.Tournament')
+    bump_version('games.TournamentResult')
+    bump_version('games.PlayerStats')
+    return FinalizeResult(
+        participants=TournamentResult.objects.filter(tournament=tournament).count(),
+        winners=winners,
+        credited=credited,
+    )
@@ -0,0 +1,88 @@
+import gzip
+import re
+from functools import cached_property
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, StaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # Brotli необязателен, без него пишется только gzip
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.xml', '.map', '.html')
+# Меньше этого сжатие не окупает лишний файл и заголовки
+MIN_COMPRESS_SIZE = 256
+
+_STRING = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')''')
+_COMMENT = re.compile(r'/\*(?!!).*?\*/', re.S)
+_SPACE = re.compile(r'\s+')
+_AROUND_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+_AFTER_COLON = re.compile(r':\s+')
+
+
+def minify_css(css):
+    """Убрать комментарии и лишние пробелы, не трогая строки в кавычках"""
+    css = _COMMENT.sub('', css)
+    parts = _STRING.split(css)
+    for index in range(0, len(parts), 2):
+        chunk = _SPACE.sub(' ', parts[index])
+        chunk = _AROUND_PUNCTUATION.sub(r'\1', chunk)
+        parts[index] = _AFTER_COLON.sub(':', chunk).replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+def compressed_variants(content):
+    """Пары (расширение, данные) для предсжатых копий, которые меньше оригинала"""
+    if len(content) < MIN_COMPRESS_SIZE:
+        return []
+    variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(content, quality=11)))
+    return [(suffix, data) for suffix, data in variants if len(data) < len(content)]
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хешированные имена из манифеста, минифицированный CSS и .gz/.br рядом с файлами
+
+    Пока collectstatic не запускался (разработка, тесты), url()
+    возвращает исходное имя вместо ошибки об отсутствии манифеста.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            self._optimize(name)
+
+    def _optimize(self, name):
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS) or not self.exists(name):
+            return
+        with self.open(name) as source:
+            content = source.read()
+        if name.endswith('.css'):
+            # Хеш в имени уже посчитан по исходнику и остаётся уникальным для него
+            content = minify_css(content.decode()).encode()
+            self._replace(name, content)
+        for suffix, data in compressed_variants(content):
+            self._replace(name + suffix, data)
+
+    def _replace(self, name, content):
+        if self.exists(name):
+            self.delete(name)
+        self.save(name, ContentFile(content))
+
+    def url(self, name, force=False):
+        try:
+            return super().url(name, force)
+        except ValueError:
+            return StaticFilesStorage.url(self, name)
+
+    def is_hashed(self, name):
+        """Имя из манифеста: содержимое по нему никогда не меняется"""
+        return name in self._hashed_names
+
+    @cached_property
+    def _hashed_names(self):
+        return set(self.hashed_files.values())
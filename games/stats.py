@@ -0,0 +1,172 @@
+from django.db.models import Count, F, Min, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .cache import bump_version
+from .models import (
+    Achievement, Friendship, GameReview, Player, PlayerGame, PlayerStats, Tournament, TournamentResult,
+)
+
+BATCH_SIZE = 2000
+
+AchievementHolder = Achievement.players.through
+TournamentEntry = Tournament.participants.through
+
+
+def _per_player(queryset, aggregate):
+    """Подзапрос с агрегатом по строкам игрока из внешнего запроса"""
+    return Subquery(
+        queryset.filter(player_id=OuterRef('player_id'))
+        .order_by().values('player_id')
+        .annotate(value=aggregate).values('value')
+    )
+
+
+def _sources():
+    return {
+        'games_started': Coalesce(_per_player(PlayerGame.objects.all(), Count('*')), Value(0)),
+        'achievements_unlocked': Coalesce(_per_player(AchievementHolder.objects.all(), Count('*')), Value(0)),
+        'hours_played': Coalesce(_per_player(PlayerGame.objects.all(), Sum('hours_played')), Value(0)),
+        'reviews_written': Coalesce(_per_player(GameReview.objects.all(), Count('*')), Value(0)),
+        'tournaments_entered': Coalesce(_per_player(TournamentEntry.objects.all(), Count('*')), Value(0)),
+        'best_finish': _per_player(TournamentResult.objects.filter(position__gt=0), Min('position')),
+        'friend_count': Coalesce(_per_player(Friendship.objects.all(), Count('*')), Value(0)),
+    }
+
+
+def recount(player_ids=None, fields=None, batch_size=BATCH_SIZE):
+    """Пересчитать сводку по исходным таблицам одним UPDATE на пачку игроков
+
+    Недостающие строки сводки создаются. Без player_ids пересчитываются все игроки.
+    """
+    if player_ids is None:
+        player_ids = Player.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=batch_size)
+    sources = _sources()
+    changes = {field: sources[field] for field in (fields or sources)}
+
+    total = 0
+    batch = []
+    for player_id in player_ids:
+        batch.append(player_id)
+        if len(batch) >= batch_size:
+            total += _recount_batch(batch, changes)
+            batch = []
+    if batch:
+        total += _recount_batch(batch, changes)
+    bump_version('games.PlayerStats')
+    return total
+
+
+def _recount_batch(player_ids, changes):
+    PlayerStats.objects.bulk_create(
+        [PlayerStats(player_id=player_id) for player_id in player_ids], ignore_conflicts=True,
+    )
+    return PlayerStats.objects.filter(player_id__in=player_ids).update(**changes)
+
+
+def bump(player_id, **deltas):
+    """Сдвинуть счётчики игрока одним UPDATE
+
+    Если строки сводки ещё нет, её целиком посчитает stats_for при чтении;
+    здесь она не создаётся, чтобы не мешать каскадному удалению игрока.
+    """
+    PlayerStats.objects.filter(player_id=player_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    bump_version('games.PlayerStats')
+
+
+def stats_for(player):
+    """Сводка игрока для страниц профиля"""
+    try:
+        return PlayerStats.objects.get(player_id=player.pk)
+    except PlayerStats.DoesNotExist:
+        recount([player.pk])
+        return PlayerStats.objects.get(player_id=player.pk)
+
+
+@receiver(post_save, sender=PlayerGame)
+def count_game(sender, instance, created, **kwargs):
+    if created:
+        bump(instance.player_id, games_started=1, hours_played=instance.hours_played)
+    else:
+        # Часы меняются редко и только правкой строки, дешевле пересчитать сумму
+        recount([instance.player_id], fields=['hours_played'])
+
+
+@receiver(post_delete, sender=PlayerGame)
+def uncount_game(sender, instance, **kwargs):
+    bump(instance.player_id, games_started=-1, hours_played=-instance.hours_played)
+
+
+@receiver(post_save, sender=GameReview)
+def count_review(sender, instance, created, **kwargs):
+    if created:
+        bump(instance.player_id, reviews_written=1)
+
+
+@receiver(post_delete, sender=GameReview)
+def uncount_review(sender, instance, **kwargs):
+    bump(instance.player_id, reviews_written=-1)
+
+
+@receiver(m2m_changed, sender=AchievementHolder)
+@receiver(m2m_changed, sender=TournamentEntry)
+def recount_relation(sender, instance, action, reverse, pk_set, **kwargs):
+    """Правки связей через add()/remove()/clear() и админку
+
+    Строки автоматических таблиц связи не шлют post_save и post_delete,
+    поэтому rewards и participation сдвигают счётчики сами.
+    """
+    if sender is AchievementHolder:
+        field, owner = 'achievements_unlocked', 'achievement_id'
+    else:
+        field, owner = 'tournaments_entered', 'tournament_id'
+    if action == 'pre_clear' and not reverse:
+        instance._cleared_player_ids = list(
+            sender.objects.filter(**{owner: instance.pk}).values_list('player_id', flat=True)
+        )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        player_ids = [instance.pk]
+    elif action == 'post_clear':
+        player_ids = instance.__dict__.pop('_cleared_player_ids', [])
+    else:
+        player_ids = pk_set
+    recount(player_ids, fields=[field])
+
+
+@receiver(pre_delete, sender=Achievement)
+@receiver(pre_delete, sender=Tournament)
+def remember_members(sender, instance, **kwargs):
+    """Каскадное удаление чистит таблицы связи без m2m_changed,
+    поэтому затронутых игроков запоминаем до удаления
+    """
+    through = AchievementHolder if sender is Achievement else TournamentEntry
+    owner = 'achievement_id' if sender is Achievement else 'tournament_id'
+    instance._member_ids = list(through.objects.filter(**{owner: instance.pk}).values_list('player_id', flat=True))
+    if sender is Tournament:
+        instance._member_ids += TournamentResult.objects.filter(tournament=instance).values_list('player_id', flat=True)
+
+
+@receiver(post_delete, sender=Achievement)
+@receiver(post_delete, sender=Tournament)
+def recount_members(sender, instance, **kwargs):
+    player_ids = set(instance.__dict__.pop('_member_ids', ()))
+    if not player_ids:
+        return
+    if sender is Achievement:
+        fields = ['achievements_unlocked']
+    else:
+        fields = ['tournaments_entered', 'best_finish']
+    recount(sorted(player_ids), fields=fields)
+
+
+def refresh_best_finish(tournament):
+    """Обновить лучшее место всех участников турнира после подведения итогов"""
+    participants = TournamentResult.objects.filter(tournament=tournament).values('player_id')
+    return PlayerStats.objects.filter(player_id__in=participants).update(best_finish=_sources()['best_finish'])
@@ -0,0 +1,35 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from games import images
+
+register = template.Library()
+
+
+def _srcset(candidates):
+    return ', '.join(f'{url} {density}x' for url, density in candidates)
+
+
+@register.simple_tag
+def srcset(file, preset):
+    """srcset производных в исходном формате для атрибута img"""
+    derived = images.sources(file, preset)
+    return _srcset(derived['fallback']) if derived else ''
+
+
+@register.simple_tag
+def picture(file, preset, **attrs):
+    """<picture> с WebP и запасным форматом; при ошибке выводится оригинал"""
+    attributes = format_html_join(' ', '{}="{}"', sorted(attrs.items()))
+    derived = images.sources(file, preset)
+    if derived is None:
+        return format_html('<img src="{}" loading="lazy" {}>', file.url, attributes)
+
+    src = derived['fallback'][0][0]
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}">'
+        '<img src="{}" srcset="{}" loading="lazy" {}>'
+        '</picture>',
+        _srcset(derived['webp']), src, _srcset(derived['fallback']), attributes,
+    )
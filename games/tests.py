@@ -0,0 +1,1212 @@
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Q
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .models import (
+    Achievement, ActivityEvent, DailyQuest, FriendRequest, Game, GameReview, Player, PlayerGame,
+    PlayerQuestArchive, PlayerQuestProgress, PlayerStats, TimelineEntry, Tournament, TournamentResult,
+    experience_for_level, level_for_experience,
+)
+from . import activity, friends, images, leaderboard, participation, quests, rewards, scheduler, search, standings, stats
+from .importer import import_games, read_rows
+from .cache import LOCAL_TIMEOUT, QUEST_PROGRESS, bump_version, cache_timeout, model_versions
+from .catalog import search_catalog
+from .friends import FRIENDS_TIMEOUT
+from .forms import CatalogSearchForm
+from .middleware import PrecompressedStaticMiddleware, ReplicaMiddleware
+from .pagination import InvalidCursor, encode_cursor
+from .routers import ReplicaRouter, routing
+from .staticfiles import minify_css
+
+# Максимум SQL-запросов на страницу для авторизованного игрока при пустом
+# кэше, включая чтение сессии и пользователя вместе с игроком
+QUERY_BUDGETS = {
+    'home': 8,
+    'games_list': 4,
+    'game_detail': 7,
+    'leaderboard': 6,
+    'tournaments': 3,
+    'tournament_detail': 5,
+    'daily_quests': 4,
+    'search_players': 4,
+    'friend_requests': 3,
+    'friends': 6,
+    'friends_leaderboard': 4,
+    'game_leaderboard': 8,
+    'feed': 6,
+    'player_profile': 8,
+    'dashboard': 5,
+}
+
+
+class DatasetMixin:
+    """Наполнение базы, которое можно наращивать между замерами"""
+
+    def grow(self, size):
+        start = Game.objects.count()
+        for i in range(start, start + size):
+            game = Game.objects.create(
+                name=f'Game {i}', description=f'Описание {i}', genre=f'Genre {i % 3}',
+                release_date=date(2015 + i % 8, 1, 1), rating=i % 10,
+            )
+            user = User.objects.create(username=f'player{i}', first_name='Player', last_name=str(i))
+            player = user.player
+            player.grant(experience=i * 40, points=i)
+            # Нечётные игроки дружат со мной, чётные с предыдущим нечётным
+            if i % 2:
+                FriendRequest.objects.create(from_player=self.player, to_player=player, status='accepted')
+                self.last_friend = player
+            elif getattr(self, 'last_friend', None):
+                FriendRequest.objects.create(from_player=player, to_player=self.last_friend).accept()
+
+            achievement = Achievement.objects.create(name=f'Achievement {i}', description='-', game=self.game)
+            rewards.unlock_achievement(player, achievement)
+            PlayerGame.objects.create(player=player, game=self.game, game_points=i * 10)
+            PlayerGame.objects.create(player=player, game=game)
+            GameReview.objects.create(game=self.game, player=player, rating=i % 5 + 1, title='-', text='-')
+            DailyQuest.objects.create(title=f'Quest {i}', description='-', game=game)
+            FriendRequest.objects.create(from_player=player, to_player=self.player)
+
+            tournament = Tournament.objects.create(
+                name=f'Tournament {i}', description='-', game=game,
+                start_date=timezone.now(), end_date=timezone.now() + timedelta(days=1),
+            )
+            participation.join_tournament(player, self.tournament)
+            participation.join_tournament(player, tournament)
+
+
+@override_settings(DEBUG=True)
+class QueryBudgetTests(DatasetMixin, TestCase):
+    """Число запросов на странице ограничено и не растёт вместе с данными"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='me')
+        self.player = self.user.player
+        self.game = Game.objects.create(
+            name='Main', description='-', genre='RPG', release_date=date(2020, 1, 1),
+        )
+        self.tournament = Tournament.objects.create(
+            name='Main', description='-', game=self.game,
+            start_date=timezone.now(), end_date=timezone.now() + timedelta(days=1),
+        )
+        PlayerGame.objects.create(player=self.player, game=self.game, game_points=25)
+        self.client.force_login(self.user)
+
+    def urls(self):
+        return {
+            'home': reverse('home'),
+            'games_list': reverse('games_list'),
+            'game_detail': reverse('game_detail', args=[self.game.pk]),
+            'leaderboard': reverse('leaderboard'),
+            'tournaments': reverse('tournaments'),
+            'tournament_detail': reverse('tournament_detail', args=[self.tournament.pk]),
+            'daily_quests': reverse('daily_quests'),
+            'search_players': reverse('search_players') + '?search=play',
+            'friend_requests': reverse('friend_requests'),
+            'friends': reverse('friends'),
+            'friends_leaderboard': reverse('friends_leaderboard'),
+            'game_leaderboard': reverse('game_leaderboard', args=[self.game.pk]),
+            'feed': reverse('feed'),
+            'player_profile': reverse('player_profile', args=['player1']),
+            'dashboard': reverse('dashboard'),
+        }
+
+    def measure(self, url):
+        # Первый запрос прогревает ленивые строки, например прогресс квестов
+        self.client.get(url)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries)
+
+    def test_budgets_hold_as_data_grows(self):
+        self.grow(3)
+        small = {name: self.measure(url) for name, url in self.urls().items()}
+        self.grow(12)
+        large = {name: self.measure(url) for name, url in self.urls().items()}
+
+        for name, budget in QUERY_BUDGETS.items():
+            with self.subTest(view=name):
+                self.assertLessEqual(large[name], budget)
+                self.assertEqual(large[name], small[name], 'число запросов растёт с данными')
+
+    def test_every_budgeted_view_is_measured(self):
+        self.assertEqual(set(self.urls()), set(QUERY_BUDGETS))
+
+
+class QueryStatsMiddlewareTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(DEBUG=True)
+    def test_header_in_debug(self):
+        response = self.client.get(reverse('games_list'))
+        self.assertRegex(response['X-Query-Stats'], r'^view=games_list; count=\d+; time=[\d.]+ms$')
+
+    def test_structured_log_in_production(self):
+        with self.assertLogs('games.queries', level='INFO') as logs:
+            response = self.client.get(reverse('games_list'))
+        self.assertNotIn('X-Query-Stats', response)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['url_name'], 'games_list')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['query_count'], 0)
+        self.assertLessEqual(len(record['slowest']), record['query_count'])
+
+
+@override_settings(
+    CACHE_SHARED=True,
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    AUTHENTICATION_BACKENDS=['games.auth.CachedPlayerBackend'],
+)
+class CachedAuthTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='cached')
+        self.client.force_login(self.user)
+
+    def auth_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('tournaments'))
+        tables = ('django_session', 'auth_user', 'games_player')
+        return response, [query['sql'] for query in queries if any(table in query['sql'] for table in tables)]
+
+    def test_warm_request_skips_session_and_user_queries(self):
+        self.auth_queries()
+        response, queries = self.auth_queries()
+        self.assertEqual(queries, [])
+        self.assertEqual(response.context['player'].level, 1)
+
+        Player.objects.filter(user=self.user).grant(experience=1000)
+        response, queries = self.auth_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertGreater(response.context['player'].level, 1)
+
+    def test_other_players_do_not_evict_user(self):
+        self.auth_queries()
+        other = User.objects.create(username='other')
+        other.player.grant(experience=1000)
+        Client().force_login(other)
+        response, queries = self.auth_queries()
+        self.assertEqual(queries, [])
+
+    @override_settings(
+        CACHE_SHARED=False,
+        SESSION_ENGINE='django.contrib.sessions.backends.db',
+        AUTHENTICATION_BACKENDS=['games.auth.PlayerBackend'],
+    )
+    def test_local_cache_reads_session_and_user_from_db(self):
+        self.client.force_login(self.user)
+        self.auth_queries()
+        response, queries = self.auth_queries()
+        self.assertEqual(len(queries), 2)
+        self.assertIn('games_player', queries[1])
+        self.assertEqual(response.context['player'].level, 1)
+
+    def test_login_keeps_player_version(self):
+        self.user.set_password('secret-pass')
+        self.user.save()
+        version = model_versions('games.Player')
+        self.assertTrue(self.client.login(username='cached', password='secret-pass'))
+        self.assertEqual(model_versions('games.Player'), version)
+
+
+class FriendGraphTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.players = [User.objects.create(username=f'p{i}').player for i in range(5)]
+
+    def befriend(self, a, b):
+        FriendRequest.objects.create(from_player=self.players[a], to_player=self.players[b]).accept()
+
+    def test_accept_links_both_ways_and_resets_cache(self):
+        me, other = self.players[0], self.players[1]
+        self.assertEqual(friends.friend_ids(me.pk), frozenset())
+        self.befriend(1, 0)
+        self.assertEqual(friends.friend_ids(me.pk), {other.pk})
+        self.assertEqual(friends.friend_ids(other.pk), {me.pk})
+
+        FriendRequest.objects.filter(from_player=other).get().delete()
+        self.assertEqual(friends.friend_ids(me.pk), frozenset())
+
+    def test_suggestions_ranked_by_mutual_friends_then_games(self):
+        game = Game.objects.create(name='Shared', description='-', genre='RPG', release_date=date(2020, 1, 1))
+        self.befriend(0, 1)
+        self.befriend(0, 2)
+        self.befriend(1, 3)
+        self.befriend(1, 4)
+        self.befriend(2, 4)
+        PlayerGame.objects.create(player=self.players[0], game=game)
+        PlayerGame.objects.create(player=self.players[3], game=game)
+
+        suggested = friends.suggestions(self.players[0])
+        self.assertEqual([player.pk for player in suggested], [self.players[4].pk, self.players[3].pk])
+        self.assertEqual((suggested[0].mutual_count, suggested[1].shared_games), (2, 1))
+        self.assertEqual(friends.mutual_friend_ids(self.players[0], self.players[4]),
+                         {self.players[1].pk, self.players[2].pk})
+
+
+class LeaderboardTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='me')
+
+    def test_pages_and_window_match_order_by(self):
+        for i in range(11):
+            player = User.objects.create(username=f'lb{i}').player
+            Player.objects.filter(pk=player.pk).update(level=i % 4 + 1, experience=(i * 37) % 50)
+        expected = list(Player.objects.order_by('-level', '-experience', 'id').values_list('pk', flat=True))
+
+        ranked, cursor = [], None
+        while True:
+            players, cursor = leaderboard.leaderboard_page(cursor, size=4)
+            ranked.extend((player.rank, player.pk) for player in players)
+            if cursor is None:
+                break
+        self.assertEqual(ranked, list(enumerate(expected, 1)))
+
+        me = Player.objects.get(pk=expected[5])
+        self.assertIsNone(leaderboard.player_rank(me))
+        self.assertEqual(leaderboard.players_around(me), [])
+
+        self.assertEqual(leaderboard.refresh_ranks(), len(expected))
+        self.assertEqual(leaderboard.player_rank(me), 6)
+        with self.assertNumQueries(2):
+            window = leaderboard.players_around(me, radius=2)
+            names = [p.user.username for p in window]
+        self.assertEqual([(p.rank, p.pk) for p in window], [(rank, expected[rank - 1]) for rank in range(4, 9)])
+        self.assertEqual(len(names), 5)
+        top = leaderboard.players_around(Player.objects.get(pk=expected[0]), radius=2)
+        self.assertEqual([p.rank for p in top], [1, 2, 3])
+
+        # Пересчёт переписывает только места, которые сдвинулись
+        Player.objects.filter(pk=expected[-1]).update(level=100)
+        self.assertEqual(leaderboard.refresh_ranks(), len(expected))
+        self.assertEqual(leaderboard.refresh_ranks(), 0)
+        self.assertEqual(leaderboard.player_rank(me), 7)
+
+    def test_tampered_cursor_is_rejected(self):
+        self.client.force_login(self.user)
+        for values in (['a', 'b', 'c', 'd'], [1, 2, 3, 'x'], [None, None, None, None], [1, 2, 3, -1],
+                       [True, 1, 1, 1], [10 ** 30, 1, 1, 1], [[1], 1, [1], 1]):
+            with self.subTest(values=values):
+                cursor = encode_cursor(values)
+                with self.assertRaises(InvalidCursor):
+                    leaderboard.leaderboard_page(cursor)
+                response = self.client.get(reverse('leaderboard'), {'after': cursor})
+                self.assertEqual(response.status_code, 200)
+
+
+class LevelCurveTests(TestCase):
+
+    def test_curve_is_inverted_at_boundaries(self):
+        for level in range(1, 200):
+            start = experience_for_level(level)
+            self.assertEqual(level_for_experience(start), level)
+            self.assertEqual(level_for_experience(start - 1), max(level - 1, 1))
+
+    def test_grant_matches_python_curve(self):
+        player = User.objects.create(username='grower').player
+        for amount in (0, 99, 1, 250, 5000, 123456, 7):
+            with self.subTest(amount=amount):
+                total = player.total_experience + amount
+                player.grant(experience=amount, points=3)
+                stored = Player.objects.get(pk=player.pk)
+                self.assertEqual(stored.level, level_for_experience(total))
+                self.assertEqual(stored.experience, total - experience_for_level(stored.level))
+                self.assertEqual(
+                    (stored.level, stored.experience, stored.total_points),
+                    (player.level, player.experience, player.total_points),
+                )
+        with self.assertRaises(ValueError):
+            player.grant(experience=-1)
+
+
+class RewardTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.player = User.objects.create(username='rewarded').player
+        self.game = Game.objects.create(name='Rewards', description='-', genre='RPG', release_date=date(2020, 1, 1))
+
+    def totals(self):
+        player = Player.objects.get(pk=self.player.pk)
+        return player.total_experience, player.total_points
+
+    def test_second_unlock_grants_nothing(self):
+        achievement = Achievement.objects.create(
+            name='Once', description='-', game=self.game, points=10, experience_reward=150,
+        )
+        self.assertTrue(rewards.unlock_achievement(self.player, achievement))
+        self.assertEqual(self.totals(), (150, 10))
+        self.assertFalse(rewards.unlock_achievement(self.player, achievement))
+        self.assertEqual(self.totals(), (150, 10))
+        self.assertEqual(achievement.players.count(), 1)
+
+    def test_second_quest_completion_grants_nothing(self):
+        quest = DailyQuest.objects.create(
+            title='Daily', description='-', game=self.game, reward_points=50, reward_experience=100,
+        )
+        self.assertFalse(rewards.complete_quest(self.player, quest))
+        quests.progress_for(self.player, [quest])
+        self.assertTrue(rewards.complete_quest(self.player, quest))
+        self.assertFalse(rewards.complete_quest(self.player, quest))
+        self.assertEqual(self.totals(), (100, 50))
+        self.assertEqual(ActivityEvent.objects.filter(verb='quest').count(), 1)
+
+
+class GameDetailTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unlocked_achievements_are_marked(self):
+        user = User.objects.create(username='viewer')
+        game = Game.objects.create(name='Marked', description='-', genre='RPG', release_date=date(2020, 1, 1))
+        unlocked = Achievement.objects.create(name='Got it', description='-', game=game)
+        locked = Achievement.objects.create(name='Not yet', description='-', game=game)
+        rewards.unlock_achievement(User.objects.create(username='other').player, locked)
+        rewards.unlock_achievement(user.player, unlocked)
+
+        self.client.force_login(user)
+        response = self.client.get(reverse('game_detail', args=[game.pk]))
+        marks = {achievement.pk: achievement.is_unlocked for achievement in response.context['achievements']}
+        self.assertEqual(marks, {unlocked.pk: True, locked.pk: False})
+        self.assertContains(response, 'Получено', count=1)
+        self.assertContains(response, reverse('add_achievement', args=[locked.pk]))
+
+
+class ReviewStatsTests(TestCase):
+
+    FIELDS = ('review_count', 'review_sum', 'review_average', 'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5')
+
+    def counters(self):
+        return Game.objects.filter(pk=self.game.pk).values(*self.FIELDS).get()
+
+    def assert_matches_rebuild(self):
+        incremental = self.counters()
+        call_command('rebuild_review_stats', stdout=io.StringIO())
+        self.assertEqual(self.counters(), incremental)
+        return incremental
+
+    def test_counters_follow_create_edit_delete(self):
+        self.game = Game.objects.create(name='Reviewed', description='-', genre='RPG', release_date=date(2020, 1, 1))
+        players = [User.objects.create(username=f'critic{i}').player for i in range(3)]
+        reviews = [
+            GameReview.objects.create(game=self.game, player=player, rating=rating, title='-', text='-')
+            for player, rating in zip(players, (5, 3, 5))
+        ]
+        counters = self.assert_matches_rebuild()
+        self.assertEqual((counters['review_count'], counters['review_sum'], counters['stars_5']), (3, 13, 2))
+
+        reviews[0].rating = 1
+        reviews[0].save()
+        counters = self.assert_matches_rebuild()
+        self.assertEqual((counters['stars_1'], counters['stars_5'], counters['review_sum']), (1, 1, 9))
+
+        reviews[1].delete()
+        counters = self.assert_matches_rebuild()
+        self.assertEqual((counters['review_count'], counters['review_average']), (2, 3.0))
+        self.game.refresh_from_db()
+        self.assertEqual([row[1] for row in self.game.review_histogram], [1, 0, 0, 0, 1])
+
+
+class TournamentCapacityTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_join_at_capacity_is_refused(self):
+        game = Game.objects.create(name='Arena', description='-', genre='RPG', release_date=date(2020, 1, 1))
+        tournament = Tournament.objects.create(
+            name='Small', description='-', game=game, max_participants=2,
+            start_date=timezone.now(), end_date=timezone.now(),
+        )
+        players = [User.objects.create(username=f'entrant{i}').player for i in range(3)]
+
+        def counter():
+            tournament.refresh_from_db()
+            self.assertEqual(tournament.participants_count, tournament.participants.count())
+            return tournament.participants_count
+
+        self.assertEqual([participation.join_tournament(p, tournament) for p in players], [True, True, False])
+        self.assertFalse(participation.join_tournament(players[0], tournament))
+        self.assertEqual(counter(), 2)
+        self.assertTrue(tournament.is_full)
+
+        self.assertTrue(participation.leave_tournament(players[0], tournament))
+        self.assertFalse(participation.leave_tournament(players[0], tournament))
+        self.assertTrue(participation.join_tournament(players[2], tournament))
+        self.assertEqual(counter(), 2)
+
+        tournament.participants.remove(players[1])
+        self.assertEqual(counter(), 1)
+
+
+class QuestRolloverTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.player = User.objects.create(username='quester').player
+        game = Game.objects.create(name='Quests', description='-', genre='RPG', release_date=date(2020, 1, 1))
+        self.quests = [DailyQuest.objects.create(title=f'Q{i}', description='-', game=game) for i in range(3)]
+        quests.progress_for(self.player, self.quests)
+
+    def test_rerun_keeps_progress_made_since(self):
+        day = date(2026, 1, 1)
+        rewards.complete_quest(self.player, self.quests[0])
+        PlayerQuestProgress.objects.filter(quest=self.quests[1]).update(progress=40)
+        version = model_versions(QUEST_PROGRESS)
+
+        self.assertEqual(quests.archive_progress(day, batch_size=1), 2)
+        self.assertNotEqual(model_versions(QUEST_PROGRESS), version)
+        self.assertEqual(
+            set(PlayerQuestArchive.objects.values_list('quest_id', 'completed', 'progress')),
+            {(self.quests[0].pk, True, 100), (self.quests[1].pk, False, 40)},
+        )
+        self.assertFalse(PlayerQuestProgress.objects.filter(Q(completed=True) | Q(progress__gt=0)).exists())
+
+        rewards.complete_quest(self.player, self.quests[0])
+        self.assertEqual(quests.archive_progress(day), 0)
+        self.assertEqual(PlayerQuestArchive.objects.count(), 2)
+        self.assertTrue(PlayerQuestProgress.objects.get(quest=self.quests[0]).completed)
+
+    def test_command_archives_yesterday_and_seeds_active_players(self):
+        rewards.complete_quest(self.player, self.quests[2])
+        active = User.objects.create(username='active', last_login=timezone.now()).player
+        User.objects.create(username='idle', last_login=timezone.now() - timedelta(days=90))
+
+        call_command('rollover_quests', stdout=io.StringIO())
+        archived = PlayerQuestArchive.objects.get()
+        yesterday = timezone.localdate() - timedelta(days=1)
+        self.assertEqual((archived.quest_id, archived.day), (self.quests[2].pk, yesterday))
+        self.assertEqual(
+            set(PlayerQuestProgress.objects.values_list('player_id', flat=True)), {self.player.pk, active.pk},
+        )
+        self.assertEqual(PlayerQuestProgress.objects.filter(player=active).count(), len(self.quests))
+
+
+class PlayerSearchTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='searcher')
+
+    def test_prefix_autocomplete_follows_renames(self):
+        self.assertTrue(search.fts_enabled())
+        User.objects.create(username='dragonslayer', first_name='Алия', last_name='Ким')
+        renamed = User.objects.create(username='wizard', first_name='Иван')
+
+        def names(text):
+            return [row['username'] for row in search.autocomplete(text)]
+
+
+        self.assertEqual(names('drag'), ['dragonslayer'])
+        self.assertEqual(names('Ал Ки'), ['dragonslayer'])
+        self.assertEqual(names('Ал Петр'), [])
+
+        renamed.username = 'dragonrider'
+        renamed.save(update_fields=['username'])
+        self.assertEqual(sorted(names('dragon')), ['dragonrider', 'dragonslayer'])
+        self.assertEqual(names('wiz'), [])
+
+        renamed.delete()
+        self.assertEqual(names('dragon'), ['dragonslayer'])
+        players, has_next = search.search_players('drag')
+        self.assertEqual(([p.user.username for p in players], has_next), (['dragonslayer'], False))
+
+    def test_huge_page_is_clamped(self):
+        self.client.force_login(self.user)
+        for page in (str(10 ** 20), '-5', 'x'):
+            with self.subTest(page=page):
+                response = self.client.get(reverse('search_players'), {'search': 'sea', 'page': page})
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(response.context['page'], search.MAX_PAGE)
+
+
+class CatalogSearchTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        for i in range(12):
+            Game.objects.create(
+                name=f'{"Space" if i % 3 == 0 else "Farm"} {i}', description='-', genre=('RPG', 'Puzzle')[i % 2],
+                release_date=date(2010 + i, 1, 1), rating=i % 10,
+            )
+
+    def search(self, page=1, **params):
+        form = CatalogSearchForm(params)
+        self.assertTrue(form.is_valid(), form.errors)
+        return search_catalog(form.cleaned_data, page, per_page=4)
+
+    def test_facets_ignore_only_the_genre_filter(self):
+        params = {'q': 'space', 'year_from': 2012, 'rating_min': 1}
+        expected = Game.objects.filter(name__startswith='Space', release_date__year__gte=2012, rating__gte=1)
+
+        result = self.search(**params)
+        self.assertEqual(
+            {facet['genre']: facet['count'] for facet in result['facets']},
+            {genre: expected.filter(genre=genre).count() for genre in ('RPG', 'Puzzle')},
+        )
+        self.assertEqual(result['total'], expected.count())
+
+        result = self.search(genre='RPG', **params)
+        rpg = expected.filter(genre='RPG')
+        self.assertEqual({game.pk for game in result['games']}, set(rpg.values_list('pk', flat=True)))
+        self.assertEqual(result['total'], rpg.count())
+        self.assertEqual(len(result['facets']), 2)
+
+    def test_pages_and_sorting(self):
+        result = self.search(genre='Puzzle', year_to=2020, sort='release', page=2)
+        expected = list(
+            Game.objects.filter(genre='Puzzle', release_date__year__lte=2020).order_by('-release_date', '-id')
+        )
+        self.assertEqual((result['total'], result['pages'], result['page']), (len(expected), 2, 2))
+        self.assertEqual(list(result['games']), expected[4:8])
+        self.assertEqual(self.search(page=99, genre='Puzzle', year_to=2020, sort='release')['page'], 2)
+        self.assertEqual(self.search(rating_min=9)['total'], 1)
+        self.assertEqual(self.search(rating_min=5, rating_max=4)['total'], 0)
+
+
+class VersionedCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_writes_refresh_home_and_game_cards(self):
+        game = Game.objects.create(name='Old Title', description='-', genre='RPG', release_date=date(2020, 1, 1))
+        for url in (reverse('home'), reverse('games_list')):
+            self.assertContains(self.client.get(url), 'Old Title')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('home'))
+        self.assertEqual(len(queries), 0)
+
+        game.name = 'New Title'
+        game.save()
+        for url in (reverse('home'), reverse('games_list')):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'New Title')
+                self.assertNotContains(response, 'Old Title')
+
+        User.objects.create(username='newcomer')
+        self.assertContains(self.client.get(reverse('home')), 'newcomer')
+
+    def test_local_cache_caps_timeouts(self):
+        with override_settings(CACHE_SHARED=False):
+            self.assertEqual(cache_timeout(FRIENDS_TIMEOUT), LOCAL_TIMEOUT)
+            self.assertEqual(self.client.get(reverse('games_list')).context['card_timeout'], LOCAL_TIMEOUT)
+        with override_settings(CACHE_SHARED=True):
+            self.assertEqual(cache_timeout(FRIENDS_TIMEOUT), FRIENDS_TIMEOUT)
+
+    def test_bump_repeats_after_commit(self):
+        before, = model_versions('games.Game')
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_version('games.Game')
+            during, = model_versions('games.Game')
+        after, = model_versions('games.Game')
+        self.assertNotEqual(before, during)
+        self.assertNotEqual(during, after)
+
+
+class GenerateDataTests(TestCase):
+
+    def test_tiny_run_keeps_derived_data_consistent(self):
+        cache.clear()
+        options = dict(
+            users=12, games=4, games_per_player=2, achievements_per_game=2, unlocks_per_player=2,
+            reviews=20, tournaments=2, participants=5, quests=2, batch_size=5, stdout=io.StringIO(),
+        )
+        call_command('generate_data', **options)
+        call_command('generate_data', **options)
+        self.assertEqual(User.objects.filter(username__startswith='bench_user').count(), 12)
+
+        for game in Game.objects.all():
+            reviews = GameReview.objects.filter(game=game)
+            self.assertEqual(game.review_count, reviews.count())
+            self.assertEqual(game.review_sum, sum(reviews.values_list('rating', flat=True)))
+            self.assertEqual(
+                [game.stars_1, game.stars_2, game.stars_3, game.stars_4, game.stars_5],
+                [reviews.filter(rating=stars).count() for stars in range(1, 6)],
+            )
+        for tournament in Tournament.objects.all():
+            self.assertEqual(tournament.participants_count, tournament.participants.count())
+
+        fields = ['player_id', 'games_started', 'achievements_unlocked', 'hours_played', 'reviews_written',
+                  'tournaments_entered', 'best_finish']
+        generated = list(PlayerStats.objects.order_by('player_id').values(*fields))
+        self.assertEqual(len(generated), Player.objects.count())
+        PlayerStats.objects.all().delete()
+        stats.recount()
+        self.assertEqual(list(PlayerStats.objects.order_by('player_id').values(*fields)), generated)
+
+        self.assertEqual(len(search.autocomplete('bench_user1')), 3)
+
+
+class GameLeaderboardTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.game = Game.objects.create(name='Main', description='-', genre='RPG', release_date=date(2020, 1, 1))
+        self.players = [User.objects.create(username=f'p{i}').player for i in range(7)]
+        for i, player in enumerate(self.players):
+            PlayerGame.objects.create(player=player, game=self.game, game_points=(i // 2) * 10)
+
+    def test_pages_follow_points_with_ties_by_id(self):
+        ranked = []
+        cursor = None
+        while True:
+            entries, cursor = leaderboard.game_leaderboard_page(self.game, cursor, size=3)
+            ranked.extend((entry.rank, entry.player_id) for entry in entries)
+            if cursor is None:
+                break
+        expected = sorted(PlayerGame.objects.filter(game=self.game), key=lambda e: (-e.game_points, e.pk))
+        self.assertEqual(ranked, [(rank, entry.player_id) for rank, entry in enumerate(expected, 1)])
+
+        entry = expected[4]
+        window = leaderboard.game_entries_around(entry, radius=1)
+        self.assertEqual([(e.rank, e.pk) for e in window], [(4, expected[3].pk), (5, entry.pk), (6, expected[5].pk)])
+
+    def test_friends_only(self):
+        me = self.players[0]
+        FriendRequest.objects.create(from_player=me, to_player=self.players[5]).accept()
+        entries = leaderboard.friends_leaderboard(me, self.game)
+        self.assertEqual([(e.rank, e.player_id) for e in entries], [(1, self.players[5].pk), (2, me.pk)])
+
+
+class ActivityFeedTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.players = [User.objects.create(username=f'p{i}').player for i in range(4)]
+        self.game = Game.objects.create(name='Main', description='-', genre='RPG', release_date=date(2020, 1, 1))
+        stats.recount([player.pk for player in self.players])
+        for other in self.players[1:]:
+            FriendRequest.objects.create(from_player=self.players[0], to_player=other).accept()
+
+    def feed_ids(self, player, size):
+        ids, cursor = [], None
+        while True:
+            events, cursor = activity.timeline(player, cursor, size=size)
+            ids.extend(event.pk for event in events)
+            if cursor is None:
+                return ids
+
+    def test_actions_reach_friends_timelines(self):
+        achievement = Achievement.objects.create(name='First', description='-', game=self.game)
+        rewards.unlock_achievement(self.players[0], achievement)
+        rewards.unlock_achievement(self.players[0], achievement)
+
+        for player in self.players:
+            events, cursor = activity.timeline(player)
+            self.assertEqual([(e.verb, e.subject) for e in events], [('achievement', 'First')])
+            self.assertIsNone(cursor)
+
+    def test_popular_players_are_pulled_and_merged(self):
+        quests = [DailyQuest.objects.create(title=f'Quest {i}', description='-', game=self.game) for i in range(5)]
+        with mock.patch.object(activity, 'FANOUT_LIMIT', 2):
+            for i, quest in enumerate(quests):
+                activity.record(self.players[i % 2], 'quest', game_id=self.game.pk, subject=quest.title)
+            # У p0 три друга, его события не раскладываются по чужим лентам
+            self.assertFalse(TimelineEntry.objects.filter(owner=self.players[1], event__actor=self.players[0]).exists())
+            expected = list(ActivityEvent.objects.order_by('-id').values_list('id', flat=True))
+            with self.assertNumQueries(4):
+                self.assertEqual(self.feed_ids(self.players[1], size=5), expected)
+            self.assertEqual(self.feed_ids(self.players[1], size=2), expected)
+
+    def test_friend_count_follows_links(self):
+        me = self.players[0]
+        self.assertEqual(PlayerStats.objects.get(player=me).friend_count, 3)
+        FriendRequest.objects.filter(to_player=self.players[1]).delete()
+        self.assertEqual(PlayerStats.objects.get(player=me).friend_count, 2)
+        self.assertEqual(PlayerStats.objects.get(player=self.players[1]).friend_count, 0)
+
+
+class StandingsTests(TestCase):
+
+    def test_ties_share_position_and_pooled_prize(self):
+        rows = standings.compute_standings([(1, 90), (2, 70), (3, 90), (4, 50)], 1000, payouts=(50, 30, 20))
+        self.assertEqual(
+            [(row.player_id, row.position, row.prize) for row in rows],
+            [(1, 1, 400), (3, 1, 400), (2, 3, 200), (4, 4, 0)],
+        )
+
+    @override_settings(TOURNAMENT_PAYOUTS=(60, 40))
+    def test_finalize_credits_once_and_recredits_difference(self):
+        game = Game.objects.create(name='Cup Game', description='-', genre='RPG', release_date=date(2020, 1, 1))
+        tournament = Tournament.objects.create(
+            name='Cup', description='-', game=game, prize_pool=1000,
+            start_date=timezone.now(), end_date=timezone.now() + timedelta(days=1),
+        )
+        players = [User.objects.create(username=f'c{i}').player for i in range(3)]
+        for player in players:
+            participation.join_tournament(player, tournament)
+        outsider = User.objects.create(username='outsider').player
+
+        ingested = standings.ingest_scores(
+            tournament, [(players[0].pk, 10), (players[1].pk, 30), (players[2].pk, 20), (outsider.pk, 99)],
+        )
+        self.assertEqual(ingested, 3)
+        standings.finalize_tournament(tournament)
+        standings.finalize_tournament(tournament)
+
+        points = dict(Player.objects.values_list('pk', 'total_points'))
+        self.assertEqual([points[player.pk] for player in players], [0, 600, 400])
+        self.assertEqual(Tournament.objects.get(pk=tournament.pk).status, 'finished')
+
+        standings.ingest_scores(tournament, [(players[0].pk, 50)])
+        standings.finalize_tournament(tournament)
+        points = dict(Player.objects.values_list('pk', 'total_points'))
+        self.assertEqual([points[player.pk] for player in players], [600, 400, 0])
+        self.assertEqual(
+            list(TournamentResult.objects.filter(tournament=tournament).values_list('position', flat=True)),
+            [1, 2, 3],
+        )
+
+
+class PlayerStatsTests(TestCase):
+
+    def test_incremental_updates_match_rebuild(self):
+        player = User.objects.create(username='counted').player
+        game = Game.objects.create(name='Counted', description='-', genre='RPG', release_date=date(2020, 1, 1))
+        self.assertEqual(stats.stats_for(player).games_started, 0)
+
+        progress = PlayerGame.objects.create(player=player, game=game, hours_played=Decimal('2.5'))
+        rewards.unlock_achievement(player, Achievement.objects.create(name='A', description='-', game=game))
+        GameReview.objects.create(game=game, player=player, rating=4, title='-', text='-')
+        tournament = Tournament.objects.create(
+            name='T', description='-', game=game, start_date=timezone.now(), end_date=timezone.now(),
+        )
+        participation.join_tournament(player, tournament)
+        standings.ingest_scores(tournament, [(player.pk, 1)])
+        standings.finalize_tournament(tournament)
+        progress.hours_played = Decimal('4.0')
+        progress.save()
+
+        fields = ['games_started', 'achievements_unlocked', 'hours_played', 'reviews_written',
+                  'tournaments_entered', 'best_finish']
+        incremental = PlayerStats.objects.filter(player=player).values(*fields).get()
+        self.assertEqual(incremental, {
+            'games_started': 1, 'achievements_unlocked': 1, 'hours_played': Decimal('4.0'),
+            'reviews_written': 1, 'tournaments_entered': 1, 'best_finish': 1,
+        })
+        PlayerStats.objects.all().delete()
+        stats.recount()
+        self.assertEqual(PlayerStats.objects.filter(player=player).values(*fields).get(), incremental)
+
+        player.achievements.clear()
+        self.assertEqual(stats.stats_for(player).achievements_unlocked, 0)
+
+    def test_cascade_deletes_are_recounted(self):
+        player = User.objects.create(username='cascade').player
+        game = Game.objects.create(name='Doomed', description='-', genre='RPG', release_date=date(2020, 1, 1))
+        stats.stats_for(player)
+        rewards.unlock_achievement(player, Achievement.objects.create(name='A', description='-', game=game))
+        tournament = Tournament.objects.create(
+            name='T', description='-', game=game, start_date=timezone.now(), end_date=timezone.now(),
+        )
+        participation.join_tournament(player, tournament)
+        standings.ingest_scores(tournament, [(player.pk, 1)])
+        standings.finalize_tournament(tournament)
+        self.assertEqual(stats.stats_for(player).best_finish, 1)
+
+        game.delete()
+        row = stats.stats_for(player)
+        self.assertEqual((row.achievements_unlocked, row.tournaments_entered, row.best_finish), (0, 0, None))
+
+
+class SchedulerTests(TestCase):
+
+    def test_run_due_moves_tournaments_and_quests(self):
+        now = timezone.now()
+        hour = timedelta(hours=1)
+        game = Game.objects.create(name='Timed', description='-', genre='RPG', release_date=date(2020, 1, 1))
+        tournaments = [
+            Tournament.objects.create(
+                name=name, description='-', game=game, prize_pool=100, start_date=start, end_date=end,
+            )
+            for name, start, end in [
+                ('future', now + hour, now + 2 * hour),
+                ('running', now - hour, now + hour),
+                ('over', now - 2 * hour, now - hour),
+            ]
+        ]
+        player = User.objects.create(username='winner').player
+        participation.join_tournament(player, tournaments[2])
+        standings.ingest_scores(tournaments[2], [(player.pk, 5)])
+        for title, active, start, end in [
+            ('manual', False, None, None),
+            ('opening', False, now - hour, now + hour),
+            ('closing', True, now - 2 * hour, now - hour),
+        ]:
+            DailyQuest.objects.create(
+                title=title, description='-', game=game, is_active=active, starts_at=start, ends_at=end,
+            )
+
+        counts = scheduler.run_due(now, batch_size=1)
+
+        self.assertEqual(counts, {
+            'started': 2, 'finished': 1, 'quests_activated': 1, 'quests_deactivated': 1, 'ranks_changed': 1,
+        })
+        statuses = dict(Tournament.objects.values_list('name', 'status'))
+        self.assertEqual(statuses, {'future': 'upcoming', 'running': 'active', 'over': 'finished'})
+        self.assertEqual(
+            [quest.is_active for quest in DailyQuest.objects.order_by('pk')], [False, True, False],
+        )
+        self.assertEqual(TournamentResult.objects.get(player=player).prize, 50)
+        self.assertEqual(scheduler.next_due(now), now + hour)
+        self.assertEqual(scheduler.run_due(now)['finished'], 0)
+        self.assertEqual(scheduler.run_due(now)['ranks_changed'], 0)
+
+
+class ImportGamesTests(TestCase):
+
+    def test_upsert_by_name_and_rejects(self):
+        Game.objects.create(name='Old', description='-', genre='RPG', release_date=date(2010, 1, 1), rating=5)
+        feed = io.StringIO(
+            'name,description,genre,release_date,rating\n'
+            'Old,Новое описание,RPG,2010-01-01,7.5\n'
+            'New,-,MOBA,2021-03-04,\n'
+            'New,Повтор,MOBA,2021-03-04,8\n'
+            ',-,MOBA,2021-03-04,1\n'
+            'Broken,-,MOBA,вчера,1\n'
+        )
+        result = import_games(read_rows(feed, 'csv'), chunk_size=2)
+
+        self.assertEqual(result.processed, 5)
+        self.assertEqual((result.inserted, result.updated, result.rejected), (1, 2, 2))
+        self.assertEqual([line for line, _ in result.first_rejects], [5, 6])
+        self.assertEqual(Game.objects.count(), 2)
+        old = Game.objects.get(name='Old')
+        self.assertEqual((old.description, old.rating), ('Новое описание', 7.5))
+        self.assertEqual(Game.objects.get(name='New').description, 'Повтор')
+
+    def test_ndjson_without_update(self):
+        Game.objects.create(name='Old', description='-', genre='RPG', release_date=date(2010, 1, 1))
+        feed = io.StringIO(
+            '{"name": "Old", "description": "x", "genre": "RPG", "release_date": "2011-01-01"}\n'
+            '\n'
+            '[1, 2]\n'
+            '{"name": "New", "genre": "RPG", "release_date": "2011-01-01", "rating": 9}\n'
+        )
+        result = import_games(read_rows(feed, 'ndjson'), update_existing=False)
+
+        self.assertEqual(result.first_rejects, [(3, 'ожидается JSON-объект')])
+        self.assertEqual((result.inserted, result.updated, result.skipped), (1, 0, 1))
+        self.assertEqual(Game.objects.get(name='Old').description, '-')
+        self.assertEqual(Game.objects.get(name='New').rating, 9)
+
+    def test_command_streams_rejects(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        feed = os.path.join(folder.name, 'games.ndjson')
+        rejects = os.path.join(folder.name, 'rejects.ndjson')
+        with open(feed, 'w', encoding='utf-8') as output:
+            output.write('{"name": "New", "genre": "RPG", "release_date": "2011-01-01"}\n')
+            output.write('{"name": ""}\n' * 5)
+
+        with self.assertRaises(CommandError):
+            call_command('import_games', feed, chunk_size=0, stdout=io.StringIO())
+        with mock.patch('games.importer.SHOWN_REJECTS', 2):
+            call_command('import_games', feed, rejects=rejects, stdout=io.StringIO())
+
+        with open(rejects, encoding='utf-8') as written:
+            self.assertEqual([json.loads(line)['line'] for line in written], [2, 3, 4, 5, 6])
+        self.assertTrue(Game.objects.filter(name='New').exists())
+
+
+class ImageDerivativeTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        cache.clear()
+
+    def _upload(self, name, color):
+        output = io.BytesIO()
+        Image.new('RGB', (1000, 700), color).save(output, 'JPEG')
+        game = Game(name=name, description='-', genre='RPG', release_date=date(2020, 1, 1))
+        game.image.save(f'{name}.jpg', ContentFile(output.getvalue()))
+        return game
+
+    def test_derivatives_on_upload(self):
+        game = self._upload('Cover', 'red')
+        names = images.build_derivatives(game.image, ['card'])
+
+        self.assertEqual(len(names), 4)
+        name = names['card', 2, 'webp']
+        self.assertRegex(name, r'^derived/card/[0-9a-f]{16}-800x500\.webp$')
+        with game.image.storage.open(name) as derived, Image.open(derived) as image:
+            self.assertEqual((image.format, image.size), ('WEBP', (800, 500)))
+        self.assertNotEqual(images.derivative_name(self._upload('Other', 'blue').image, 'card', 2, 'webp'), name)
+
+    def render(self, game, preset):
+        return Template("{% load image_tags %}{% picture game.image preset alt=game.name %}").render(
+            Context({'game': game, 'preset': preset}),
+        )
+
+    def test_picture_tag(self):
+        game = self._upload('Cover', 'red')
+        html = self.render(game, 'card')
+        self.assertIn('type="image/webp"', html)
+        self.assertIn('-800x500.jpeg 2x', html)
+        self.assertIn('alt="Cover"', html)
+
+    def test_render_does_not_build(self):
+        game = self._upload('Cover', 'red')
+        storage = game.image.storage
+        name = images.derivative_name(game.image, 'card', 1, 'webp')
+        storage.delete(name)
+        cache.clear()
+
+        with mock.patch.object(images, '_open') as opened:
+            html = self.render(game, 'card')
+        opened.assert_not_called()
+        self.assertNotIn('<picture>', html)
+        self.assertFalse(storage.exists(name))
+
+        call_command('build_image_derivatives', preset=['card'], stdout=io.StringIO())
+        self.assertTrue(storage.exists(name))
+        with mock.patch.object(storage, 'exists') as exists:
+            html = self.render(game, 'card')
+        exists.assert_not_called()
+        self.assertIn('-800x500.jpeg 2x', html)
+
+    def test_decompression_bomb(self):
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000), self.assertLogs('games.images', 'WARNING'):
+            game = self._upload('Bomb', 'red')
+        self.assertNotIn('<picture>', self.render(game, 'card'))
+
+
+class StaticAssetTests(SimpleTestCase):
+
+    def test_minify_css_keeps_strings(self):
+        css = '/* тема */\n.card > a:hover ,p {\n  content: "a ;  b";\n  margin: 0 auto;\n}\n'
+        self.assertEqual(minify_css(css), '.card>a:hover,p{content:"a ;  b";margin:0 auto}')
+
+    def test_precompressed_variant(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        os.makedirs(os.path.join(root.name, 'css'))
+        with open(os.path.join(root.name, 'css', 'site.css'), 'wb') as plain:
+            plain.write(b'body{}' * 100)
+        with open(os.path.join(root.name, 'css', 'site.css.gz'), 'wb') as packed:
+            packed.write(gzip.compress(b'body{}' * 100))
+
+        middleware = PrecompressedStaticMiddleware(lambda request: HttpResponse(status=404))
+        factory = RequestFactory()
+        with override_settings(STATIC_ROOT=root.name):
+            packed = middleware(factory.get('/static/css/site.css', HTTP_ACCEPT_ENCODING='br, gzip'))
+            plain = middleware(factory.get('/static/css/site.css', HTTP_ACCEPT_ENCODING='gzip;q=0'))
+            missing = middleware(factory.get('/static/css/none.css'))
+
+        self.assertEqual(packed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(packed.streaming_content)), b'body{}' * 100)
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(plain['Vary'], 'Accept-Encoding')
+        self.assertEqual(missing.status_code, 404)
+        packed.close()
+        plain.close()
+
+
+@override_settings(REPLICA_DATABASE_ALIAS='replica')
+class ReplicaRoutingTests(SimpleTestCase):
+
+    def route(self, url, method='get', cookies=None, write=False):
+        """Куда пошли бы чтения представления до и после записи"""
+        router = ReplicaRouter()
+        seen = {}
+
+        def view(request):
+            seen['before'] = router.db_for_read(Game)
+            if write:
+                router.db_for_write(Game)
+            seen['after'] = router.db_for_read(Game)
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)(url)
+        request.COOKIES.update(cookies or {})
+        response = ReplicaMiddleware(view)(request)
+        return seen, response
+
+    def test_read_only_view_reads_replica(self):
+        seen, response = self.route(reverse('games_list'))
+        self.assertEqual(seen, {'before': 'replica', 'after': 'replica'})
+        self.assertNotIn(ReplicaMiddleware.cookie_name, response.cookies)
+
+    def test_write_pins_request_and_browser_to_primary(self):
+        seen, response = self.route(reverse('games_list'), write=True)
+        self.assertEqual(seen, {'before': 'replica', 'after': None})
+
+        cookie = response.cookies[ReplicaMiddleware.cookie_name]
+        seen, _ = self.route(reverse('games_list'), cookies={cookie.key: cookie.value})
+        self.assertEqual(seen['before'], None)
+
+    @override_settings(REPLICA_DATABASE_ALIAS=None)
+    def test_no_cookie_without_replica(self):
+        seen, response = self.route(reverse('games_list'), method='post', write=True)
+        self.assertEqual(seen, {'before': None, 'after': None})
+        self.assertNotIn(ReplicaMiddleware.cookie_name, response.cookies)
+
+    def test_other_views_and_methods_stay_on_primary(self):
+        self.assertIsNone(self.route(reverse('daily_quests'))[0]['before'])
+        self.assertIsNone(self.route(reverse('games_list'), method='post')[0]['before'])
+        self.assertIsNone(ReplicaRouter().db_for_read(Game))
+        with routing(use_replica=True):
+            self.assertIsNone(ReplicaRouter().db_for_read(Session))
+
+
+@override_settings(ROOT_URLCONF='games.async_urls', DEBUG=True)
+class AsyncViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='me')
+        self.game = Game.objects.create(name='Async Game', description='-', genre='RPG', release_date=date(2020, 1, 1))
+        Achievement.objects.create(name='Async Achievement', description='-', game=self.game)
+        GameReview.objects.create(game=self.game, player=self.user.player, rating=5, title='Async Review', text='-')
+        Tournament.objects.create(
+            name='Async Tournament', description='-', game=self.game,
+            start_date=timezone.now(), end_date=timezone.now() + timedelta(days=1),
+        )
+
+    async def test_read_views_render(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+        pages = {
+            reverse('home'): 'Async Game',
+            reverse('games_list') + '?q=Async': 'Async Game',
+            reverse('game_detail', args=[self.game.pk]): 'Async Review',
+            reverse('leaderboard'): '@me',
+            reverse('tournaments'): 'Async Tournament',
+            reverse('search_players') + '?search=me': '@me',
+        }
+        for url, marker in pages.items():
+            with self.subTest(url=url):
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, marker)
+
+    async def test_login_required(self):
+        response = await self.async_client.get(reverse('leaderboard'))
+        self.assertEqual(response.status_code, 302)
+        response = await self.async_client.get(reverse('game_detail', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ApiTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='mobile')
+        self.games = [
+            Game.objects.create(name=f'Api {n}', description='-', genre='RPG', release_date=date(2020, 1, n))
+            for n in range(1, 6)
+        ]
+
+    def test_fields_and_cursor(self):
+        url = reverse('api:games')
+        first = self.client.get(url, {'fields': 'id,name', 'limit': 3}).json()
+        self.assertEqual(first['results'][0], {'id': self.games[-1].pk, 'name': 'Api 5'})
+        second = self.client.get(url, {'fields': 'id,name', 'limit': 3, 'after': first['next']}).json()
+        self.assertEqual([row['name'] for row in second['results']], ['Api 2', 'Api 1'])
+        self.assertIsNone(second['next'])
+
+        self.assertEqual(self.client.get(url, {'fields': 'id,secret'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'after': 'garbage'}).status_code, 400)
+        for name, values in (('api:games', [1, 'x']), ('api:tournaments', [1, 'x']),
+                             ('api:leaderboard', [[1], 1, [1], 1])):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name), {'after': encode_cursor(values)})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_not_modified_without_queries(self):
+        url = reverse('api:game_detail', args=[self.games[0].pk])
+        response = self.client.get(url)
+        self.assertEqual(response.json()['name'], 'Api 1')
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(len(queries), 0)
+
+        self.games[0].rating = 9
+        self.games[0].save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_writes_require_login(self):
+        url = reverse('api:review_game', args=[self.games[0].pk])
+        review = {'rating': 4, 'title': 'Неплохо', 'text': '-'}
+        response = self.client.post(url, json.dumps(review), content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+        self.client.force_login(self.user)
+        response = self.client.post(url, json.dumps(review), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post(url, json.dumps({**review, 'rating': 9}), content_type='application/json')
+        self.assertIn('rating', response.json()['errors'])
+        self.assertEqual(GameReview.objects.get(player=self.user.player).rating, 4)
+
+    def test_rename_changes_leaderboard_etag(self):
+        PlayerGame.objects.create(player=self.user.player, game=self.games[0], game_points=5)
+        url = reverse('api:game_leaderboard', args=[self.games[0].pk])
+        response = self.client.get(url)
+        self.assertEqual(response.json()['results'][0]['username'], 'mobile')
+        self.user.username = 'renamed'
+        self.user.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.json()['results'][0]['username'], 'renamed')
+
+    def test_zero_reward_unlock_changes_etag(self):
+        achievement = Achievement.objects.create(
+            name='Free', description='-', game=self.games[0], points=0, experience_reward=0,
+        )
+        self.client.force_login(self.user)
+        url = reverse('api:game_achievements', args=[self.games[0].pk])
+        response = self.client.get(url)
+        self.assertFalse(response.json()['results'][0]['unlocked'])
+
+        self.assertTrue(rewards.unlock_achievement(self.user.player, achievement))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertTrue(response.json()['results'][0]['unlocked'])
+
+    def test_csrf_token_flow(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        url = reverse('api:start_game', args=[self.games[0].pk])
+        response = client.post(url)
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('error', response.json())
+
+        token = client.get(reverse('api:csrf')).json()['csrf_token']
+        self.assertEqual(client.post(url, HTTP_X_CSRFTOKEN=token).status_code, 201)
+        self.assertEqual(client.put(url, HTTP_X_CSRFTOKEN=token).status_code, 405)
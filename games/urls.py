@@ -9,14 +9,19 @@ urlpatterns = [
     path('player/<str:username>/', views.player_profile, name='player_profile'),
     path('dashboard/', views.player_dashboard, name='dashboard'),
     path('leaderboard/', views.leaderboard, name='leaderboard'),
+    path('leaderboard/friends/', views.friends_leaderboard, name='friends_leaderboard'),
+    path('game/<int:pk>/leaderboard/', views.game_leaderboard, name='game_leaderboard'),
     path('game/<int:game_id>/start/', views.start_game, name='start_game'),
     path('achievement/<int:achievement_id>/add/', views.add_achievement, name='add_achievement'),
     path('register/', views.register, name='register'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('players/search/', views.search_players, name='search_players'),
+    path('players/autocomplete/', views.autocomplete_players, name='autocomplete_players'),
     path('player/<int:player_id>/friend-request/', views.send_friend_request, name='send_friend_request'),
     path('friend-requests/', views.friend_requests, name='friend_requests'),
+    path('friends/', views.friends, name='friends'),
+    path('feed/', views.feed, name='feed'),
     path('tournaments/', views.tournaments, name='tournaments'),
     path('tournament/<int:pk>/', views.tournament_detail, name='tournament_detail'),
     path('quests/', views.daily_quests, name='daily_quests'),
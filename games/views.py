@@ -1,56 +1,81 @@
+from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
+from django.db import transaction
 from django.views.decorators.http import require_http_methods
-from django.db.models import Q
-from .forms import GameReviewForm, PlayerSearchForm
+from . import activity, cache, friends as friend_graph, participation, quests as quests_service, rewards, search
+from .catalog import search_catalog
+from .forms import CatalogSearchForm, GameReviewForm, PlayerSearchForm
+from .leaderboard import (
+    friends_leaderboard as ranked_friends, game_entries_around, game_leaderboard_page, leaderboard_page,
+    players_around,
+)
+from .pagination import InvalidCursor
 from .models import Game, Player, Achievement, PlayerGame, GameReview, FriendRequest, Tournament, DailyQuest, PlayerQuestProgress, TournamentResult
+from .stats import stats_for
+
+def _home_context():
+    """Данные главной страницы, готовые к кэшированию"""
+    return {
+        'popular_games': list(Game.objects.all()[:8]),
+        'top_players': list(Player.objects.select_related('user')[:5]),
+        'total_games': Game.objects.count(),
+        'total_players': Player.objects.count(),
+        'total_tournaments': Tournament.objects.count(),
+        'total_achievements': Achievement.objects.count(),
+    }
 
 def home(request):
     """Главная страница"""
-    games = Game.objects.all()[:8]
-    top_players = Player.objects.all()[:5]
-    total_games = Game.objects.count()
-    total_players = Player.objects.count()
-    
-    context = {
-        'games': games,
-        'top_players': top_players,
-        'total_games': total_games,
-        'total_players': total_players,
-    }
+    context = cache.cached('home', cache.VERSIONED_MODELS, _home_context)
+    context['game_version'] = cache.model_versions('games.Game')[0]
+    context['card_timeout'] = cache.cache_timeout(cache.CARD_TIMEOUT)
     return render(request, 'home.html', context)
 
 def games_list(request):
     """Список всех игр"""
-    games = Game.objects.all()
-    genre = request.GET.get('genre')
-    if genre:
-        games = games.filter(genre=genre)
+    form = CatalogSearchForm(request.GET)
+    params = form.cleaned_data if form.is_valid() else {}
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 1
+    catalog = search_catalog(params, page)
     
-    genres = Game.objects.values_list('genre', flat=True).distinct()
+    query = request.GET.copy()
+    query.pop('page', None)
+    facet_query = query.copy()
+    facet_query.pop('genre', None)
     
     context = {
-        'games': games,
-        'genres': genres,
-        'selected_genre': genre,
+        'form': form,
+        'games': catalog['games'],
+        'genres': catalog['facets'],
+        'total': catalog['total'],
+        'page': catalog['page'],
+        'pages': catalog['pages'],
+        'selected_genre': params.get('genre'),
+        'query_string': query.urlencode(),
+        'facet_query_string': facet_query.urlencode(),
+        'game_version': cache.model_versions('games.Game')[0],
+        'card_timeout': cache.cache_timeout(cache.CARD_TIMEOUT),
     }
     return render(request, 'games_list.html', context)
 
 def game_detail(request, pk):
     """Детали игры"""
     game = get_object_or_404(Game, pk=pk)
-    achievements = game.achievements.all()
     players_count = game.players.count()
-    reviews = game.reviews.all()
+    reviews = game.reviews.select_related('player__user')
     
+    player = None
     player_game = None
     if request.user.is_authenticated:
-        try:
-            player_game = PlayerGame.objects.get(player__user=request.user, game=game)
-        except PlayerGame.DoesNotExist:
-            pass
+        player = request.user.player
+        player_game = PlayerGame.objects.filter(player=player, game=game).first()
+    achievements = game.achievements.with_unlocked_for(player)
     
     context = {
         'game': game,
@@ -64,28 +89,36 @@ def game_detail(request, pk):
 @login_required
 def player_profile(request, username):
     """Профиль игрока"""
-    user = get_object_or_404(User, username=username)
+    user = get_object_or_404(User.objects.select_related('player'), username=username)
     player = user.player
-    games = player.games.all()
-    achievements = player.achievements.all()
+    games = player.games.select_related('game')
+    achievements = player.achievements.select_related('game')
     
     context = {
         'player': player,
         'user': user,
+        'stats': stats_for(player),
         'games': games,
         'achievements': achievements,
     }
+    if request.user.is_authenticated and request.user != user:
+        viewer = request.user.player
+        context['is_friend'] = friend_graph.are_friends(viewer, player)
+        context['mutual_friends'] = Player.objects.filter(
+            pk__in=friend_graph.mutual_friend_ids(viewer, player)
+        ).select_related('user')
     return render(request, 'player_profile.html', context)
 
 @login_required
 def player_dashboard(request):
     """Личный кабинет игрока"""
     player = request.user.player
-    games = player.games.all()[:6]
-    achievements = player.achievements.all()[:6]
+    games = player.games.select_related('game')[:6]
+    achievements = player.achievements.select_related('game')[:6]
     
     context = {
         'player': player,
+        'stats': stats_for(player),
         'games': games,
         'achievements': achievements,
     }
@@ -94,13 +127,56 @@ def player_dashboard(request):
 @login_required
 def leaderboard(request):
     """Таблица лидеров"""
-    players = Player.objects.all()
-    
+    try:
+        players, next_cursor = leaderboard_page(request.GET.get('after'))
+    except InvalidCursor:
+        players, next_cursor = leaderboard_page()
+
     context = {
         'players': players,
+        'next_cursor': next_cursor,
+        'around_me': players_around(request.user.player),
     }
     return render(request, 'leaderboard.html', context)
 
+@login_required
+def friends_leaderboard(request):
+    """Таблица лидеров среди друзей"""
+    context = {
+        'players': ranked_friends(request.user.player),
+        'friends_only': True,
+    }
+    return render(request, 'leaderboard.html', context)
+
+@login_required
+def game_leaderboard(request, pk):
+    """Таблица лидеров игры по очкам в ней"""
+    game = get_object_or_404(Game, pk=pk)
+    player = request.user.player
+    friends_only = request.GET.get('scope') == 'friends'
+    
+    next_cursor = None
+    around_me = []
+    if friends_only:
+        entries = ranked_friends(player, game)
+    else:
+        try:
+            entries, next_cursor = game_leaderboard_page(game, request.GET.get('after'))
+        except InvalidCursor:
+            entries, next_cursor = game_leaderboard_page(game)
+        my_entry = PlayerGame.objects.filter(game=game, player=player).select_related('player__user').first()
+        if my_entry:
+            around_me = game_entries_around(my_entry)
+    
+    context = {
+        'game': game,
+        'entries': entries,
+        'next_cursor': next_cursor,
+        'around_me': around_me,
+        'friends_only': friends_only,
+    }
+    return render(request, 'game_leaderboard.html', context)
+
 @login_required
 @require_http_methods(["POST"])
 def start_game(request, game_id):
@@ -121,14 +197,9 @@ def start_game(request, game_id):
 def add_achievement(request, achievement_id):
     """Добавить достижение игроку"""
     achievement = get_object_or_404(Achievement, pk=achievement_id)
-    player = request.user.player
-    
-    if player not in achievement.players.all():
-        achievement.players.add(player)
-        player.add_experience(achievement.experience_reward)
-        player.add_points(achievement.points)
+    rewards.unlock_achievement(request.user.player, achievement)
     
-    return redirect('game_detail', pk=achievement.game.pk)
+    return redirect('game_detail', pk=achievement.game_id)
 
 def register(request):
     """Регистрация"""
@@ -183,10 +254,7 @@ def add_review(request, game_id):
     if request.method == 'POST':
         form = GameReviewForm(request.POST, instance=review)
         if form.is_valid():
-            review = form.save(commit=False)
-            review.game = game
-            review.player = request.user.player
-            review.save()
+            form.save_for(request.user.player, game)
             return redirect('game_detail', pk=game_id)
     else:
         form = GameReviewForm(instance=review)
@@ -197,24 +265,32 @@ def add_review(request, game_id):
 @login_required
 def search_players(request):
     """Поиск игроков"""
-    form = PlayerSearchForm()
-    players = Player.objects.all()
+    form = PlayerSearchForm(request.GET)
+    players = []
+    has_next = False
+    page = 1
     
-    if request.method == 'GET':
-        search = request.GET.get('search', '')
-        if search:
-            players = players.filter(
-                Q(user__username__icontains=search) |
-                Q(user__first_name__icontains=search) |
-                Q(user__last_name__icontains=search)
-            )
+    if form.is_valid() and form.cleaned_data['search']:
+        page = search.page_number(request.GET.get('page'))
+        players, has_next = search.search_players(form.cleaned_data['search'], page)
     
     context = {
         'form': form,
         'players': players,
+        'page': page,
+        'has_next': has_next,
     }
     return render(request, 'search_players.html', context)
 
+@login_required
+def autocomplete_players(request):
+    """Подсказки игроков по префиксу"""
+    form = PlayerSearchForm(request.GET)
+    results = []
+    if form.is_valid() and form.cleaned_data['search']:
+        results = search.autocomplete(form.cleaned_data['search'])
+    return JsonResponse({'results': results})
+
 @login_required
 def send_friend_request(request, player_id):
     """Отправить заявку в друзья"""
@@ -233,17 +309,22 @@ def send_friend_request(request, player_id):
 def friend_requests(request):
     """Заявки в друзья"""
     player = request.user.player
-    received_requests = player.received_requests.filter(status='pending')
+    received_requests = player.received_requests.filter(status='pending').select_related('from_player__user')
     
     if request.method == 'POST':
         request_id = request.POST.get('request_id')
         action = request.POST.get('action')
         
         try:
-            friend_req = FriendRequest.objects.get(pk=request_id)
+            friend_req = player.received_requests.select_related('from_player__user').get(pk=request_id)
             
             if action == 'accept':
-                friend_req.accept()
+                with transaction.atomic():
+                    friend_req.accept()
+                    activity.record(
+                        player, 'friend',
+                        subject=friend_req.from_player.user.username, target_id=friend_req.from_player_id,
+                    )
             elif action == 'decline':
                 friend_req.status = 'declined'
                 friend_req.save()
@@ -257,10 +338,36 @@ def friend_requests(request):
     }
     return render(request, 'friend_requests.html', context)
 
+@login_required
+def feed(request):
+    """Лента событий игрока и его друзей"""
+    player = request.user.player
+    try:
+        events, next_cursor = activity.timeline(player, request.GET.get('after'))
+    except InvalidCursor:
+        events, next_cursor = activity.timeline(player)
+    
+    context = {
+        'events': events,
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'feed.html', context)
+
+@login_required
+def friends(request):
+    """Друзья игрока и рекомендации"""
+    player = request.user.player
+    
+    context = {
+        'friends': friend_graph.friends_of(player),
+        'suggestions': friend_graph.suggestions(player),
+    }
+    return render(request, 'friends.html', context)
+
 @login_required
 def tournaments(request):
     """Список турниров"""
-    tournaments_list = Tournament.objects.all()
+    tournaments_list = Tournament.objects.select_related('game')
     player = request.user.player
     
     context = {
@@ -272,43 +379,33 @@ def tournaments(request):
 @login_required
 def tournament_detail(request, pk):
     """Детали турнира"""
-    tournament = get_object_or_404(Tournament, pk=pk)
-    results = tournament.results.all()
-    is_participant = request.user.player in tournament.participants.all()
+    tournament = get_object_or_404(Tournament.objects.select_related('game'), pk=pk)
+    player = request.user.player
     
     if request.method == 'POST':
         action = request.POST.get('action')
         
-        if action == 'join' and not is_participant:
-            tournament.participants.add(request.user.player)
-            is_participant = True
-        elif action == 'leave' and is_participant:
-            tournament.participants.remove(request.user.player)
-            is_participant = False
+        if action == 'join':
+            participation.join_tournament(player, tournament)
+        elif action == 'leave':
+            participation.leave_tournament(player, tournament)
+        return redirect('tournament_detail', pk=pk)
     
     context = {
         'tournament': tournament,
-        'results': results,
-        'is_participant': is_participant,
+        'results': tournament.results.select_related('player__user'),
+        'is_participant': participation.is_participant(player, tournament),
     }
     return render(request, 'tournament_detail.html', context)
 
 @login_required
 def daily_quests(request):
     """Ежедневные квесты"""
-    player = request.user.player
-    quests = DailyQuest.objects.filter(is_active=True)
-    quest_progress = PlayerQuestProgress.objects.filter(player=player)
-    
-    for quest in quests:
-        progress, created = PlayerQuestProgress.objects.get_or_create(
-            player=player,
-            quest=quest
-        )
+    quests = list(DailyQuest.objects.filter(is_active=True))
     
     context = {
         'quests': quests,
-        'quest_progress': {qp.quest_id: qp for qp in quest_progress},
+        'quest_progress': quests_service.progress_for(request.user.player, quests),
     }
     return render(request, 'daily_quests.html', context)
 
@@ -316,20 +413,6 @@ def daily_quests(request):
 def complete_quest(request, quest_id):
     """Завершить квест"""
     quest = get_object_or_404(DailyQuest, pk=quest_id)
-    player = request.user.player
-    
-    try:
-        progress = PlayerQuestProgress.objects.get(player=player, quest=quest)
-        if not progress.completed:
-            progress.completed = True
-            progress.progress = 100
-            from django.utils import timezone
-            progress.completed_at = timezone.now()
-            progress.save()
-            
-            player.add_points(quest.reward_points)
-            player.add_experience(quest.reward_experience)
-    except PlayerQuestProgress.DoesNotExist:
-        pass
+    rewards.complete_quest(request.user.player, quest)
     
     return redirect('daily_quests')
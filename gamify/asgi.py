@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gamify.settings')
+# Под ASGI читающие страницы обслуживаются асинхронными представлениями
+os.environ.setdefault('GAMIFY_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
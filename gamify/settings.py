@@ -43,7 +43,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'games.middleware.PrecompressedStaticMiddleware',
+    'games.middleware.QueryStatsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'games.middleware.ReplicaMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -53,6 +56,10 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'gamify.urls'
 
+# Асинхронные версии читающих страниц (games/async_views.py);
+# gamify/asgi.py включает их по умолчанию
+ASYNC_VIEWS = os.environ.get('GAMIFY_ASYNC_VIEWS') == '1'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -82,6 +89,57 @@ DATABASES = {
     }
 }
 
+# Реплика для чтения включается переменной GAMIFY_REPLICA_DB с путём к файлу;
+# локально её заполняет команда sync_replica
+REPLICA_DATABASE_ALIAS = None
+if os.environ.get('GAMIFY_REPLICA_DB'):
+    REPLICA_DATABASE_ALIAS = 'replica'
+    DATABASES[REPLICA_DATABASE_ALIAS] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['GAMIFY_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['games.routers.ReplicaRouter']
+
+# Представления, которые читают с реплики, и сколько секунд после записи
+# пользователь остаётся на основной базе
+REPLICA_VIEWS = ('home', 'games_list', 'game_detail', 'leaderboard', 'tournaments')
+REPLICA_STICKY_SECONDS = 10
+
+# Доли призового фонда турнира в процентах по местам (games.standings)
+TOURNAMENT_PAYOUTS = (50, 30, 20)
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# Общий кэш (Redis, нужен пакет redis) включается переменной GAMIFY_REDIS_URL.
+# Без неё кэш живёт в памяти процесса: версии моделей, сбрасываемые командами
+# и другими воркерами, сюда не доходят, поэтому такой режим годится только
+# для одного процесса, а сроки жизни записей укорачиваются (games.cache)
+CACHE_SHARED = bool(os.environ.get('GAMIFY_REDIS_URL'))
+if CACHE_SHARED:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['GAMIFY_REDIS_URL'],
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'gamify',
+            'TIMEOUT': 300,
+            'OPTIONS': {
+                'MAX_ENTRIES': 5000,
+                'CULL_FREQUENCY': 4,
+            },
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -113,6 +171,13 @@ STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+# collectstatic пишет файлы с хешем в имени, минифицирует CSS и кладёт рядом
+# .gz (и .br, если установлен brotli); отдаёт их PrecompressedStaticMiddleware
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'games.staticfiles.CompressedManifestStaticFilesStorage'},
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
@@ -121,6 +186,37 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # Строка на каждый запрос (games.middleware.QueryStatsMiddleware)
+        # пишется только при GAMIFY_QUERY_LOG=1
+        'games.queries': {
+            'handlers': ['console'],
+            'level': 'INFO' if os.environ.get('GAMIFY_QUERY_LOG') == '1' else 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+# API под /api/v1/ отвечает на ошибку CSRF в JSON (games.api)
+CSRF_FAILURE_VIEW = 'games.api.csrf_failure'
+
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
+
+# Пользователь загружается вместе с игроком (games.auth). С общим кэшем сессии
+# читаются из него и пишутся в базу как запасной источник, а пользователь тоже
+# кэшируется; кэш одного процесса не узнал бы о выходе или смене пароля
+# в другом, поэтому без общего кэша сессии и пользователи читаются из базы
+if CACHE_SHARED:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    AUTHENTICATION_BACKENDS = ['games.auth.CachedPlayerBackend']
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+    AUTHENTICATION_BACKENDS = ['games.auth.PlayerBackend']
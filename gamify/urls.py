@@ -21,7 +21,8 @@ from django.conf.urls.static import static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('', include('games.urls')),
+    path('api/v1/', include('games.api_urls')),
+    path('', include('games.async_urls' if settings.ASYNC_VIEWS else 'games.urls')),
 ]
 
 if settings.DEBUG: